@@ -31,8 +31,10 @@ class BulkLoader(Loader):
         connection = self.getConnection()
         if self.loader == 'external':
             self.extLoaderPrep(connection, self.configFile)
-        elif self.loader == 'sqlldr':
+        elif self.loader in ['sqlldr', 'incremental']:
             self.sqlldrPrep(connection, self.configFile)
+        elif self.loader == 'arraybind':
+            self.arrayPrep(connection, self.configFile)
         connection.close()
         
     def loading(self):
@@ -42,8 +44,29 @@ class BulkLoader(Loader):
         connection = self.getConnection()
         if self.loader == 'external':
             self.extLoaderLoading(connection)
-        elif self.loader == 'sqlldr':
+        elif self.loader in ['sqlldr', 'arraybind']:
             self.sqlldrLoading(connection)
+        elif self.loader == 'incremental':
+            self.incrementalLoading(connection)
+            
+    def merging(self, force = False):
+        """
+        Merges the delta IOT into the IOT when it has outgrown deltaMergeSize, 
+        or always with force.
+        """
+        connection = self.getConnection()
+        merged = self.mergeDelta(connection, force)
+        connection.close()
+        return merged
+            
+    def deleting(self, start, end = None):
+        """
+        Removes the epochs from start to end, or the epoch start, and updates
+        the meta table.
+        """
+        connection = self.getConnection()
+        self.deleteEpochs(connection, start, end)
+        connection.close()
             
     def closing(self):
         """
@@ -12,9 +12,29 @@ Version 2.0, January 2004
 
 import pointcloud.general as general
 import pointcloud.oracleTools as ora
+import pointcloud.reader as reader
+import pointcloud.mortonCodec as mortonCodec
+import pointcloud.structures.HexadecTree as HexadecTree
+import pointcloud.structures.dynamicOctree as dynamicOctree
+import pointcloud.structures.HilbertTree as HilbertTree
+from pointcloud.structures.geometry import dynamicPolygon, Polygon4D
+from shapely.geometry import box
+import numpy as np
+import subprocess
+import shutil
+import time
+import sys
+import re
 import os
 from CommonOracle import Oracle
 
+# the exit codes of a failed or aborted sqlldr, 2 is a load with warnings
+SQLLDR_FAILURES = [1, 3]
+
+# the largest number of cells of the tree that finds the ranges of the
+# deleted epochs of the deep integration
+DELETE_CELLS = 4096
+
 class Loader(Oracle):
     def __init__(self, configuration):
         Oracle.__init__(self, configuration)
@@ -49,14 +69,20 @@ class Loader(Oracle):
             heapCols.append(self.getDBColumn(i)[0])
         return heapCols
     
-    def sqlldr(self, tableName):
+    def sqlldr(self, tableName, sortedIndex = None, dataFile = None, name = None, parallel = False):
         """
         Generates the control file for the sqlldr and composes the sqlloader
-        command.
+        command. If the input is sorted on an index, sortedIndex names it so 
+        that the direct path load does not sort it again. The data is read 
+        from the standard input or from dataFile. The control, log and bad 
+        files are named after name, by default the table. With parallel the 
+        session is one of several parallel direct path sessions.
         """
-        controlFile = tableName + '.ctl'
-        badFile = tableName + '.bad'
-        logFile = tableName + '.log'
+        if name is None:
+            name = tableName
+        controlFile = name + '.ctl'
+        badFile = name + '.bad'
+        logFile = name + '.log'
         
         ctfile = open(controlFile,'w')
         sqlldrCols = []
@@ -66,21 +92,69 @@ class Loader(Oracle):
                 raise Exception('Wrong column! ' + column)
 #            sqlldrCols.append(self.getDBColumn(i)[0] + ' ' + general.DM_SQLLDR[column][0] + ' external(' + str(general.DM_SQLLDR[column][1]) + ')')
             sqlldrCols.append(self.getDBColumn(i)[0] + ' ' + general.DM_SQLLDR[column][0] + ' external')
-            
+        
+        infile = ''
+        fields = """fields terminated by ','
+"""
+        if dataFile is None:
+            data = ' data=\\"-\\"'
+        else:
+            data = ' data=' + dataFile
+        if self.sqlldrFormat == 'binary':
+            # fixed length records of native numbers, the file name of the data
+            # option would drop the fix option of the infile clause
+            sqlldrCols, recordLength = self.sqlldrBinaryColumns()
+            infile = """infile '""" + (dataFile or '-') + """' "fix """ + str(recordLength) + """"
+"""
+            fields = ''
+            data = ''
+        
+        sortedIndexes = ''
+        if sortedIndex is not None:
+            sortedIndexes = 'sorted indexes (' + sortedIndex + ')\n'
         
         ctfile.write("""load data
-append into table """ + tableName + """
-fields terminated by ','
-(
+""" + infile + """append into table """ + tableName + """
+""" + sortedIndexes + fields + """(
 """ + (',\n'.join(sqlldrCols)) + """
 )""")
         
         ctfile.close()
-        sqlLoaderCommand = "sqlldr " + self.getConnectString() + " direct=true control=" + controlFile + ' data=\\"-\\" bad=' + badFile + " log=" + logFile
+        sqlLoaderCommand = "sqlldr " + self.getConnectString() + " direct=true control=" + controlFile + data + ' bad=' + badFile + " log=" + logFile
+        if parallel:
+            sqlLoaderCommand += " parallel=true"
 
         return sqlLoaderCommand
         
 
+    def sqlldrBinaryColumns(self):
+        """
+        Returns the field list of the control file of the binary stream and 
+        the length of a record. The words of a wide column are bound and 
+        combined into the column. The doubles are rounded to the scale of the
+        dataset, as their text is, instead of storing their exact expansion.
+        """
+        if self.dataset.lower() == 'coastline':
+            scalez = general.SCALE_COASTLINE[2]
+        else:
+            scalez = general.SCALE_ZANDMOTOR[2]
+        decimals = str(int(round(-np.log10(scalez))))
+        sqlldrCols = []
+        recordLength = 0
+        for columnName, fields in self.getBinaryFields():
+            for (name, ctype, ntype) in fields:
+                recordLength += np.dtype(ntype).itemsize
+            if len(fields) == 2:
+                hi, lo = fields[0][0], fields[1][0]
+                sqlldrCols.append(hi + ' BOUNDFILLER ' + fields[0][1])
+                sqlldrCols.append(lo + ' BOUNDFILLER ' + fields[1][1])
+                sqlldrCols.append(columnName + ' EXPRESSION "(:' + hi + ' * ' + str(2 ** general.SQLLDR_WORD_BITS) + ' + :' + lo + ')"')
+            elif fields[0][2] == 'f8':
+                sqlldrCols.append(columnName + ' ' + fields[0][1] + ' "ROUND(:' + columnName + ', ' + decimals + ')"')
+            else:
+                sqlldrCols.append(columnName + ' ' + fields[0][1])
+        return sqlldrCols, recordLength
+
     def createFlatTable(self, cursor, tableName, tableSpace):
         """
         Creates a empty flat table
@@ -93,12 +167,19 @@ CREATE TABLE """ + tableName + """ (
 """ + ora.getTableSpaceString(tableSpace) + """ 
 pctfree 0 nologging""")
 
-    def createExternalTable(self, cursor, txtFiles, tableName, txtDirVariableName, numProcesses):
+    def createExternalTable(self, cursor, txtFiles, tableName, txtDirVariableName, numProcesses, preprocessor = None):
         """
         Creates an external table by accecssing the files in the specified directory.        
+        The txtFiles are listed in the LOCATION clause. With a preprocessor 
+        script Oracle reads the output of the script run on every file.
         """
         ora.dropTable(cursor, tableName, True)
         
+        preprocessorString = ''
+        if preprocessor is not None:
+            preprocessorString = """
+    PREPROCESSOR """ + txtDirVariableName + ":'" + preprocessor + "'"
+        
         ora.mogrifyExecute(cursor, """
 CREATE TABLE """ + tableName + """ (""" + (',\n'.join(self.getHeapColumns())) + """)
 ORGANIZATION EXTERNAL
@@ -106,12 +187,28 @@ ORGANIZATION EXTERNAL
 TYPE oracle_loader
 DEFAULT DIRECTORY """ + txtDirVariableName + """
 ACCESS PARAMETERS (
-    RECORDS DELIMITED BY NEWLINE
+    RECORDS DELIMITED BY NEWLINE""" + preprocessorString + """
     FIELDS TERMINATED BY ', ')
-LOCATION ('""" + txtFiles + """')
+LOCATION ('""" + "', '".join(txtFiles) + """')
 )
 """ + ora.getParallelString(numProcesses) + """ REJECT LIMIT 0""")     
         
+    def createEmptyIOT(self, cursor, iotTableName, tableSpace):
+        """
+        Creates an empty Index-Organized-Table, loaded directly with presorted data.
+        """
+        ora.dropTable(cursor, iotTableName, True)
+        
+        cls = [' '.join(i) for i in self.columns]
+        
+        ora.mogrifyExecute(cursor, """
+CREATE TABLE """ + iotTableName + """
+(""" + (', '.join(cls)) + """, 
+    CONSTRAINT """ + iotTableName + """_PK PRIMARY KEY (""" + self.index + """))
+    ORGANIZATION INDEX
+    """ + ora.getTableSpaceString(tableSpace) + """
+    PCTFREE 0 NOLOGGING""")
+        
     def createIOTTable(self, cursor, iotTableName, tableName, tableSpace, numProcesses):
         """
         Creates an Index-Organized-Table and populates it from the heap table data.
@@ -131,26 +228,63 @@ CREATE TABLE """ + iotTableName + """
     AS
         SELECT """ + (', '.join(self.heapCols())) + """ FROM """ + tableName)
         
-    def addIOTUnionAll(self, cursor):
+    def createPartitionedIOT(self, cursor, iotTableName, segmentTableName, partitionName, upperBound, tableSpace):
+        """
+        Creates an empty Index-Organized-Table that is range partitioned on the
+        leading column of the primary key, with one partition below upperBound.
+        The columns are those of the segment table, so its segment can be 
+        exchanged with the partition.
+        """
+        ora.dropTable(cursor, iotTableName, True)
+        
+        cls = [', '.join(i[0] for i in self.columns)]
+        
+        ora.mogrifyExecute(cursor, """
+CREATE TABLE """ + iotTableName + """
+(""" + (', '.join(cls)) + """, 
+    CONSTRAINT """ + iotTableName + """_PK PRIMARY KEY (""" + self.index + """))
+    ORGANIZATION INDEX
+    """ + ora.getTableSpaceString(tableSpace) + """
+    PCTFREE 0 NOLOGGING
+    PARTITION BY RANGE (""" + self.getPartitionColumn() + """)
+    (PARTITION """ + partitionName + """ VALUES LESS THAN (""" + str(upperBound) + """))
+    AS
+        SELECT """ + (', '.join(cls)) + """ FROM """ + segmentTableName + """ WHERE 1 = 0""")
+        ora.setIncrementalStatistics(cursor, iotTableName, self.user)
+    
+    def getPartitionColumn(self):
+        """
+        The column of the range partitions, the time that leads the primary key
+        of the loose integration.
+        """
+        return self.index.split(',')[0].strip()
+    
+    def addIOTUnionAll(self, cursor, iotTableName = None, tableName = None):
         """
         Inserting additional data to the table by UNIONing the current IOT with 
-        the heap table.
+        the heap table. By default the heap table is added to the IOT, the 
+        delta update unions the delta IOT with the heap table and the merge 
+        job the IOT with the delta IOT in the same way.
         """
-        temp_iot = self.iotTableName + '_2'
-        ora.renameTable(cursor, self.iotTableName, temp_iot)
-        ora.renameConstraint(cursor, temp_iot, self.iotTableName + '_PK', temp_iot + '_PK')
-        ora.renameIndex(cursor, self.iotTableName + '_PK', temp_iot + '_PK')
+        if iotTableName is None:
+            iotTableName = self.iotTableName
+        if tableName is None:
+            tableName = self.tableName
+        temp_iot = iotTableName + '_2'
+        ora.renameTable(cursor, iotTableName, temp_iot)
+        ora.renameConstraint(cursor, temp_iot, iotTableName + '_PK', temp_iot + '_PK')
+        ora.renameIndex(cursor, iotTableName + '_PK', temp_iot + '_PK')
         
         cls = [', '.join(i[0] for i in self.columns)]
               
         ora.mogrifyExecute(cursor, """
-CREATE TABLE """ + self.iotTableName + """
-(""" + (', '.join(cls)) + ", CONSTRAINT """ + self.iotTableName + "_PK PRIMARY KEY("+ self.index + """))
+CREATE TABLE """ + iotTableName + """
+(""" + (', '.join(cls)) + ", CONSTRAINT """ + iotTableName + "_PK PRIMARY KEY("+ self.index + """))
     ORGANIZATION INDEX""" + ora.getTableSpaceString(self.tableSpaceIOT) + """
     PCTFREE 0 NOLOGGING
     """ + ora.getParallelString(self.numProcesses) + """
     AS
-        SELECT """ + (', '.join(self.heapCols())) + """ FROM """ + self.tableName + """
+        SELECT """ + (', '.join(self.heapCols())) + """ FROM """ + tableName + """
         UNION ALL
         SELECT """  + (', '.join(cls)) + ' FROM ' + temp_iot)
 
@@ -160,7 +294,14 @@ CREATE TABLE """ + self.iotTableName + """
         """
         Gather optimiser statistics.
         """
-        ora.computeStatistics(cursor, self.iotTableName, self.user)
+        if self.loader == 'incremental':
+            # only the new partition is scanned
+            ora.computeIncrementalStatistics(cursor, self.iotTableName, self.user)
+        elif self.update == 'delta' and not (self.init or self.reload) and ora.tableExists(cursor, self.getDeltaTable()):
+            # only the delta IOT changed
+            ora.computeStatistics(cursor, self.getDeltaTable(), self.user)
+        else:
+            ora.computeStatistics(cursor, self.iotTableName, self.user)
 
 
     def extLoaderPrep(self, connection, configuration):
@@ -174,7 +315,12 @@ CREATE TABLE """ + self.iotTableName + """
 
         command = """python -m pointcloud.mortonConverter {0}""".format(configuration)
         os.system(command)
-        self.createExternalTable(cursor, '*.txt', self.tableName, self.ORCLdirectory, self.numProcesses)
+        preprocessor = None
+        if self.externalMode == 'preprocessor':
+            # the converter only wrote the location files and the script, the
+            # las files are converted while the external table is read
+            preprocessor = self.getPreprocessor()
+        self.createExternalTable(cursor, self.getExternalFiles(), self.tableName, self.ORCLdirectory, self.numProcesses, preprocessor)
     
     def extLoaderLoading(self, connection):
         """
@@ -193,22 +339,128 @@ CREATE TABLE """ + self.iotTableName + """
         """
         cursor = connection.cursor()
         
-        self.createFlatTable(cursor, self.tableName, self.tableSpaceHeap)
+        if self.presort and (self.init or self.reload):
+            # the converter emits the rows sorted on the primary key, they are 
+            # loaded directly into the IOT instead of sorting a heap table
+            self.createEmptyIOT(cursor, self.iotTableName, self.tableSpaceIOT)
+        else:
+            self.createFlatTable(cursor, self.tableName, self.tableSpaceHeap)
         if self.init or self.reload:
             ora.createMetaTable(cursor, self.metaTable, True)
 
-        commnandsqlldr = self.sqlldr(self.tableName)
-        command = """python -m pointcloud.mortonConverter {0} | """.format(configuration) + commnandsqlldr
+        if self.presort and (self.init or self.reload):
+            tableName = self.iotTableName
+            commnandsqlldr = self.sqlldr(tableName, tableName + '_PK')
+        elif self.numProcesses > 1:
+            # the parallel direct path loads only the heap table, the IOT is 
+            # loaded by one session
+            self.sqlldrParallel(configuration, self.tableName, self.numProcesses)
+            return
+        else:
+            tableName = self.tableName
+            commnandsqlldr = self.sqlldr(tableName)
         
-        os.system(command)
+        converter = subprocess.Popen([sys.executable, '-m', 'pointcloud.mortonConverter', configuration], stdout = subprocess.PIPE)
+        session = subprocess.Popen(commnandsqlldr, shell = True, stdin = converter.stdout)
+        # only sqlldr holds the pipe, so the converter stops if sqlldr fails
+        converter.stdout.close()
+        code = session.wait()
+        if converter.wait() != 0 or code in SQLLDR_FAILURES:
+            raise Exception('ERROR: The sqlldr loading failed, see ' + tableName + '.log')
+    
+    def sqlldrParallel(self, configuration, tableName, numSessions):
+        """
+        Loads the table with numSessions parallel direct path sqlldr sessions.
+        Every session reads a named pipe and the converter spreads its chunks 
+        over the pipes. The logs and the bad files of the sessions are 
+        aggregated in the log and the bad file of the table.
+        """
+        names = [tableName + '_' + str(i) for i in range(numSessions)]
+        pipes = [name + '.pipe' for name in names]
+        for pipe in pipes:
+            if os.path.exists(pipe):
+                os.remove(pipe)
+            os.mkfifo(pipe)
+        try:
+            sessions = [subprocess.Popen(self.sqlldr(tableName, dataFile = pipe, name = name, parallel = True), shell = True) 
+                        for (name, pipe) in zip(names, pipes)]
+            converter = subprocess.Popen([sys.executable, '-m', 'pointcloud.mortonConverter', configuration] + pipes)
+            # a failed session would block the converter on its pipe
+            while converter.poll() is None:
+                if [s for s in sessions if s.poll() in SQLLDR_FAILURES]:
+                    converter.kill()
+                    converter.wait()
+                    break
+                time.sleep(1)
+            codes = [s.wait() for s in sessions]
+        finally:
+            for pipe in pipes:
+                os.remove(pipe)
+        self.aggregateSqlldrFiles(tableName, names)
+        if converter.returncode != 0 or [c for c in codes if c in SQLLDR_FAILURES]:
+            raise Exception('ERROR: The parallel sqlldr loading failed, see ' + tableName + '.log')
+    
+    def aggregateSqlldrFiles(self, tableName, names):
+        """
+        Joins the logs and the bad files of the sqlldr sessions in the log and 
+        the bad file of the table. The log starts with the rows loaded and 
+        rejected by all the sessions.
+        """
+        loaded, rejected = 0, 0
+        logs = []
+        for name in names:
+            if os.path.exists(name + '.log'):
+                log = open(name + '.log').read()
+                loaded += sum([int(n) for n in re.findall(r'(\d+) Rows? successfully loaded', log)])
+                rejected += sum([int(n) for n in re.findall(r'(\d+) Rows? not loaded', log)])
+                logs.append('=' * 20 + ' ' + name + ' ' + '=' * 20 + '\n' + log)
+                os.remove(name + '.log')
+        logFile = open(tableName + '.log', 'w')
+        logFile.write('Sessions: {0}\nRows loaded: {1}\nRows not loaded: {2}\n\n'.format(len(names), loaded, rejected))
+        logFile.write('\n'.join(logs))
+        logFile.close()
+        
+        badFiles = [name + '.bad' for name in names if os.path.exists(name + '.bad')]
+        if len(badFiles):
+            badFile = open(tableName + '.bad', 'w')
+            for name in badFiles:
+                fh = open(name)
+                shutil.copyfileobj(fh, badFile)
+                fh.close()
+                os.remove(name)
+            badFile.close()
+        for name in names:
+            if os.path.exists(name + '.ctl'):
+                os.remove(name + '.ctl')
+        return loaded, rejected
         
+    def arrayPrep(self, connection, configuration):
+        """
+        Initialise the array bound loading. The converter inserts the numpy 
+        columns into the heap table with executemany batches, from insertSessions
+        sessions in parallel.
+        """
+        cursor = connection.cursor()
+        
+        self.createFlatTable(cursor, self.tableName, self.tableSpaceHeap)
+        if self.init or self.reload:
+            ora.createMetaTable(cursor, self.metaTable, True)
+        
+        command = """python -m pointcloud.mortonConverter {0}""".format(configuration)
+        os.system(command)
+    
     def sqlldrLoading(self, connection):
         """
         Create the IOT or update according to the specified update method (dump, 
-        union, resort)"""
+        union, resort). It also loads the heap table of the array bound loader."""
         cursor = connection.cursor()
+        if self.presort and (self.init or self.reload):
+            # already loaded into the IOT during the preparation
+            return
         if self.init or self.reload:
             self.createIOTTable(cursor, self.iotTableName, self.tableName, self.tableSpaceIOT, self.numProcesses)
+            if self.update == 'delta':
+                ora.dropTable(cursor, self.getDeltaTable().upper(), True)
         else:
             if self.update == 'dump':
                 ora.appendData(connection, cursor, self.iotTableName, self.tableName)
@@ -216,8 +468,302 @@ CREATE TABLE """ + self.iotTableName + """
                 self.addIOTUnionAll(cursor)
             elif self.update == 'resort':
                 self.rebuildIOT(connection)
+            elif self.update == 'delta':
+                self.addDeltaIOT(connection)
         ora.dropTable(cursor, self.tableName)
+    
+    def addDeltaIOT(self, connection):
+        """
+        Adds the heap table to the delta IOT, which is created for the first 
+        new epochs and rebuilt with the union of its rows and the heap table 
+        afterwards. The cost depends on the size of the delta IOT, which the
+        merge job keeps below deltaMergeSize, and not on the size of the IOT.
+        """
+        cursor = connection.cursor()
+        delta = self.getDeltaTable()
+        if ora.tableExists(cursor, delta):
+            self.addIOTUnionAll(cursor, delta)
+        else:
+            self.createIOTTable(cursor, delta, self.tableName, self.tableSpaceIOT, self.numProcesses)
+    
+    def mergeDelta(self, connection, force = False):
+        """
+        The merge job of the delta update. When the delta IOT is larger than 
+        deltaMergeSize MB, or with force, its rows are merged into the IOT and 
+        it is dropped. It must not run at the same time as a load of the same
+        table.
+        
+        Returns:
+            bool: whether the delta IOT was merged
+        """
+        cursor = connection.cursor()
+        delta = self.getDeltaTable()
+        if not ora.tableExists(cursor, delta):
+            return False
+        if not force and ora.getSizeTable(cursor, delta + '_pk') < self.deltaMergeSize:
+            return False
+        self.addIOTUnionAll(cursor, self.iotTableName, delta)
+        ora.dropTable(cursor, delta)
+        ora.computeStatistics(cursor, self.iotTableName, self.user)
+        return True
            
+    def incrementalLoading(self, connection):
+        """
+        Adds the new epochs as a partition of the IOT. The heap table is sorted
+        into a standalone IOT, a range partition for the time of its epochs is
+        added above the loaded ones and the standalone IOT is exchanged with 
+        the partition. So a new survey costs the sorting of its own points and
+        the loaded partitions are not touched.
+        """
+        cursor = connection.cursor()
+        segment = self.iotTableName + '_seg'
+        self.createIOTTable(cursor, segment, self.tableName, self.tableSpaceIOT, self.numProcesses)
+        ora.dropTable(cursor, self.tableName)
+        
+        column = self.getPartitionColumn()
+        mint, maxt = ora.getKeyRange(cursor, segment, column)
+        if mint is None:
+            # no new points
+            ora.dropTable(cursor, segment)
+            return
+        partition = 'P_{0}_{1}'.format(int(mint), int(maxt))
+        if self.init or self.reload:
+            self.createPartitionedIOT(cursor, self.iotTableName, segment, partition, int(maxt) + 1, self.tableSpaceIOT)
+        else:
+            # the bound of the highest partition, the epochs of the partition 
+            # may be deleted in the meantime but the bound stays
+            partitions = ora.getPartitions(cursor, self.iotTableName)
+            last = None
+            if len(partitions):
+                last = self.getPartitionEpochs(partitions[-1])[1]
+            if last is not None and mint <= last:
+                ora.dropTable(cursor, segment)
+                raise Exception('ERROR: The new epochs must be later than the loaded ones')
+            ora.addPartition(cursor, self.iotTableName, partition, int(maxt) + 1)
+        ora.exchangePartition(cursor, self.iotTableName, partition, segment)
+        ora.dropTable(cursor, segment)
+    
+    def getPartitionEpochs(self, partitionName):
+        """
+        Returns the first and the last time of a partition of the incremental
+        loader, P_{mint}_{maxt}.
+        """
+        return [int(t) for t in partitionName.split('_')[1:3]]
+    
+    def deleteEpochs(self, connection, start, end = None):
+        """
+        Removes all the points of the epochs from start to end, or of the epoch
+        start without end, for rolling archives. The times are given as in the 
+        meta table, days since the epoch or years.
+        
+        The incremental loader drops the partitions within the epochs and 
+        deletes the rest of the partitions that overlap them. The loose 
+        integration deletes the range of the leading time key and the deep
+        integration the morton ranges of the points of the epochs. The time
+        extent of the meta table is updated afterwards.
+        
+        Args:
+            connection: the connection to the database
+            start (int): the first epoch
+            end (int): the last epoch
+        """
+        if end is None:
+            end = start
+        if end < start:
+            raise Exception('ERROR: The last epoch to delete is before the first one')
+        low, high = int(start * self.scale), int(end * self.scale)
+        cursor = connection.cursor()
+        tables = [self.iotTableName]
+        if self.update == 'delta' and ora.tableExists(cursor, self.getDeltaTable()):
+            tables.append(self.getDeltaTable())
+        for table in tables:
+            if self.loader == 'incremental':
+                self.dropEpochPartitions(cursor, table, low, high)
+            elif self.integration == 'loose':
+                ora.deleteKeyRanges(cursor, table, 'time', [(low, high)])
+            else:
+                self.deleteMortonRuns(connection, table, low, high)
+        connection.commit()
+        self.shrinkMetaTable(connection, cursor, tables, start, end)
+        for table in tables:
+            if self.loader == 'incremental':
+                ora.computeIncrementalStatistics(cursor, table, self.user)
+            else:
+                ora.computeStatistics(cursor, table, self.user)
+    
+    def dropEpochPartitions(self, cursor, table, low, high):
+        """
+        Drops the partitions of the incremental loader with all their epochs 
+        between low and high and deletes the points of the epochs from the 
+        partitions that are only partly within. The last partition of the 
+        table is truncated instead of dropped.
+        """
+        partitions = ora.getPartitions(cursor, table)
+        within, overlap = [], False
+        for partition in partitions:
+            (mint, maxt) = self.getPartitionEpochs(partition)
+            if low <= mint and maxt <= high:
+                within.append(partition)
+            elif mint <= high and low <= maxt:
+                overlap = True
+        for partition in within:
+            if partition == within[-1] and len(within) == len(partitions):
+                ora.truncatePartition(cursor, table, partition)
+            else:
+                ora.dropPartition(cursor, table, partition)
+        if overlap:
+            ora.deleteKeyRanges(cursor, table, 'time', [(low, high)])
+    
+    def getEpochTree(self, meta, low, high, bits = None):
+        """
+        Returns the tree of the deep integration and the region of the epochs
+        from low to high over the whole extent of the meta table, in the 
+        integer coordinates of the codes. The cells of the trees include their
+        lower and exclude their upper bounds, so the region ends one past the 
+        last epoch and coordinate.
+        """
+        (offx, offy, offz, scalex, scaley, scalez, minx, miny, minz, maxx, maxy, maxz) = meta
+        mins = [max(0, int(round((v - off) / s, 0))) for (v, off, s) in 
+                zip((minx, miny, minz), (offx, offy, offz), (scalex, scaley, scalez))]
+        maxs = [int(round((v - off) / s, 0)) + 1 for (v, off, s) in 
+                zip((maxx, maxy, maxz), (offx, offy, offz), (scalex, scaley, scalez))]
+        geom = box(mins[0], mins[1], maxs[0], maxs[1])
+        hilbert = self.clustering.lower() == 'hilbert'
+        # 31 bits per dimension without bits
+        if self.parse == 'xyt':
+            domain = (0, 0, 0, high + 1, maxs[0], maxs[1])
+            if hilbert:
+                tree = HilbertTree.HilbertDynamicOctree(domain, 'auto', 31)
+            else:
+                tree = dynamicOctree.dynamicOctree(domain, 'auto', 31, bits)
+            return tree, dynamicPolygon(geom, low, high + 1)
+        domain = (0, 0, 0, 0, high + 1, maxs[0], maxs[1], maxs[2])
+        if hilbert:
+            tree = HilbertTree.HilbertHexadecTree(domain, 'auto', 31)
+        else:
+            tree = HexadecTree.HexadecTree(domain, 'auto', 31, bits)
+        return tree, Polygon4D(geom, mins[2], maxs[2], low, high + 1)
+    
+    def deleteMortonRuns(self, connection, table, low, high):
+        """
+        Deletes the points with the time between low and high from a table of
+        the deep integration. The tree of the querier finds the cells of the 
+        epochs over the whole extent, down to the level where the cells would
+        be more than DELETE_CELLS. The ranges of the cells within the epochs 
+        are deleted as they are. The time is interleaved in the code, so the 
+        cells at the first and the last epoch are only partly within down to 
+        the cells of single points. The codes of these cells are read through
+        a table of their ranges and their time is decoded, and every run of 
+        codes within the epochs is deleted as one range.
+        
+        Returns:
+            int: the number of deleted ranges
+        """
+        cursor = connection.cursor()
+        ora.mogrifyExecute(cursor, """SELECT offx, offy, offz, scalex, scaley, scalez, minx, miny, minz, maxx, maxy, maxz FROM {0}""".format(self.metaTable))
+        meta = cursor.fetchone()
+        bits = None
+        if self.bits is not None:
+            bits = ora.getMetaBits(cursor, self.metaTable, len(self.bits))
+        mortonCodec.setEngine(self.codec.lower(), self.clustering.lower())
+        
+        tree, region = self.getEpochTree(meta, low, high, bits)
+        level = tree.startLevel + 1
+        codes = tree.overlapCodes(region, 0, True, level)[0]
+        while level < tree.numBits:
+            partial = len([code for code in codes if not code[2]])
+            # a partial cell splits in at most 8 or 16 cells on the next level
+            if partial == 0 or len(codes) + ((1 << len(self.parse)) - 1) * partial > DELETE_CELLS:
+                break
+            level += 1
+            codes = tree.overlapCodes(region, 0, True, level)[0]
+        (fullRanges, partRanges) = [tree.mergeConsecutiveRanges(r) for r in tree.getDiffRanges(codes)]
+        
+        deleter = connection.cursor()
+        numRuns = len(fullRanges)
+        if len(fullRanges):
+            ora.deleteKeyRanges(deleter, table, 'morton', fullRanges)
+        if len(partRanges) == 0:
+            return numRuns
+        
+        rangeTable = table + '_DEL_RANGES'
+        ora.createIOT(cursor, rangeTable, ['low NUMBER', 'upper NUMBER'], 'low', True)
+        ora.insertRows(cursor, rangeTable, ['low', 'upper'], partRanges)
+        cursor.arraysize = self.batchSize
+        ora.mogrifyExecute(cursor, "SELECT " + ora.getHintStatement(['USE_NL (t r)']) + """ r.low, t.morton 
+FROM """ + table + " t, " + rangeTable + """ r 
+WHERE t.morton BETWEEN r.low AND r.upper 
+ORDER BY t.morton""")
+        runs = []
+        first = last = cell = None
+        rows = cursor.fetchmany()
+        while rows:
+            codes = [row[1] for row in rows]
+            for (rangeLow, code), t in zip(rows, self.decodeTime(codes, bits).tolist()):
+                # a run ends with its range, the codes between the ranges are
+                # not read
+                if first is not None and (rangeLow != cell or not low <= t <= high):
+                    runs.append((first, last))
+                    first = None
+                if low <= t <= high:
+                    if first is None:
+                        first, cell = code, rangeLow
+                    last = code
+            if len(runs) >= self.batchSize:
+                ora.deleteKeyRanges(deleter, table, 'morton', runs)
+                numRuns += len(runs)
+                runs = []
+            rows = cursor.fetchmany()
+        if first is not None:
+            runs.append((first, last))
+        if len(runs):
+            ora.deleteKeyRanges(deleter, table, 'morton', runs)
+            numRuns += len(runs)
+        ora.dropTable(cursor, rangeTable, check = False)
+        return numRuns
+    
+    def decodeTime(self, codes, bits = None):
+        """
+        Returns the scaled time of the morton codes of the deep integration.
+        """
+        dims = len(self.parse)
+        if bits is not None:
+            t = reader.morton2coordsBitsArray(codes, [0] * dims, [1] * dims, bits, 0)[0]
+        elif dims == 3:
+            t = mortonCodec.engine.DecodeMorton3DArray(codes)[0]
+        else:
+            t = mortonCodec.engine.DecodeMorton4DArray(codes)[0]
+        return np.round(t).astype(np.int64)
+    
+    def shrinkMetaTable(self, connection, cursor, tables, start, end):
+        """
+        Updates the time extent of the meta table after the deletion of the 
+        epochs from start to end, when they were at an end of the extent. The
+        loose integration reads the new extent from the ends of the index, the
+        deep integration moves the extent past the deleted epochs. The spatial
+        extent is kept, it still bounds the points.
+        """
+        cursor.execute("SELECT minx, miny, minz, mint, maxx, maxy, maxz, maxt FROM {0}".format(self.metaTable))
+        (minx, miny, minz, mint, maxx, maxy, maxz, maxt) = cursor.fetchone()
+        if end < mint or start > maxt or (mint < start and end < maxt):
+            return
+        if self.integration == 'loose':
+            keys = [ora.getKeyRange(cursor, table, 'time') for table in tables]
+            keys = [key for key in keys if key[0] is not None]
+            if len(keys) == 0:
+                # no points left
+                return
+            mint = min(int(key[0]) for key in keys) / self.scale
+            maxt = max(int(key[1]) for key in keys) / self.scale
+        else:
+            if start <= mint and end >= maxt:
+                return
+            if start <= mint:
+                mint = end + 1
+            if end >= maxt:
+                maxt = start - 1
+        ora.updateMetaTableValues(connection, cursor, self.metaTable, minx, miny, minz, mint, maxx, maxy, maxz, maxt)
+    
     def rebuildIOT(self, connection):
         """
         Rebuilt the index organised table by resorting the new and the old data.
@@ -235,6 +781,9 @@ CREATE TABLE """ + self.iotTableName + """
         cursor = connection.cursor()
         size_total = ora.getSizeTable(cursor, self.iotTableName + '_pk')    
         number_total = ora.getNumPoints(connection, cursor, self.iotTableName)
+        if self.update == 'delta' and ora.tableExists(cursor, self.getDeltaTable()):
+            size_total += ora.getSizeTable(cursor, self.getDeltaTable() + '_pk')
+            number_total += ora.getNumPoints(connection, cursor, self.getDeltaTable())
         connection.close()
         return size_total, number_total
         
@@ -247,6 +796,9 @@ CREATE TABLE """ + self.iotTableName + """
         if length:
             cursor.execute('DROP TABLE {0} PURGE'.format((self.iotTableName).upper()))
         
+        if self.update == 'delta':
+            ora.dropTable(cursor, self.getDeltaTable().upper(), True)
+        
         cursor.execute('SELECT table_name FROM all_tables WHERE table_name = :1',[(self.metaTable).upper(),])
         length = len(cursor.fetchall())
         if length:
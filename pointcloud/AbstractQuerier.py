@@ -13,11 +13,15 @@ import pointcloud.structures.QuadTree as QuadTree
 import pointcloud.structures.Octree as Octree
 import pointcloud.structures.HexadecTree as HexadecTree
 import pointcloud.structures.dynamicOctree as dynamicOctree
+import pointcloud.structures.HilbertTree as HilbertTree
 import pointcloud.oracleTools as ora
 from pointcloud.CommonOracle import Oracle
 import pointcloud.reader as reader
+import pointcloud.morton as morton
+import pointcloud.mortonCodec as mortonCodec
 import pointcloud.whereClause as whereClause
 from pointcloud.structures.geometry import Polygon3D, dynamicPolygon, Polygon4D
+import numpy as np
 import os
 
 #TODO: PUT ITERATOR WHEN FETCHING THE DATA
@@ -38,6 +42,15 @@ class Querier(Oracle):
         
         self.ids = config.get('Querier', 'id').replace(' ', '').split(',')
         self.numBits = config.getint('Querier', 'numBits')       
+        self.scanBatch = 10000 #rows fetched at once by the scan method
+        if config.has_option('Querier', 'scanBatch') and config.get('Querier', 'scanBatch') != '':
+            self.scanBatch = config.getint('Querier', 'scanBatch')
+        if self.method == 'scan' and self.integration.lower() != 'deep':
+            raise Exception('ERROR: The scan method needs the deep integration, the loose IOT is sorted on time first')
+        if self.method == 'scan' and self.clustering.lower() == 'hilbert':
+            raise Exception('ERROR: The scan method needs the morton clustering')
+        mortonCodec.setEngine(self.codec.lower(), self.clustering.lower())
+        hilbert = self.clustering.lower() == 'hilbert'
         
         connection = self.getConnection(False)
         cursor = connection.cursor()
@@ -46,6 +59,8 @@ maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz FROM {0}""".format(se
         (self.srid, self.minx, self.miny, self.minz, self.mint, self.maxx,
          self.maxy, self.maxz, self.maxt, self.scalex, self.scaley, self.scalez,
          self.offx, self.offy, self.offz) = cursor.fetchone()
+        if self.bits is not None:
+            self.bits = ora.getMetaBits(cursor, self.metaTable, len(self.bits))
         connection.close()
         self.roundNum = len(str(self.scalex)) - 2
         
@@ -55,14 +70,20 @@ maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz FROM {0}""".format(se
                 self.domain = (0, 0, int((self.maxx - self.offx)/self.scalex),
                                int((self.maxy - self.offy)/self.scaley))
                                
-                self.structure = QuadTree.QuadTree(self.domain, self.numLevels, self.numBits)
+                if hilbert:
+                    self.structure = HilbertTree.HilbertQuadTree(self.domain, self.numLevels, self.numBits)
+                else:
+                    self.structure = QuadTree.QuadTree(self.domain, self.numLevels, self.numBits)
                 self.case = 1
             elif self.parse.lower() == 'xyzt':
                 self.domain = (0, 0, 0, int((self.maxx - self.offx)/self.scalex),
                                int((self.maxy - self.offy)/self.scaley), 
                                 int((self.maxz - self.offz)/self.scalez))
                                 
-                self.structure = Octree.Octree(self.domain, self.numLevels, self.numBits)
+                if hilbert:
+                    self.structure = HilbertTree.HilbertOctree(self.domain, self.numLevels, self.numBits)
+                else:
+                    self.structure = Octree.Octree(self.domain, self.numLevels, self.numBits)
                 self.case = 2
         elif self.integration.lower() == 'deep':
             if self.parse.lower() == 'xyt':
@@ -70,7 +91,10 @@ maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz FROM {0}""".format(se
                                int((self.maxx - self.offx)/self.scalex), 
                                 int((self.maxy - self.offy)/self.scaley))
                                 
-                self.structure = dynamicOctree.dynamicOctree(self.domain, self.numLevels, self.numBits)
+                if hilbert:
+                    self.structure = HilbertTree.HilbertDynamicOctree(self.domain, self.numLevels, self.numBits)
+                else:
+                    self.structure = dynamicOctree.dynamicOctree(self.domain, self.numLevels, self.numBits, self.bits)
                 self.case = 3
             elif self.parse.lower() == 'xyzt':
                 self.domain = (0, 0, 0, 0, int(self.maxt * self.scale), 
@@ -78,11 +102,14 @@ maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz FROM {0}""".format(se
                                 int((self.maxy - self.offy)/self.scaley), 
                                 int((self.maxz - self.offz)/self.scalez))
                                 
-                self.structure = HexadecTree.HexadecTree(self.domain, self.numLevels, self.numBits)
+                if hilbert:
+                    self.structure = HilbertTree.HilbertHexadecTree(self.domain, self.numLevels, self.numBits)
+                else:
+                    self.structure = HexadecTree.HexadecTree(self.domain, self.numLevels, self.numBits, self.bits)
                 self.case = 4
                 
         self.queryTable = self.iotTableName + "_res"
-        self.rangeTable = 'ranges_{0}{1}{2}{3}_'.format(self.dataset[0], self.integration[0], self.parse, self.scale).upper()
+        self.rangeTable = 'ranges_{0}{1}{2}{3}{4}_'.format(self.dataset[0], self.integration[0], self.parse, self.scale, 'h' if hilbert else '').upper()
 
         self.queryTableColumns = ['id', 'dataset', 'type', 'geometry', 'time', 'time_type', 'z']
         self.joinColumns = ['low NUMBER', 'upper NUMBER']
@@ -98,6 +125,7 @@ maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz FROM {0}""".format(se
         self.wkt = None
         self.start_date, self.end_date = None, None
         self.qtype, self.timeType = None, None
+        self.boxes = []
 
     
     def prepareQuery(self, qid):
@@ -272,7 +300,10 @@ WHERE id = """ + qid + """ AND dataset = '""" + self.dataset.lower() + "'")
         (a) sql: A SQL query is posed to the database. The number of ranges is
         limited by a maximum number.
         (b) join: The table is joined explicitly with a table containing the 
-        ranges."""
+        ranges.
+        (c) scan: The IOT is scanned in morton order within the bounding box of
+        the query region, skipping ahead when the scan leaves the box."""
+        self.boxes = []
         if geometry == []:
             mortonWhere, self.mortonJoinWhere, ranges, rangeTab, morPrep, insert, Levels = ('', '', 0, None, 0, 0, 0)
         else:
@@ -283,6 +314,9 @@ WHERE id = """ + qid + """ AND dataset = '""" + self.dataset.lower() + "'")
             elif self.method == 'sql':
                 rangeTab, insert = None, 0
                 mortonWhere, ranges, morPrep, Levels = self.sql(geometry, coarser, continuous)
+            elif self.method == 'scan':
+                rangeTab, insert, mortonWhere = None, 0, ''
+                ranges, morPrep, Levels = self.scan(geometry)
         
         # if deep the time is in the morton code
         if self.integration == 'deep' or (self.start_date is None and self.end_date is None and self.integration == 'loose'): 
@@ -394,6 +428,74 @@ WHERE id = """ + qid + """ AND dataset = '""" + self.dataset.lower() + "'")
         return mortonWhere, ranges, morPrep, Levels
 
 
+    def scan(self, geometry):
+        """ This function computes the morton codes of the corners of the 
+        bounding boxes of the query region for the scan method. No ranges are
+        generated."""
+        
+        start1 = time.time()
+        if not isinstance(geometry, list):
+            geometry = [geometry]
+        self.boxes = [self.structure.getMortonBox(geom) for geom in geometry]
+        morPrep = time.time() - start1
+        return len(self.boxes), morPrep, 0
+    
+    def getDataTables(self, cursor):
+        """
+        Returns the tables with the points: the IOT and, with the delta update,
+        the delta IOT with the epochs that are not merged yet.
+        """
+        tables = [self.iotTableName]
+        if self.update == 'delta' and ora.tableExists(cursor, self.getDeltaTable()):
+            tables.append(self.getDeltaTable())
+        return tables
+    
+    def skipScan(self, cursor):
+        """
+        Fetches the points in the morton boxes by scanning the IOT in morton 
+        order. When a fetched morton code leaves the box the scan continues 
+        from the next code in the box (BIGMIN). The rows are fetched in 
+        batches and the IOT is only sought again when a whole batch ends 
+        before that code.
+        
+        Every table of the points is scanned in turn.
+        
+        Returns the fetched rows and the number of seeks.
+        """
+        
+        masks = morton.dimensionMasks(self.structure.bits)
+        m = self.columnNames.index('morton')
+        cursor.arraysize = self.scanBatch
+        result = []
+        seeks = 0
+        for (table, (minCode, maxCode)) in [(table, box) for table in self.getDataTables(cursor) for box in self.boxes]:
+            query = "SELECT " + ', '.join(self.columnNames) + " FROM " + table + """
+WHERE morton BETWEEN :low AND :upper ORDER BY morton"""
+            low = minCode
+            while low is not None:
+                cursor.execute(query, low = low, upper = maxCode)
+                seeks += 1
+                nextCode, low = low, None
+                rows = cursor.fetchmany()
+                while rows:
+                    for row in rows:
+                        code = int(row[m])
+                        if code < nextCode:
+                            continue
+                        if morton.InMortonBox(code, minCode, maxCode, masks):
+                            result.append(row)
+                        else:
+                            nextCode = morton.BigMin(code, minCode, maxCode, self.structure.bits)
+                            if nextCode is None:
+                                break
+                    if nextCode is None:
+                        break
+                    if int(rows[-1][m]) < nextCode:
+                        low = nextCode
+                        break
+                    rows = cursor.fetchmany()
+        return result, seeks
+
     def pointInPolygon(self, tempName, qid, check = False):
         """
         The point in polygon function. This function is the validation step 
@@ -458,24 +560,33 @@ ora.getAlias("""TO_DATE(TIME, 'yyyy/mm/dd')""", 'TIME')], zWhere) + ')'
         #       First approximation of query region
         #========================================================================
 
-        if whereStatement is not '':
-            if rangeTab is not None:
-                query = "SELECT " + ora.getHintStatement(['USE_NL (t r)', ora.getParallelStringQuery(self.numProcesses)]) + \
+        if self.boxes:
+            start1 = time.time()
+            result, _ = self.skipScan(cursor)
+            lst.append(round(time.time() - start1, 10)) # fetching
+        elif whereStatement != '':
+            queries = []
+            # the delta IOT is queried like the IOT
+            for table in self.getDataTables(cursor):
+                if rangeTab is not None:
+                    queries.append("SELECT " + ora.getHintStatement(['USE_NL (t r)', ora.getParallelStringQuery(self.numProcesses)]) + \
 " " + ', '.join(['t.'+ i for i in self.columnNames]) + """
-FROM """ + self.iotTableName + " t, " + rangeTab + """ r 
-""" + whereStatement
+FROM """ + table + " t, " + rangeTab + """ r 
+""" + whereStatement)
 
-            else:
-                query = "SELECT "+ ora.getHintStatement([ora.getParallelStringQuery(self.numProcesses)]) + ', '.join(self.columnNames) + """ 
-FROM """ + self.iotTableName + """ 
-""" + whereStatement
+                else:
+                    queries.append("SELECT "+ ora.getHintStatement([ora.getParallelStringQuery(self.numProcesses)]) + ', '.join(self.columnNames) + """ 
+FROM """ + table + """ 
+""" + whereStatement)
+            query = "\nUNION ALL\n".join(queries)
 
             start1 = time.time()
             ora.mogrifyExecute(cursor, query)
             result = cursor.fetchall()
 
             lst.append(round(time.time() - start1, 10)) # fetching
-            
+        
+        if self.boxes or whereStatement != '':
             if (self.integration == 'loose' and self.qtype.lower() != 'time') or self.integration == 'deep':
                 qTable = self.queryTable + '_temp_' + qid
             else:      
@@ -555,45 +666,35 @@ FROM (
         """
         Decode the morton codes according to the specified integration of space 
         and time and the granularity of time.
+        
+        The fetched rows are split into columns and every column is decoded 
+        at once.
         """
-        if self.case ==  1:
-            if self.granularity == 'day':
-                return map(lambda x: [reader.formatTime(reader.inverseDaySinceEpoch(int(x[0]/self.scale))),
-                                      reader.morton2coordsX2D(x[1], self.offx, self.scalex, self.roundNum), 
-                                      reader.morton2coordsY2D(x[1], self.offy, self.scaley, self.roundNum), x[2]], result)
-            else:
-                return map(lambda x: [int(x[0]/self.scale), reader.morton2coordsX2D(x[1], self.offx, self.scalex, self.roundNum), 
-                                      reader.morton2coordsY2D(x[1], self.offy, self.scaley, self.roundNum), x[2]], result)
+        if len(result) == 0:
+            return []
+        columns = zip(*result)
+        if self.case == 1:
+            t = np.asarray(columns[0])
+            x, y = reader.morton2coords2DArray(columns[1], self.offx, self.offy, self.scalex, self.scaley, self.roundNum)
+            z = np.asarray(columns[2])
         elif self.case == 2:
-            if self.granularity == 'day':
-                return map(lambda x: [reader.formatTime(reader.inverseDaySinceEpoch(int(x[0]/self.scale))), 
-                                      reader.morton2coordsX3D(x[1], self.offx, self.scalex, self.roundNum), 
-                                        reader.morton2coordsY3D(x[1], self.offy, self.scaley, self.roundNum), 
-                                        reader.morton2coordsZ3D(x[1], self.offz, self.scalez, self.roundNum)], result)
-            else:
-                return map(lambda x: [int(x[0]/self.scale), reader.morton2coordsX3D(x[1], self.offx, self.scalex, self.roundNum), 
-                                      reader.morton2coordsY3D(x[1], self.offy, self.scaley, self.roundNum), 
-                                        reader.morton2coordsZ3D(x[1], self.offz, self.scalez, self.roundNum)], result)
+            t = np.asarray(columns[0])
+            x, y, z = reader.morton2coords3DArray(columns[1], self.offx, self.offy, self.offz, self.scalex, self.scaley, self.scalez, self.roundNum)
+        elif self.case == 3 and self.bits is not None:
+            t, x, y = reader.morton2coordsBitsArray(columns[0], [0, self.offx, self.offy], [1, self.scalex, self.scaley], self.bits, self.roundNum)
+            z = np.asarray(columns[1])
         elif self.case == 3:
-            if self.granularity == 'day':
-                return map(lambda x: [reader.formatTime(reader.inverseDaySinceEpoch(int(reader.morton2coordst3D(x[0])/self.scale))), 
-                                      reader.morton2coordsY3D(x[0], self.offx, self.scalex, self.roundNum),
-                                    reader.morton2coordsZ3D(x[0], self.offy, self.scaley, self.roundNum), x[1]], result)
-            else:
-                return map(lambda x: [int(reader.morton2coordst3D(x[0])/self.scale), 
-                                      reader.morton2coordsY3D(x[0], self.offx, self.scalex, self.roundNum), 
-                                    reader.morton2coordsZ3D(x[0], self.offy, self.scaley, self.roundNum), x[1]], result)
+            t, x, y = reader.morton2coords3DArray(columns[0], 0, self.offx, self.offy, 1, self.scalex, self.scaley, self.roundNum)
+            z = np.asarray(columns[1])
+        elif self.case == 4 and self.bits is not None:
+            t, x, y, z = reader.morton2coordsBitsArray(columns[0], [0, self.offx, self.offy, self.offz], [1, self.scalex, self.scaley, self.scalez], self.bits, self.roundNum)
         elif self.case == 4:
-            if self.granularity == 'day':
-                return map(lambda x: [reader.formatTime(reader.inverseDaySinceEpoch(int(reader.morton2coordst4D(x[0])/self.scale))), 
-                                      reader.morton2coordsX4D(x[0], self.offx, self.scalex, self.roundNum), 
-                                    reader.morton2coordsY4D(x[0], self.offy, self.scaley, self.roundNum), 
-                                    reader.morton2coordsZ4D(x[0], self.offz, self.scalez, self.roundNum)], result)
-            else:
-                return map(lambda x: [int(reader.morton2coordst4D(x[0])/self.scale), 
-                                      reader.morton2coordsX4D(x[0], self.offx, self.scalex, self.roundNum), 
-                                    reader.morton2coordsY4D(x[0], self.offy, self.scaley, self.roundNum), 
-                                    reader.morton2coordsZ4D(x[0], self.offz, self.scalez, self.roundNum)], result)
+            t, x, y, z = reader.morton2coords4DArray(columns[0], self.offx, self.offy, self.offz, self.scalex, self.scaley, self.scalez, self.roundNum)
+        
+        t = (t // self.scale).astype(np.int64)
+        if self.granularity == 'day':
+            t = reader.formatTimeArray(t)
+        return zip(t.tolist(), x.tolist(), y.tolist(), z.tolist())
     
     def list2ScaleOffset(self, lst):
         """
@@ -32,24 +32,67 @@ class Oracle:
         self.dataset = config.get('benchmark-options', 'dataset') #zandmotor, coastline
         self.db = config.get('benchmark-options', 'db')
         self.parse = config.get('benchmark-options', 'parse') #xyt, xyzt
-        self.loader = config.get('benchmark-options', 'loader') #sqlldr, external, incremental
+        self.loader = config.get('benchmark-options', 'loader') #sqlldr, external, arraybind, incremental
         self.integration = config.get('benchmark-options', 'integration') #loose, deep
         self.ORCLdirectory = config.get('data-dir', 'ORCLdirectory')
         self.directory = general.DIRS[self.ORCLdirectory]
         self.init = config.getboolean('benchmark-options', 'init') #true, false
-        self.update = config.get('benchmark-options', 'update') #dump, union, resort
+        self.update = config.get('benchmark-options', 'update') #dump, union, resort, delta
         self.scale = config.getint('benchmark-options', 'scale')
         self.granularity = config.get('benchmark-options', 'granularity') #day, year
         self.reload = config.getboolean('benchmark-options', 'reload') #true, false
+        self.codec = 'auto' #auto, magicbits, lut
+        if config.has_option('benchmark-options', 'codec') and config.get('benchmark-options', 'codec') != '':
+            self.codec = config.get('benchmark-options', 'codec')
+        self.presort = False #true, false
+        if config.has_option('benchmark-options', 'presort') and config.get('benchmark-options', 'presort') != '':
+            self.presort = config.getboolean('benchmark-options', 'presort')
+        self.sqlldrFormat = 'text' #text, binary
+        if config.has_option('benchmark-options', 'sqlldrFormat') and config.get('benchmark-options', 'sqlldrFormat') != '':
+            self.sqlldrFormat = config.get('benchmark-options', 'sqlldrFormat').lower()
+        self.externalMode = 'files' #files, preprocessor
+        if config.has_option('benchmark-options', 'externalMode') and config.get('benchmark-options', 'externalMode') != '':
+            self.externalMode = config.get('benchmark-options', 'externalMode').lower()
+        self.dedupe = False #true, false
+        if config.has_option('benchmark-options', 'dedupe') and config.get('benchmark-options', 'dedupe') != '':
+            self.dedupe = config.getboolean('benchmark-options', 'dedupe')
+        self.bits = None #e.g. 12, auto, auto for t, x, y of the deep integration
+        if config.has_option('benchmark-options', 'bits') and config.get('benchmark-options', 'bits') != '':
+            self.bits = [b if b == 'auto' else int(b) for b in config.get('benchmark-options', 'bits').replace(' ', '').lower().split(',')]
         
         if self.integration not in ['deep', 'loose']:
             raise Exception('ERROR: Not supported data structure')
-        if self.clustering.lower() not in ['morton']:
-            raise Exception('ERROR: Currently only supporting morton')
+        if self.clustering.lower() not in ['morton', 'hilbert']:
+            raise Exception('ERROR: Not supported clustering. Use either morton or hilbert')
+        if self.clustering.lower() == 'hilbert' and self.bits is not None:
+            raise Exception('ERROR: The bits per dimension are only supported by the morton clustering')
         if self.format not in general.PC_FILE_FORMATS:
             raise Exception('ERROR: Not supported format. Use either las or laz')
         if self.parse.lower() not in ['xyt', 'xyzt']:
             raise Exception('ERROR: Cannot parse specified object. Use either xyt or xyzt')
+        if self.codec.lower() not in ['auto', 'magicbits', 'lut']:
+            raise Exception('ERROR: Not supported codec. Use auto, magicbits or lut')
+        if self.presort and self.loader != 'sqlldr':
+            raise Exception('ERROR: Presorting is only supported by the sqlldr loader')
+        if self.sqlldrFormat not in ['text', 'binary']:
+            raise Exception('ERROR: Not supported sqlldr format. Use either text or binary')
+        if self.sqlldrFormat == 'binary' and self.loader not in ['sqlldr', 'incremental']:
+            raise Exception('ERROR: The binary format is only supported by the sqlldr and the incremental loader')
+        if self.loader == 'incremental' and self.integration != 'loose':
+            raise Exception('ERROR: The incremental loader partitions on the time of the loose integration')
+        if self.update == 'delta' and self.loader not in ['sqlldr', 'arraybind']:
+            raise Exception('ERROR: The delta update is only supported by the sqlldr and the arraybind loader')
+        if self.externalMode not in ['files', 'preprocessor']:
+            raise Exception('ERROR: Not supported external mode. Use either files or preprocessor')
+        if self.externalMode == 'preprocessor' and self.loader != 'external':
+            raise Exception('ERROR: The preprocessor mode is only supported by the external loader')
+        if self.bits is not None:
+            if self.integration != 'deep':
+                raise Exception('ERROR: The bits per dimension are only supported by the deep integration')
+            if len(self.bits) != len(self.parse):
+                raise Exception('ERROR: Specify the bits of every dimension in the order t, x, y(, z)')
+            if [b for b in self.bits if b != 'auto' and not 1 <= b <= 31]:
+                raise Exception('ERROR: The bits of a dimension must be between 1 and 31 or auto')
         
         # Database connection        
         self.user = config.get(self.db, 'User')
@@ -66,6 +109,40 @@ class Oracle:
         self.tempTableSpace = config.get('database','tempTableSpace')
         # Number of processes for loading
         self.numProcesses = config.getint('database','numProcesses')
+        # Number of processes for the morton conversion
+        self.encodeProcesses = self.numProcesses
+        if config.has_option('database', 'encodeProcesses') and config.get('database', 'encodeProcesses') != '':
+            self.encodeProcesses = config.getint('database', 'encodeProcesses')
+        # Number of points converted at a time, empty for whole files. The laz
+        # files are streamed from laszip, so only a chunk is in memory
+        self.chunkSize = None
+        if config.has_option('database', 'chunkSize') and config.get('database', 'chunkSize') != '':
+            self.chunkSize = config.getint('database', 'chunkSize')
+        # Number of chunks that can wait between two stages of the converter 
+        # pipeline, empty to run the stages one after the other
+        self.pipelineDepth = None
+        if config.has_option('database', 'pipelineDepth') and config.get('database', 'pipelineDepth') != '':
+            self.pipelineDepth = config.getint('database', 'pipelineDepth')
+        # Number of rows of an array bound insert and number of insert sessions
+        self.batchSize = 50000
+        if config.has_option('database', 'batchSize') and config.get('database', 'batchSize') != '':
+            self.batchSize = config.getint('database', 'batchSize')
+        self.insertSessions = 1
+        if config.has_option('database', 'insertSessions') and config.get('database', 'insertSessions') != '':
+            self.insertSessions = config.getint('database', 'insertSessions')
+        # Size in MB of the delta IOT above which the merge job folds it into 
+        # the IOT, for the delta update
+        self.deltaMergeSize = 1024
+        if config.has_option('database', 'deltaMergeSize') and config.get('database', 'deltaMergeSize') != '':
+            self.deltaMergeSize = config.getfloat('database', 'deltaMergeSize')
+        # Directory of the cache of the encoded las files, empty for no cache
+        self.cacheDir = None
+        if config.has_option('database', 'cacheDir') and config.get('database', 'cacheDir') != '':
+            self.cacheDir = config.get('database', 'cacheDir')
+        # Number of files converted at the same time, one file per process
+        self.fileProcesses = 1
+        if config.has_option('database', 'fileProcesses') and config.get('database', 'fileProcesses') != '':
+            self.fileProcesses = config.getint('database', 'fileProcesses')
         
         # table columns
         if self.integration.lower() == "loose":
@@ -83,17 +160,23 @@ class Oracle:
         self.cols = self.eqColumns() #e.g. ['m', 't', 'z']
         self.columnNames = [i[0] for i in self.columns]
         
-        # name depending on the type of loader
+        # name depending on the type of loader, the hilbert tables are tagged
+        curve = 'h' if self.clustering.lower() == 'hilbert' else ''
         if self.loader == 'external':
-            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) +"_temp_ext"
-            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + '_ext' 
+            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + "_temp_ext"
+            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + '_ext' 
             self.metaTable = 'meta' + self.iotTableName
         elif self.loader == 'sqlldr':
-            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) +"_temp"
-            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale)
+            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + "_temp"
+            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve
             self.metaTable = 'meta_' + self.iotTableName
+        elif self.loader == 'arraybind':
+            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + "_temp_arr"
+            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + '_arr'
+            self.metaTable = 'meta' + self.iotTableName
         elif self.loader == 'incremental':
-            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + "_incr"
+            self.tableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + "_temp_incr"
+            self.iotTableName = self.dataset[0] + self.integration[0] + self.parse + str(self.scale) + curve + "_incr"
             self.metaTable = 'meta' + self.iotTableName
         
             
@@ -118,6 +201,49 @@ class Oracle:
         else:
             return (columnName,)
     
+    def getBinaryFields(self):
+        """
+        Gets the fields of the records of the binary sqlldr stream. Every column
+        gives its database name and a list of (field name, sqlldr type, numpy 
+        type). The integer columns wider than general.SQLLDR_MAX_DIGITS are 
+        split in a high and a low word.
+        """
+        fields = []
+        for i in range(len(self.cols)):
+            columnName = self.getDBColumn(i)[0]
+            sqlType, width = general.DM_SQLLDR[self.cols[i]]
+            ctype, ntype = general.DM_SQLLDR_BINARY[sqlType]
+            if sqlType == 'integer' and width > general.SQLLDR_MAX_DIGITS:
+                fields.append((columnName, [(columnName + '_hi', ctype, ntype), 
+                                            (columnName + '_lo', ctype, ntype)]))
+            else:
+                fields.append((columnName, [(columnName, ctype, ntype)]))
+        return fields
+    
+    def getExternalFiles(self):
+        """
+        Gets the files of the external table, one file per parallel process. 
+        The converter fills the text files to about the same size or, in the 
+        preprocessor mode, lists las files of about the same total size in 
+        every location file.
+        """
+        extension = 'loc' if self.externalMode == 'preprocessor' else 'txt'
+        return ['{0}_{1}.{2}'.format(self.tableName, i, extension) for i in range(max(1, self.numProcesses))]
+    
+    def getDeltaTable(self):
+        """
+        Gets the delta IOT of the delta update, it takes the new epochs until 
+        the merge job folds it into the IOT.
+        """
+        return self.iotTableName + '_delta'
+    
+    def getPreprocessor(self):
+        """
+        Gets the script that converts the las files of a location file for 
+        the external table in the preprocessor mode.
+        """
+        return self.tableName + '.sh'
+    
     def getConnectString(self, superUser = False):
         """
         Gets a connection string to establish a database connection.
@@ -6,76 +6,139 @@ Created on Sun Jan 03 20:20 2016
 
 Command line executable to remove duplicates. Only one folder per run.
 
-This module takes a laz, las file and removes duplicate points in the 
+This module takes las, laz files and removes duplicate points in the
 (x,y) dimensions. This is an important preprocessing step because the IOT
 does not allow duplicates in the index.
+
+The converter removes the duplicate keys itself with the dedupe option of
+the benchmark-options, without this extra pass over the files.
+
+The duplicates are found on the integer X and Y records of the file, the
+coordinates at the resolution of the file, with a sort of their combined
+64 bit keys. The keys are built chunk by chunk from the memory mapped
+records, so the float coordinates are never created. The first point of
+every (X, Y) is kept with all its attributes, in the order of the file. The
+files are processed in parallel, one file per process.
 """
 
 import numpy as np
-from pandas import DataFrame
 import time
 from laspy.file import File
+from multiprocessing import Pool
 import os
 from pointcloud.reader import readFileLaspy
-from pointcloud.utils import getFiles
+from pointcloud.general import getFiles, PC_FILE_FORMATS
 import sys, getopt
 
-def removeDuplicate(file):
-    """Removes duplicate points based on X, Y coordinates
+def quantizedKeys(fh, chunkSize = 1000000):
+    """Returns the int64 keys of the integer X and Y records of a file, X in
+    the high and Y in the low 32 bits. The records are read in chunks of
+    chunkSize points."""
+    numPoints = len(fh)
+    keys = np.empty(numPoints, dtype = np.int64)
+    X, Y = fh.X, fh.Y
+    for start in xrange(0, numPoints, chunkSize):
+        stop = start + chunkSize
+        keys[start:stop] = (X[start:stop].astype(np.int64) << 32) | (Y[start:stop].astype(np.int64) & 0xffffffff)
+    return keys
+
+def firstOccurrences(keys):
+    """Returns the sorted indices of the first occurrence of every key. The
+    stable sort of np.unique puts the first occurrence first."""
+    return np.sort(np.unique(keys, return_index = True)[1])
+
+def removeDuplicate(fh, chunkSize = 1000000):
+    """Removes duplicate points based on the X, Y records
 
-       Returns a numpy array"""
-    df = DataFrame(np.vstack((file.x, file.y, file.z)).transpose(), columns=['X', 'Y', 'Z'])
-    df.drop_duplicates(subset=['X','Y'], inplace=True)
-    return df.values
+       Returns the point records without the duplicates"""
+    keep = firstOccurrences(quantizedKeys(fh, chunkSize))
+    points = fh.points
+    if len(keep) == len(points):
+        return points
+    return points[keep]
 
-def writeFile(directory,name,header,coords):
-    """Write a laz file using laspy and numpy arrays"""
-    output = File(directory + name, mode = "w", header=header)
-    output.x = coords[0]
-    output.y = coords[1]
-    output.z = coords[2]
+def writeFile(directory, name, header, points):
+    """Write a las [laz] file with the point records using laspy"""
+    output = File(os.path.join(directory, name), mode = "w", header = header)
+    output.points = points
     output.close()
 
 def checkDirectory(directory):
     """ Checks if the specified directory exists, and otherwise it creates it"""
-    try: 
+    try:
         os.makedirs(directory)
     except OSError:
         if not os.path.isdir(directory):
             raise
 
-def lasDuplicateFree(directory, output):
+def fileDuplicateFree(job):
+    """Removes the duplicates of one file in a worker process.
+
+       Returns the name, the number of points, the number of removed points
+       and the time of the file"""
+    cfile, output, chunkSize = job
+    start = time.time()
+    fh = readFileLaspy(cfile)
+    numPoints = len(fh)
+    points = removeDuplicate(fh, chunkSize)
+    writeFile(output, os.path.basename(cfile), fh.header, points)
+    removed = numPoints - len(points)
+    fh.close()
+    return cfile, numPoints, removed, time.time() - start
+
+def lasDuplicateFree(directory, output, numProcesses = 1, chunkSize = 1000000):
     """ Takes a directory with las [laz] files and an output directory
 
-        Returns las, [laz] files free from duplicates"""
-    files = getFiles(directory,['laz'],True)
+        Returns las, [laz] files free from duplicates and the number of
+        points and of removed points"""
+    files = getFiles(directory, PC_FILE_FORMATS, True)
     checkDirectory(output)
-    for file in files:
-        print file
-        fh = readFileLaspy(file)
-        writeFile(output,file[file.rfind('\\')+1:],fh.header,removeDuplicate(fh).transpose())
+    jobs = [(cfile, output, chunkSize) for cfile in files]
+    pool = None
+    if numProcesses > 1:
+        pool = Pool(numProcesses)
+        results = pool.imap(fileDuplicateFree, jobs)
+    else:
+        results = (fileDuplicateFree(job) for job in jobs)
+    totalPoints, totalRemoved = 0, 0
+    print 'file points removed time points/s'
+    for cfile, numPoints, removed, seconds in results:
+        print os.path.basename(cfile), numPoints, removed, round(seconds, 2), int(numPoints / seconds) if seconds else 0
+        totalPoints += numPoints
+        totalRemoved += removed
+    if pool is not None:
+        pool.close()
+        pool.join()
+    return totalPoints, totalRemoved
 
 def main(argv):
     inputdir = ''
     outputdir = ''
-    try:                                
-        opts, args = getopt.getopt(argv, "hi:o:", ["help", "input=", "output="])
+    numProcesses = 1
+    chunkSize = 1000000
+    usage = 'lasduplicate.py -i <inputDirectory> -o <outputDirectory> [-p <processes>] [-c <chunkSize>]'
+    try:
+        opts, args = getopt.getopt(argv, "hi:o:p:c:", ["help", "input=", "output=", "processes=", "chunk="])
     except getopt.GetoptError:
-        print 'lasduplicate.py -i <inputDirectory> -o <outputDirectory>'
-        sys.exit(2)                     
+        print usage
+        sys.exit(2)
     for opt, arg in opts:
         if opt in ("-h", "--help"):
-            print argv[0] +' -i <inputDirectory> -o <outputDirectory>'
-            sys.exit()                  
+            print usage
+            sys.exit()
         elif opt in ("-i", "--input"):
-            inputdir = arg            
+            inputdir = arg
         elif opt in ("-o", "--output"):
             outputdir = arg
-    lasDuplicateFree(inputdir, outputdir)
+        elif opt in ("-p", "--processes"):
+            numProcesses = int(arg)
+        elif opt in ("-c", "--chunk"):
+            chunkSize = int(arg)
+    return lasDuplicateFree(inputdir, outputdir, numProcesses, chunkSize)
 
 if __name__ =="__main__":
     start = time.time()
-    main(sys.argv[1:])
+    numPoints, removed = main(sys.argv[1:])
     end = time.time()
-    print "Finished in ", end - start
-    #Example run: python duplicate.py -i D:\ -o D:\output\
+    print "Finished in ", end - start, "points", numPoints, "removed", removed
+    #Example run: python duplicate.py -i D:\ -o D:\output\ -p 4
@@ -37,6 +37,15 @@ DM_SQLLDR = {
     'UPPER': ('integer', 40),
     }
 
+# Native types of the binary sqlldr stream for the types of DM_SQLLDR. The 
+# integers wider than SQLLDR_MAX_DIGITS are split in words of SQLLDR_WORD_BITS
+DM_SQLLDR_BINARY = {
+    'integer': ('INTEGER(8)', 'i8'),
+    'float': ('DOUBLE', 'f8'),
+    }
+SQLLDR_MAX_DIGITS = 18
+SQLLDR_WORD_BITS = 62
+
 DM_FLAT = { # The name of the column in the DB is computed with getDBColumn
     'x': 'NUMBER',
     'y': 'NUMBER',
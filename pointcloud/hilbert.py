@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Hilbert curve keys in 2D, 3D and 4D. The coordinates are transformed to the
+transposed Hilbert index with the algorithm of J. Skilling, "Programming the
+Hilbert curve" (2004), and the bits of the transposed index are interleaved
+with the morton functions. The keys have the same size as the morton keys:
+62 bits in 2D, 93 bits in 3D and 124 bits in 4D, with 31 bits per dimension.
+Unlike the morton code the Hilbert key depends on the number of bits, so the
+keys are always computed with HILBERT_BITS bits.
+"""
+import pointcloud.morton as morton
+import numpy as np
+
+HILBERT_BITS = 31
+
+###############################################################################
+######################     Transposed Hilbert index      ######################
+###############################################################################
+
+def axesToTranspose(coords, numBits = HILBERT_BITS):
+    """
+    Transforms the coordinates to the transposed Hilbert index
+
+    Args:
+        coords (list): int64 arrays of the dimensions
+        numBits (int): the number of bits of every dimension
+
+    Returns:
+        list: int64 arrays of the transposed Hilbert index
+    """
+    X = [np.array(c, dtype = np.int64) for c in coords]
+    n = len(X)
+    M = 1 << (numBits - 1)
+    # inverse undo
+    Q = M
+    while Q > 1:
+        P = Q - 1
+        for i in range(n):
+            invert = (X[i] & Q) != 0
+            t = np.where(invert, 0, (X[0] ^ X[i]) & P)
+            X[0] = np.where(invert, X[0] ^ P, X[0] ^ t)
+            X[i] = X[i] ^ t
+        Q >>= 1
+    # gray encode
+    for i in range(1, n):
+        X[i] ^= X[i - 1]
+    t = np.zeros_like(X[0])
+    Q = M
+    while Q > 1:
+        t = np.where((X[n - 1] & Q) != 0, t ^ (Q - 1), t)
+        Q >>= 1
+    return [x ^ t for x in X]
+
+def transposeToAxes(transpose, numBits = HILBERT_BITS):
+    """
+    Transforms the transposed Hilbert index to the coordinates
+
+    Args:
+        transpose (list): int64 arrays of the transposed Hilbert index
+        numBits (int): the number of bits of every dimension
+
+    Returns:
+        list: int64 arrays of the dimensions
+    """
+    X = [np.array(c, dtype = np.int64) for c in transpose]
+    n = len(X)
+    N = 2 << (numBits - 1)
+    # gray decode
+    t = X[n - 1] >> 1
+    for i in range(n - 1, 0, -1):
+        X[i] ^= X[i - 1]
+    X[0] ^= t
+    # undo excess work
+    Q = 2
+    while Q != N:
+        P = Q - 1
+        for i in range(n - 1, -1, -1):
+            invert = (X[i] & Q) != 0
+            t = np.where(invert, 0, (X[0] ^ X[i]) & P)
+            X[0] = np.where(invert, X[0] ^ P, X[0] ^ t)
+            X[i] = X[i] ^ t
+        Q <<= 1
+    return X
+
+# The most significant bit of every group of the Hilbert key belongs to the
+# first dimension of the transposed index, in the morton code to the last one.
+
+###############################################################################
+######################      Hilbert conversion in 2D     ######################
+###############################################################################
+
+def EncodeHilbert2DArray(x, y):
+    """
+    Calculates the 2D Hilbert keys from arrays of the x, y dimensions
+
+    Args:
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the y dimension
+
+    Returns:
+        numpy.ndarray: int64 array of 2D Hilbert keys
+    """
+    X = axesToTranspose([morton.toPositiveArray(x), morton.toPositiveArray(y)])
+    return morton.EncodeMorton2DArray(X[1], X[0])
+
+def DecodeHilbert2DArray(hilbertKeys):
+    """
+    Calculates the x, y coordinates from an array of 2D Hilbert keys
+
+    Args:
+        hilbertKeys (array like): the 2D Hilbert keys
+
+    Returns:
+        tuple: int64 arrays of the x and y coordinates
+    """
+    X1, X0 = morton.DecodeMorton2DArray(hilbertKeys)
+    return tuple(transposeToAxes([X0, X1]))
+
+###############################################################################
+######################      Hilbert conversion in 3D     ######################
+###############################################################################
+
+def EncodeHilbert3DWords(x, y, z):
+    """
+    Calculates the two-word 93 bit 3D Hilbert keys from arrays of the x, y, z
+    dimensions
+
+    Args:
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the y dimension
+        z (numpy.ndarray): the z dimension
+
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 3D Hilbert keys
+    """
+    X = axesToTranspose([morton.toPositiveArray(v) for v in (x, y, z)])
+    return morton.EncodeMorton3DWords(X[2], X[1], X[0])
+
+def DecodeHilbert3DWords(words):
+    """
+    Calculates the x, y, z coordinates from two-word 93 bit Hilbert keys
+
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 3D Hilbert keys
+
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    X2, X1, X0 = morton.DecodeMorton3DWords(words)
+    return tuple(transposeToAxes([X0, X1, X2]))
+
+def EncodeHilbert3DArray(x, y, z):
+    """
+    Calculates the 93 bit 3D Hilbert keys from arrays of the x, y, z dimensions
+
+    Args:
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the y dimension
+        z (numpy.ndarray): the z dimension
+
+    Returns:
+        numpy.ndarray: object array of 93 bit Hilbert keys
+    """
+    return morton.WordsToLong(EncodeHilbert3DWords(x, y, z))
+
+def DecodeHilbert3DArray(hilbertKeys):
+    """
+    Calculates the x, y, z coordinates from an array of 93 bit Hilbert keys
+
+    Args:
+        hilbertKeys (array like): the 93 bit Hilbert keys
+
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    return DecodeHilbert3DWords(morton.LongToWords(hilbertKeys))
+
+###############################################################################
+######################      Hilbert conversion in 4D     ######################
+###############################################################################
+
+def EncodeHilbert4DWords(x, y, z, t):
+    """
+    Calculates the two-word 124 bit 4D Hilbert keys from arrays of four
+    dimensions. The order of the dimensions follows EncodeMorton4DWords.
+
+    Args:
+        x (numpy.ndarray): the first dimension
+        y (numpy.ndarray): the second dimension
+        z (numpy.ndarray): the third dimension
+        t (numpy.ndarray): the fourth dimension
+
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 4D Hilbert keys
+    """
+    X = axesToTranspose([morton.toPositiveArray(v) for v in (x, y, z, t)])
+    return morton.EncodeMorton4DWords(X[3], X[2], X[1], X[0])
+
+def DecodeHilbert4DWords(words):
+    """
+    Calculates the coordinates from two-word 124 bit Hilbert keys. The order
+    of the dimensions follows EncodeHilbert4DWords.
+
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 4D Hilbert keys
+
+    Returns:
+        tuple: int64 arrays of the four dimensions
+    """
+    X3, X2, X1, X0 = morton.DecodeMorton4DWords(words)
+    return tuple(transposeToAxes([X0, X1, X2, X3]))
+
+def EncodeHilbert4DArray(x, y, z, t):
+    """
+    Calculates the 124 bit 4D Hilbert keys from arrays of four dimensions. The
+    order of the dimensions follows EncodeMorton4DWords.
+
+    Args:
+        x (numpy.ndarray): the first dimension
+        y (numpy.ndarray): the second dimension
+        z (numpy.ndarray): the third dimension
+        t (numpy.ndarray): the fourth dimension
+
+    Returns:
+        numpy.ndarray: object array of 124 bit Hilbert keys
+    """
+    return morton.WordsToLong(EncodeHilbert4DWords(x, y, z, t))
+
+def DecodeHilbert4DArray(hilbertKeys):
+    """
+    Calculates the coordinates from an array of 124 bit Hilbert keys. The
+    order of the dimensions follows EncodeHilbert4DWords.
+
+    Args:
+        hilbertKeys (array like): the 124 bit Hilbert keys
+
+    Returns:
+        tuple: int64 arrays of the four dimensions
+    """
+    return DecodeHilbert4DWords(morton.LongToWords(hilbertKeys))
+
+###############################################################################
+######################    Hilbert conversion of points   ######################
+###############################################################################
+
+def EncodeHilbertArray(coords):
+    """
+    Calculates the Hilbert keys from arrays of 2, 3 or 4 dimensions
+
+    Args:
+        coords (list): the arrays of the dimensions
+
+    Returns:
+        numpy.ndarray: int64 array in 2D, object array in 3D and 4D
+    """
+    if len(coords) == 2:
+        return EncodeHilbert2DArray(*coords)
+    elif len(coords) == 3:
+        return EncodeHilbert3DArray(*coords)
+    elif len(coords) == 4:
+        return EncodeHilbert4DArray(*coords)
+    raise Exception("""ERROR: Hilbert keys are supported in 2, 3 and 4 dimensions""")
+
+def EncodeHilbert(coords):
+    """
+    Calculates the Hilbert key of a point in 2, 3 or 4 dimensions
+
+    Args:
+        coords (list): the dimensions of the point
+
+    Returns:
+        int: the Hilbert key
+    """
+    return int(EncodeHilbertArray([np.array([c], dtype = np.int64) for c in coords])[0])
+
+def DecodeHilbert(hilbertKey, numDims):
+    """
+    Calculates the dimensions of a Hilbert key
+
+    Args:
+        hilbertKey (int): the Hilbert key
+        numDims (int): the number of dimensions, 2, 3 or 4
+
+    Returns:
+        tuple: the dimensions of the point
+    """
+    if numDims == 2:
+        coords = DecodeHilbert2DArray([hilbertKey])
+    elif numDims == 3:
+        coords = DecodeHilbert3DArray([hilbertKey])
+    elif numDims == 4:
+        coords = DecodeHilbert4DArray([hilbertKey])
+    else:
+        raise Exception("""ERROR: Hilbert keys are supported in 2, 3 and 4 dimensions""")
+    return tuple(int(c[0]) for c in coords)
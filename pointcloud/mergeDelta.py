@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Merge job of the delta update. The loads of the delta update add the new
+epochs to a small delta IOT next to the IOT, so their cost depends on the
+size of the delta IOT and not on the size of the IOT. This job merges the
+delta IOT into the IOT once it is larger than deltaMergeSize MB, or always
+with force, and drops it. The queries read the union of both tables in the
+meantime.
+
+The job must not run at the same time as a load of the same configuration,
+schedule it between the loads (e.g. with cron).
+
+Usage: python -m pointcloud.mergeDelta configuration [force]
+"""
+from pointcloud.AbstractBulkLoader import BulkLoader
+import time
+import sys
+
+def main(configuration, force = False):
+    bulk = BulkLoader(configuration)
+    if bulk.update != 'delta':
+        raise Exception('ERROR: The merge job needs the delta update')
+    start = time.time()
+    merged = bulk.merging(force)
+    print 'merged', merged, 'time', round(time.time() - start, 2)
+    return merged
+
+if __name__ == "__main__":
+    main(sys.argv[1], len(sys.argv) > 2 and sys.argv[2] == 'force')
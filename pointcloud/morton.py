@@ -8,12 +8,13 @@
 #    Source: Stackoverflow http://bit.ly/1YrXQdj                               #
 ################################################################################
 from numba import jit, int32, int64
+import numpy as np
 
 ###############################################################################
 ######################      Morton conversion in 2D      ######################
 ###############################################################################
 
-@jit(int64(int32))
+@jit(int64(int32), cache = True)
 def Expand2D(n):
     """
     Encodes the 64 bit morton code for a 31 bit number in the 2D space using
@@ -40,7 +41,7 @@ def Expand2D(n):
     b = (b ^ (b <<  1))  & 0x5555555555555555
     return b
 
-@jit(int64(int32, int32))
+@jit(int64(int32, int32), cache = True)
 def EncodeMorton2D(x, y):
     """
     Calculates the 2D morton code from the x, y dimensions
@@ -55,7 +56,7 @@ def EncodeMorton2D(x, y):
     """
     return Expand2D(x) + (Expand2D(y) << 1)
 
-@jit(int32(int64))
+@jit(int32(int64), cache = True)
 def Compact2D(m):
     """
     Decodes the 64 bit morton code into a 32 bit number in the 2D space using
@@ -81,7 +82,7 @@ def Compact2D(m):
     m = (m ^ (m >> 16)) & 0x00000000ffffffff
     return m
 
-@jit(int32(int64))
+@jit(int32(int64), cache = True)
 def DecodeMorton2DX(mortonCode):
     """
     Calculates the x coordinate from a 64 bit morton code
@@ -95,7 +96,7 @@ def DecodeMorton2DX(mortonCode):
     """
     return Compact2D(mortonCode)
 
-@jit(int32(int64))
+@jit(int32(int64), cache = True)
 def DecodeMorton2DY(mortonCode):
     """
     Calculates the y coordinate from a 64 bit morton code
@@ -114,7 +115,7 @@ def DecodeMorton2DY(mortonCode):
 ######################       21 bits per dimension       ######################
 ###############################################################################
 
-@jit(int64(int32))
+@jit(int64(int32), cache = True)
 def Expand3D_21bit(x):
     """
     Encodes the 64 bit morton code for a 21 bit number in the 3D space using
@@ -140,7 +141,7 @@ def Expand3D_21bit(x):
     x = (x ^ (x <<  2)) & 0x1249249249249249
     return x
 
-@jit(int32(int64))    
+@jit(int32(int64), cache = True)    
 def Compact3D_21bit(x):
     """
     Decodes the 64 bit morton code into a 21 bit number in the 3D space  using
@@ -166,7 +167,7 @@ def Compact3D_21bit(x):
     x = (x ^ (x >> 32)) & 0x00000000ffffffff
     return x
 
-@jit
+@jit(cache = True)
 def EncodeMorton3D_21bit(x, y, z):
     """
     Calculates the 3D morton code from the x, y, z dimensions
@@ -182,7 +183,7 @@ def EncodeMorton3D_21bit(x, y, z):
     """
     return Expand3D_21bit(x) + (Expand3D_21bit(y) << 1) + (Expand3D_21bit(z) << 2)
 
-@jit  
+@jit(cache = True)  
 def DecodeMorton3DX_21bit(mortonCode):
     """
     Calculates the x coordinate from a 64 bit morton code
@@ -196,7 +197,7 @@ def DecodeMorton3DX_21bit(mortonCode):
     """
     return Compact3D_21bit(mortonCode)
 
-@jit  
+@jit(cache = True)  
 def DecodeMorton3DY_21bit(mortonCode):
     """
     Calculates the y coordinate from a 64 bit morton code
@@ -210,7 +211,7 @@ def DecodeMorton3DY_21bit(mortonCode):
     """
     return Compact3D_21bit(mortonCode >> 1)
 
-@jit 
+@jit(cache = True) 
 def DecodeMorton3DZ_21bit(mortonCode):
     """
     Calculates the z coordinate from a 64 bit morton code
@@ -229,7 +230,7 @@ def DecodeMorton3DZ_21bit(mortonCode):
 ######################       31 bits per dimension       ######################
 ###############################################################################
 
-@jit
+@jit(cache = True)
 def Expand3D(x):
     """
     Encodes the 93 bit morton code for a 31 bit number in the 3D space using
@@ -341,7 +342,7 @@ def DecodeMorton3DZ(mortonCode):
 ######################      Morton conversion in 4D      ######################
 ###############################################################################
 
-@jit
+@jit(cache = True)
 def Expand4D(x):
     """
     Encodes the 124 bit morton code for a 31 bit number in the 4D space using
@@ -463,3 +464,699 @@ def DecodeMorton4DZ(mortonCode):
 
     """
     return Compact4D(mortonCode >> 3)
+
+###############################################################################
+######################    Vectorized morton conversion   ######################
+###############################################################################
+# The codes are computed on whole numpy arrays at once. Codes wider than 64 bits
+# (3D and 4D with 31 bits per dimension) are computed as two-word codes (see 
+# below) and only joined into python longs at the end.
+
+MASK_3D_21BIT = 0x1fffff
+MASK_4D_16BIT = 0xffff
+
+def toPositiveArray(n):
+    """
+    Converts the input into a 64 bit integer numpy array of 31 bit numbers
+    
+    Args:
+        n (array like): the dimension values
+        
+    Returns:
+        numpy.ndarray: int64 array with the 31 least significant bits of n
+        
+    Raises:
+        Exception: ERROR: Morton code is valid only for positive numbers
+    """
+    n = np.asarray(n, dtype = np.int64)
+    if (n < 0).any():
+        raise Exception("""ERROR: Morton code is valid only for positive numbers""")
+    return n & 0x7fffffff
+
+def Expand2DArray(n):
+    """
+    Encodes the 64 bit morton codes for an array of 31 bit numbers in the 2D 
+    space.
+    
+    Args:
+        n (numpy.ndarray): a 2D dimension
+        
+    Returns:
+        numpy.ndarray: int64 array of the expanded dimension
+    """
+    b = toPositiveArray(n)
+    b = (b ^ (b <<  16)) & 0x0000ffff0000ffff 
+    b = (b ^ (b <<  8))  & 0x00ff00ff00ff00ff 
+    b = (b ^ (b <<  4))  & 0x0f0f0f0f0f0f0f0f
+    b = (b ^ (b <<  2))  & 0x3333333333333333
+    b = (b ^ (b <<  1))  & 0x5555555555555555
+    return b
+
+def EncodeMorton2DArray(x, y):
+    """
+    Calculates the 2D morton codes from arrays of the x, y dimensions
+    
+    Args:
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the y dimension
+        
+    Returns:
+        numpy.ndarray: int64 array of 2D morton codes
+    """
+    return Expand2DArray(x) | (Expand2DArray(y) << 1)
+
+def Expand3DArray_21bit(x):
+    """
+    Encodes the 64 bit morton codes for an array of 21 bit numbers in the 3D
+    space.
+    
+    Args:
+        x (numpy.ndarray): int64 array of the requested 3D dimension
+        
+    Returns:
+        numpy.ndarray: int64 array of the expanded dimension
+    """
+    x = x & MASK_3D_21BIT
+    x = (x ^ (x << 32)) & 0x7fff00000000ffff 
+    x = (x ^ (x << 16)) & 0x00ff0000ff0000ff
+    x = (x ^ (x <<  8)) & 0x700f00f00f00f00f
+    x = (x ^ (x <<  4)) & 0x30c30c30c30c30c3
+    x = (x ^ (x <<  2)) & 0x1249249249249249
+    return x
+
+def EncodeMorton3DArray_21bit(x, y, z):
+    """
+    Calculates the 63 bit 3D morton codes from arrays of 21 bit x, y, z 
+    dimensions
+    
+    Args:
+        x (numpy.ndarray): int64 array of the x dimension
+        y (numpy.ndarray): int64 array of the y dimension
+        z (numpy.ndarray): int64 array of the z dimension
+        
+    Returns:
+        numpy.ndarray: int64 array of 3D morton codes
+    """
+    return Expand3DArray_21bit(x) | (Expand3DArray_21bit(y) << 1) | (Expand3DArray_21bit(z) << 2)
+
+def EncodeMorton3DArray(x, y, z):
+    """
+    Calculates the 93 bit 3D morton codes from arrays of the x, y, z dimensions.
+    
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        
+    Returns:
+        numpy.ndarray: object array of 93 bit morton codes
+    """
+    return WordsToLong(EncodeMorton3DWords(x, y, z))
+
+def Expand4DArray_16bit(x):
+    """
+    Encodes the 64 bit morton codes for an array of 16 bit numbers in the 4D
+    space.
+    
+    Args:
+        x (numpy.ndarray): int64 array of the requested 4D dimension
+        
+    Returns:
+        numpy.ndarray: uint64 array of the expanded dimension
+    """
+    x = (x & MASK_4D_16BIT).astype(np.uint64)
+    x = (x ^ (x << np.uint64(24))) & np.uint64(0x000000ff000000ff)
+    x = (x ^ (x << np.uint64(12))) & np.uint64(0x000f000f000f000f)
+    x = (x ^ (x << np.uint64(6))) & np.uint64(0x0303030303030303)
+    x = (x ^ (x << np.uint64(3))) & np.uint64(0x1111111111111111)
+    return x
+
+def EncodeMorton4DArray_16bit(x, y, z, t):
+    """
+    Calculates the 64 bit 4D morton codes from arrays of 16 bit x, y, z, t
+    dimensions
+    
+    Args:
+        x (numpy.ndarray): int64 array of the first dimension
+        y (numpy.ndarray): int64 array of the second dimension
+        z (numpy.ndarray): int64 array of the third dimension
+        t (numpy.ndarray): int64 array of the fourth dimension
+        
+    Returns:
+        numpy.ndarray: uint64 array of 4D morton codes
+    """
+    return Expand4DArray_16bit(x) | (Expand4DArray_16bit(y) << np.uint64(1)) | \
+        (Expand4DArray_16bit(z) << np.uint64(2)) | (Expand4DArray_16bit(t) << np.uint64(3))
+
+def EncodeMorton4DArray(x, y, z, t):
+    """
+    Calculates the 124 bit 4D morton codes from arrays of the x, y, z, t 
+    dimensions. The argument order follows EncodeMorton4D.
+    
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        t (numpy.ndarray): the time dimension of 31 bits
+        
+    Returns:
+        numpy.ndarray: object array of 124 bit morton codes
+    """
+    return WordsToLong(EncodeMorton4DWords(x, y, z, t))
+
+def Compact2DArray(m):
+    """
+    Decodes an array of 64 bit morton codes into 31 bit numbers in the 2D space.
+    
+    Args:
+        m (numpy.ndarray): int64 array of 2D morton codes
+        
+    Returns:
+        numpy.ndarray: int64 array of a dimension in 2D space
+    """
+    m = m & 0x5555555555555555
+    m = (m ^ (m >> 1))  & 0x3333333333333333
+    m = (m ^ (m >> 2))  & 0x0f0f0f0f0f0f0f0f
+    m = (m ^ (m >> 4))  & 0x00ff00ff00ff00ff
+    m = (m ^ (m >> 8))  & 0x0000ffff0000ffff
+    m = (m ^ (m >> 16)) & 0x00000000ffffffff
+    return m
+
+def DecodeMorton2DArray(mortonCodes):
+    """
+    Calculates the x, y coordinates from an array of 64 bit morton codes
+    
+    Args:
+        mortonCodes (array like): the 64 bit morton codes
+        
+    Returns:
+        tuple: int64 arrays of the x and y coordinates
+        
+    Raises:
+        Exception: ERROR: Morton code is always positive
+    """
+    m = np.asarray(mortonCodes, dtype = np.int64)
+    if (m < 0).any():
+        raise Exception("""ERROR: Morton code is always positive""")
+    return Compact2DArray(m), Compact2DArray(m >> 1)
+
+def Compact3DArray_21bit(x):
+    """
+    Decodes an array of 63 bit morton codes into 21 bit numbers in the 3D space.
+    
+    Args:
+        x (numpy.ndarray): int64 array of 3D morton codes
+        
+    Returns:
+        numpy.ndarray: int64 array of a dimension in 3D space
+    """
+    x = x & 0x1249249249249249
+    x = (x ^ (x >> 2)) & 0x30c30c30c30c30c3
+    x = (x ^ (x >> 4)) & 0x700f00f00f00f00f
+    x = (x ^ (x >> 8)) & 0x00ff0000ff0000ff
+    x = (x ^ (x >> 16)) & 0x7fff00000000ffff
+    x = (x ^ (x >> 32)) & MASK_3D_21BIT
+    return x
+
+def toLongArray(mortonCodes):
+    """
+    Converts the morton codes into an object array of python longs
+    
+    Args:
+        mortonCodes (array like): the morton codes
+        
+    Returns:
+        numpy.ndarray: object array of the morton codes
+        
+    Raises:
+        Exception: ERROR: Morton code is always positive
+    """
+    m = np.empty(len(mortonCodes), dtype = object)
+    m[:] = [long(i) for i in mortonCodes]
+    if (m < 0).any():
+        raise Exception("""ERROR: Morton code is always positive""")
+    return m
+
+def DecodeMorton3DArray(mortonCodes):
+    """
+    Calculates the x, y, z coordinates from an array of 93 bit morton codes
+    
+    Args:
+        mortonCodes (array like): the 93 bit morton codes
+        
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    return DecodeMorton3DWords(LongToWords(mortonCodes))
+
+def Compact4DArray_16bit(x):
+    """
+    Decodes an array of 64 bit morton codes into 16 bit numbers in the 4D space.
+    
+    Args:
+        x (numpy.ndarray): uint64 array of 4D morton codes
+        
+    Returns:
+        numpy.ndarray: int64 array of a dimension in 4D space
+    """
+    x = x & np.uint64(0x1111111111111111)
+    x = (x ^ (x >> np.uint64(3))) & np.uint64(0x0303030303030303)
+    x = (x ^ (x >> np.uint64(6))) & np.uint64(0x000f000f000f000f)
+    x = (x ^ (x >> np.uint64(12))) & np.uint64(0x000000ff000000ff)
+    x = (x ^ (x >> np.uint64(24))) & np.uint64(MASK_4D_16BIT)
+    return x.astype(np.int64)
+
+def DecodeMorton4DArray(mortonCodes):
+    """
+    Calculates the coordinates from an array of 124 bit morton codes. The order
+    of the dimensions follows EncodeMorton4D.
+    
+    Args:
+        mortonCodes (array like): the 124 bit morton codes
+        
+    Returns:
+        tuple: int64 arrays of the t, x, y and z coordinates
+    """
+    return DecodeMorton4DWords(LongToWords(mortonCodes))
+
+###############################################################################
+######################       Two-word morton codes       ######################
+###############################################################################
+# The 93 and 124 bit codes are stored as a pair of unsigned 64 bit words so that 
+# code = hi * 2**64 + lo. Every code takes a fixed 16 bytes and all operations
+# run on numpy arrays instead of python longs.
+
+MORTON_WORDS = np.dtype([('hi', np.uint64), ('lo', np.uint64)])
+WORD_MASK = 0xffffffffffffffff
+
+def toWords(hi, lo):
+    """
+    Packs the upper and lower words into a two-word morton code array
+    
+    Args:
+        hi (numpy.ndarray): the upper 64 bits of the codes
+        lo (numpy.ndarray): the lower 64 bits of the codes
+        
+    Returns:
+        numpy.ndarray: MORTON_WORDS array
+    """
+    words = np.empty(len(lo), dtype = MORTON_WORDS)
+    words['hi'] = hi
+    words['lo'] = lo
+    return words
+
+def LongToWords(mortonCodes):
+    """
+    Converts morton codes of up to 128 bits into two-word morton codes
+    
+    Args:
+        mortonCodes (array like or int): the morton codes
+        
+    Returns:
+        numpy.ndarray: MORTON_WORDS array
+    """
+    if isinstance(mortonCodes, np.ndarray) and mortonCodes.dtype == MORTON_WORDS:
+        return mortonCodes
+    if isinstance(mortonCodes, (int, long)):
+        mortonCodes = [mortonCodes]
+    m = toLongArray(mortonCodes)
+    return toWords((m >> 64).astype(np.uint64), (m & WORD_MASK).astype(np.uint64))
+
+def WordsToLong(words):
+    """
+    Converts two-word morton codes into python longs
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array
+        
+    Returns:
+        numpy.ndarray: object array of the morton codes
+    """
+    return (words['hi'].astype(object) << 64) | words['lo'].astype(object)
+
+def EncodeMorton3DWords(x, y, z):
+    """
+    Calculates the two-word 93 bit 3D morton codes from arrays of the x, y, z 
+    dimensions. The 21 least significant bits of every dimension give the 63 
+    lower bits of the code and the remaining 10 bits the upper 30 bits.
+    
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 3D morton codes
+    """
+    x, y, z = toPositiveArray(x), toPositiveArray(y), toPositiveArray(z)
+    lo = EncodeMorton3DArray_21bit(x, y, z).astype(np.uint64)
+    hi = EncodeMorton3DArray_21bit(x >> 21, y >> 21, z >> 21).astype(np.uint64)
+    return toWords(hi >> np.uint64(1), lo | (hi << np.uint64(63)))
+
+def DecodeMorton3DWords(words):
+    """
+    Calculates the x, y, z coordinates from two-word 93 bit morton codes
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 3D morton codes
+        
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    lo = (words['lo'] & np.uint64(0x7fffffffffffffff)).astype(np.int64)
+    hi = ((words['hi'] << np.uint64(1)) | (words['lo'] >> np.uint64(63))).astype(np.int64)
+    return tuple(Compact3DArray_21bit(lo >> i) | (Compact3DArray_21bit(hi >> i) << 21) for i in range(3))
+
+def EncodeMorton4DWords(x, y, z, t):
+    """
+    Calculates the two-word 124 bit 4D morton codes from arrays of the x, y, z,
+    t dimensions. The argument order follows EncodeMorton4D. The 16 least 
+    significant bits of every dimension give the lower word and the remaining 
+    15 bits the upper word.
+    
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        t (numpy.ndarray): the time dimension of 31 bits
+        
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 4D morton codes
+    """
+    x, y, z, t = toPositiveArray(x), toPositiveArray(y), toPositiveArray(z), toPositiveArray(t)
+    return toWords(EncodeMorton4DArray_16bit(x >> 16, y >> 16, z >> 16, t >> 16),
+                   EncodeMorton4DArray_16bit(x, y, z, t))
+
+def DecodeMorton4DWords(words):
+    """
+    Calculates the coordinates from two-word 124 bit morton codes. The order
+    of the dimensions follows EncodeMorton4D.
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 4D morton codes
+        
+    Returns:
+        tuple: int64 arrays of the t, x, y and z coordinates
+    """
+    return tuple(Compact4DArray_16bit(words['lo'] >> np.uint64(i)) | 
+                 (Compact4DArray_16bit(words['hi'] >> np.uint64(i)) << 16) for i in range(4))
+
+def CompareWords(a, b):
+    """
+    Compares two-word morton codes element-wise
+    
+    Args:
+        a (numpy.ndarray or int): the first morton codes
+        b (numpy.ndarray or int): the second morton codes
+        
+    Returns:
+        numpy.ndarray: int8 array with -1 if a < b, 0 if a == b and 1 if a > b
+    """
+    a, b = LongToWords(a), LongToWords(b)
+    greater = (a['hi'] > b['hi']) | ((a['hi'] == b['hi']) & (a['lo'] > b['lo']))
+    less = (a['hi'] < b['hi']) | ((a['hi'] == b['hi']) & (a['lo'] < b['lo']))
+    return greater.astype(np.int8) - less.astype(np.int8)
+
+def WordsBetween(words, low, upper):
+    """
+    Checks which two-word morton codes are contained in the range [low, upper]
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array
+        low (numpy.ndarray or int): the lower bound of the range
+        upper (numpy.ndarray or int): the upper bound of the range
+        
+    Returns:
+        numpy.ndarray: boolean array
+    """
+    return (CompareWords(words, low) >= 0) & (CompareWords(words, upper) <= 0)
+
+def WordsInRanges(words, mortonRanges):
+    """
+    Checks which two-word morton codes are contained in any of the morton ranges
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array
+        mortonRanges (list): the (low, upper) morton ranges
+        
+    Returns:
+        numpy.ndarray: boolean array
+    """
+    contained = np.zeros(len(words), dtype = bool)
+    for (low, upper) in mortonRanges:
+        contained |= WordsBetween(words, low, upper)
+    return contained
+
+def ArgsortWords(words):
+    """
+    Returns the indices that sort the two-word morton codes
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array
+        
+    Returns:
+        numpy.ndarray: the sorting indices
+    """
+    return np.lexsort((words['lo'], words['hi']))
+
+###############################################################################
+##################  Morton conversion with bits per dimension  ################
+###############################################################################
+# Every dimension has its own number of bits. The bits are interleaved from the 
+# least significant bit upwards and a dimension stops taking part once its bits
+# are used up. With equal bits the codes are the usual morton codes.
+
+def bitPositions(bits):
+    """
+    Computes where the bits of every dimension go in the morton code
+    
+    Args:
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        list: per dimension a list of (dimension bit, code bit) tuples
+    """
+    positions = [[] for b in bits]
+    pos = 0
+    for i in range(max(bits)):
+        for d in range(len(bits)):
+            if i < bits[d]:
+                positions[d].append((i, pos))
+                pos += 1
+    return positions
+
+def EncodeMortonBits(coords, bits):
+    """
+    Calculates the morton code of a point with the specified bits per dimension
+    
+    Args:
+        coords (list): the dimensions of the point
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        int: morton code of sum(bits) bits
+        
+    Raises:
+        Exception: ERROR: Morton code is valid only for positive numbers
+        Exception: ERROR: Dimension exceeds its number of bits
+    """
+    code = 0
+    for d, positions in enumerate(bitPositions(bits)):
+        if coords[d] < 0:
+            raise Exception("""ERROR: Morton code is valid only for positive numbers""")
+        if coords[d] >> bits[d]:
+            raise Exception("""ERROR: Dimension exceeds its number of bits""")
+        for (i, pos) in positions:
+            code |= ((coords[d] >> i) & 1) << pos
+    return code
+
+def DecodeMortonBits(mortonCode, bits):
+    """
+    Calculates the dimensions of a morton code with the specified bits per 
+    dimension
+    
+    Args:
+        mortonCode (int): the morton code
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        tuple: the dimensions of the point
+    """
+    coords = []
+    for positions in bitPositions(bits):
+        c = 0
+        for (i, pos) in positions:
+            c |= ((mortonCode >> pos) & 1) << i
+        coords.append(c)
+    return tuple(coords)
+
+def EncodeMortonBitsWords(coords, bits):
+    """
+    Calculates the two-word morton codes from arrays of the dimensions with the
+    specified bits per dimension
+    
+    Args:
+        coords (list): the arrays of the dimensions
+        bits (list): the number of bits of every dimension, 31 at most
+        
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of morton codes
+        
+    Raises:
+        Exception: ERROR: Dimension exceeds its number of bits
+    """
+    lo = np.zeros(len(coords[0]), dtype = np.uint64)
+    hi = np.zeros(len(coords[0]), dtype = np.uint64)
+    for d, positions in enumerate(bitPositions(bits)):
+        v = toPositiveArray(coords[d])
+        if (v >> bits[d]).any():
+            raise Exception("""ERROR: Dimension exceeds its number of bits""")
+        for (i, pos) in positions:
+            b = ((v >> i) & 1).astype(np.uint64)
+            if pos < 64:
+                lo |= b << np.uint64(pos)
+            else:
+                hi |= b << np.uint64(pos - 64)
+    return toWords(hi, lo)
+
+def DecodeMortonBitsWords(words, bits):
+    """
+    Calculates the dimensions from two-word morton codes with the specified 
+    bits per dimension
+    
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of morton codes
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        tuple: int64 arrays of the dimensions
+    """
+    coords = []
+    for positions in bitPositions(bits):
+        c = np.zeros(len(words), dtype = np.int64)
+        for (i, pos) in positions:
+            if pos < 64:
+                b = (words['lo'] >> np.uint64(pos)) & np.uint64(1)
+            else:
+                b = (words['hi'] >> np.uint64(pos - 64)) & np.uint64(1)
+            c |= b.astype(np.int64) << i
+        coords.append(c)
+    return tuple(coords)
+
+###############################################################################
+##################   Range search with BIGMIN and LITMAX   ####################
+###############################################################################
+# A query box is given by the morton codes of its lower and upper corner. When a
+# scan along the z-order curve leaves the box, BIGMIN is the next code that is 
+# in the box again and LITMAX is the last code in the box before the point that
+# left it (Tropf and Herzog, 1981). The functions take the bits per dimension, 
+# e.g. [31, 31] for 2D, [31, 31, 31] for 3D and [31, 31, 31, 31] for 4D codes.
+
+def dimensionMasks(bits):
+    """
+    Computes the masks with the morton code bits of every dimension
+    
+    Args:
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        list: the mask of every dimension
+    """
+    masks = []
+    for positions in bitPositions(bits):
+        mask = 0
+        for (i, pos) in positions:
+            mask |= 1 << pos
+        masks.append(mask)
+    return masks
+
+def InMortonBox(mortonCode, minCode, maxCode, masks):
+    """
+    Checks whether a morton code is in the box of the lower and upper corner 
+    codes. The bits of one dimension keep their order in the morton code, so 
+    the dimensions are compared without decoding.
+    
+    Args:
+        mortonCode (int): the morton code
+        minCode (int): the morton code of the lower corner of the box
+        maxCode (int): the morton code of the upper corner of the box
+        masks (list): the dimension masks, see dimensionMasks
+        
+    Returns:
+        bool: True if the code is in the box
+    """
+    for mask in masks:
+        if not minCode & mask <= mortonCode & mask <= maxCode & mask:
+            return False
+    return True
+
+def loadBits(code, pos, mask, ones):
+    """
+    Sets the bit pos of code to 1 and the lower bits of its dimension to 0 
+    (pattern 1000), or the other way around if ones is True (pattern 0111).
+    """
+    bit = 1 << pos
+    lower = mask & (bit - 1)
+    if ones:
+        return (code & ~bit) | lower
+    return (code & ~lower) | bit
+
+def BigMin(mortonCode, minCode, maxCode, bits):
+    """
+    Calculates the smallest morton code larger than mortonCode that is in the 
+    box of the lower and upper corner codes
+    
+    Args:
+        mortonCode (int): the morton code outside the box
+        minCode (int): the morton code of the lower corner of the box
+        maxCode (int): the morton code of the upper corner of the box
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        int: the next morton code in the box or None if there is none
+    """
+    masks = dimensionMasks(bits)
+    bigmin = None
+    for pos in range(sum(bits) - 1, -1, -1):
+        mask = [m for m in masks if m >> pos & 1][0]
+        state = (mortonCode >> pos & 1, minCode >> pos & 1, maxCode >> pos & 1)
+        if state == (0, 0, 1):
+            bigmin = loadBits(minCode, pos, mask, False)
+            maxCode = loadBits(maxCode, pos, mask, True)
+        elif state == (0, 1, 1):
+            return minCode
+        elif state == (1, 0, 0):
+            return bigmin
+        elif state == (1, 0, 1):
+            minCode = loadBits(minCode, pos, mask, False)
+    return bigmin
+
+def LitMax(mortonCode, minCode, maxCode, bits):
+    """
+    Calculates the largest morton code smaller than mortonCode that is in the 
+    box of the lower and upper corner codes
+    
+    Args:
+        mortonCode (int): the morton code outside the box
+        minCode (int): the morton code of the lower corner of the box
+        maxCode (int): the morton code of the upper corner of the box
+        bits (list): the number of bits of every dimension
+        
+    Returns:
+        int: the previous morton code in the box or None if there is none
+    """
+    masks = dimensionMasks(bits)
+    litmax = None
+    for pos in range(sum(bits) - 1, -1, -1):
+        mask = [m for m in masks if m >> pos & 1][0]
+        state = (mortonCode >> pos & 1, minCode >> pos & 1, maxCode >> pos & 1)
+        if state == (0, 0, 1):
+            maxCode = loadBits(maxCode, pos, mask, True)
+        elif state == (0, 1, 1):
+            return litmax
+        elif state == (1, 0, 0):
+            return maxCode
+        elif state == (1, 0, 1):
+            litmax = loadBits(maxCode, pos, mask, True)
+            minCode = loadBits(minCode, pos, mask, False)
+    return litmax
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of the encoded columns of the las files. A cache entry is keyed
+by the hash of the content of the file and the parameters of the conversion:
+the morton function (parse and integration), the time, the offsets, scales,
+bits and the curve. So a reload of unchanged files with the same
+configuration reads the columns instead of decoding the laz files again.
+
+Every entry is a directory with one .npy file per column and the extent of
+the file from its las header. The columns are loaded memory mapped, so only
+the chunk that is converted is read into memory. The codes wider than 64 bits
+are stored as MORTON_WORDS and given back as python longs. An entry is
+written in a temporary directory and renamed when it is complete, so a failed
+or concurrent conversion never leaves a partial entry behind.
+"""
+import pointcloud.morton as morton
+import numpy as np
+import hashlib
+import shutil
+import os
+
+# changes when the layout of the entries changes
+CACHE_VERSION = 1
+
+def fileHash(cfile, blockSize = 1 << 24):
+    """Returns the sha1 hex digest of the content of a file."""
+    digest = hashlib.sha1()
+    fh = open(cfile, 'rb')
+    block = fh.read(blockSize)
+    while block:
+        digest.update(block)
+        block = fh.read(blockSize)
+    fh.close()
+    return digest.hexdigest()
+
+def cacheKey(cfile, functionName, t, args, clustering):
+    """
+    Returns the key of the cache entry of a file.
+
+    Args:
+        cfile (str): the las file
+        functionName (str): the name of the morton function, it gives the
+            parse and the integration
+        t (int): the scaled time of the file
+        args (tuple): the arguments of the morton function: offsets, scales,
+            bits and the words flag of the binary stream
+        clustering (str): morton or hilbert
+
+    Returns:
+        str: the hex digest of the content and the parameters
+    """
+    parameters = repr((CACHE_VERSION, functionName, t, args, clustering))
+    return hashlib.sha1(fileHash(cfile) + parameters).hexdigest()
+
+def load(cacheDir, key):
+    """
+    Loads a cache entry.
+
+    Returns:
+        tuple: the minimum and maximum x, y, z of the file and the list of
+            (memory mapped column, isLong) of the columns, or None on a miss
+    """
+    path = os.path.join(cacheDir, key)
+    if not os.path.isdir(path):
+        return None
+    extent = np.load(os.path.join(path, 'extent.npy')).tolist()
+    columns = []
+    fileNames = [name for name in os.listdir(path) if name != 'extent.npy']
+    # the files are named after the index of their column
+    for fileName in sorted(fileNames, key = lambda name: int(name.split('_')[0])):
+        columns.append((np.load(os.path.join(path, fileName), mmap_mode = 'r'), fileName.endswith('_long.npy')))
+    return extent[:3], extent[3:], columns
+
+def readChunks(columns, chunkSize = None):
+    """Yields the loaded columns in consecutive chunks of chunkSize points,
+    the whole columns without chunkSize. The two-word codes of the long
+    columns are converted to python longs."""
+    numPoints = len(columns[0][0])
+    step = chunkSize or max(1, numPoints)
+    for start in range(0, numPoints, step):
+        yield [morton.WordsToLong(column[start:start + step]) if isLong else column[start:start + step]
+               for (column, isLong) in columns]
+
+class CacheWriter(object):
+    """Writes the encoded columns of a file, chunk after chunk in the order
+    of the points, to a new cache entry."""
+    def __init__(self, cacheDir, key, numPoints):
+        self.path = os.path.join(cacheDir, key)
+        self.temp = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        self.numPoints = numPoints
+        self.columns = None
+        self.filled = 0
+        if os.path.exists(self.temp):
+            shutil.rmtree(self.temp)
+        os.makedirs(self.temp)
+
+    def add(self, columns):
+        if self.columns is None:
+            # the files are created with the types of the first chunk
+            self.columns = []
+            for i, column in enumerate(columns):
+                column = np.asarray(column)
+                isLong = column.dtype == object
+                fileName = os.path.join(self.temp, '{0}_{1}.npy'.format(i, 'long' if isLong else 'array'))
+                array = np.lib.format.open_memmap(fileName, 'w+', morton.MORTON_WORDS if isLong else column.dtype, (self.numPoints,))
+                self.columns.append((array, isLong))
+        numPoints = len(columns[0])
+        for column, (array, isLong) in zip(columns, self.columns):
+            array[self.filled:self.filled + numPoints] = morton.LongToWords(column) if isLong else column
+        self.filled += numPoints
+
+    def commit(self, minxyz, maxxyz):
+        """Completes the entry if all the points of the file were added."""
+        if self.columns is None or self.filled != self.numPoints:
+            self.abort()
+            return
+        for array, isLong in self.columns:
+            array.flush()
+        self.columns = None
+        np.save(os.path.join(self.temp, 'extent.npy'), np.array(list(minxyz) + list(maxxyz), dtype = np.float64))
+        if os.path.exists(self.path):
+            # written by another process in the meantime
+            self.abort()
+        else:
+            os.rename(self.temp, self.path)
+
+    def abort(self):
+        self.columns = None
+        shutil.rmtree(self.temp, True)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Selection of the engine that performs the vectorized morton conversions:
+    magicbits: divide and conquer shifts of the morton module
+    lut: byte-wise lookup tables of the mortonLUT module
+    auto: the fastest of the two on this machine, found with a micro-benchmark
+With the hilbert clustering the keys are Hilbert keys of the hilbert module 
+behind the same array functions.
+
+The numba kernels of the morton and reader modules are cached on disk 
+(cache = True), so only the first process compiles them. The startup option
+reports the import and compile time of a fresh process.
+
+Usage: python -m pointcloud.mortonCodec [numPoints]
+       python -m pointcloud.mortonCodec startup
+"""
+import pointcloud.morton as morton
+import pointcloud.mortonLUT as mortonLUT
+import pointcloud.hilbert as hilbert
+import numpy as np
+import subprocess
+import time
+import sys
+
+ENGINES = {
+    'magicbits': morton,
+    'lut': mortonLUT
+    }
+
+class HilbertEngine:
+    """The Hilbert keys behind the array functions of the morton engines"""
+    EncodeMorton2DArray = staticmethod(hilbert.EncodeHilbert2DArray)
+    DecodeMorton2DArray = staticmethod(hilbert.DecodeHilbert2DArray)
+    EncodeMorton3DWords = staticmethod(hilbert.EncodeHilbert3DWords)
+    DecodeMorton3DWords = staticmethod(hilbert.DecodeHilbert3DWords)
+    EncodeMorton3DArray = staticmethod(hilbert.EncodeHilbert3DArray)
+    DecodeMorton3DArray = staticmethod(hilbert.DecodeHilbert3DArray)
+    EncodeMorton4DWords = staticmethod(hilbert.EncodeHilbert4DWords)
+    DecodeMorton4DWords = staticmethod(hilbert.DecodeHilbert4DWords)
+    EncodeMorton4DArray = staticmethod(hilbert.EncodeHilbert4DArray)
+    DecodeMorton4DArray = staticmethod(hilbert.DecodeHilbert4DArray)
+
+# the engine used by the reader for the array conversions
+engine = morton
+
+def benchmarkEngines(numPoints = 200000, repeat = 3):
+    """
+    Times the encoding of random 2D, 3D and 4D codes with every engine.
+
+    Args:
+        numPoints (int): the number of points encoded per dimensionality
+        repeat (int): the number of repetitions, the fastest one is kept
+
+    Returns:
+        dict: the engine name and the time in seconds
+    """
+    rng = np.random.RandomState(0)
+    x, y, z, t = [rng.randint(0, 2**31 - 1, numPoints) for i in range(4)]
+    timings = {}
+    for name, eng in ENGINES.items():
+        best = None
+        for i in range(repeat):
+            start = time.time()
+            eng.EncodeMorton2DArray(x, y)
+            eng.EncodeMorton3DWords(x, y, z)
+            eng.EncodeMorton4DWords(x, y, z, t)
+            elapsed = time.time() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        timings[name] = best
+    return timings
+
+def fastestEngine(numPoints = 200000):
+    """
+    Returns the name of the fastest engine on this machine.
+    """
+    timings = benchmarkEngines(numPoints)
+    return min(timings, key = timings.get)
+
+def setEngine(name, clustering = 'morton'):
+    """
+    Sets the engine used for the array conversions.
+
+    Args:
+        name (str): magicbits, lut or auto
+        clustering (str): morton or hilbert, the codec is not used by hilbert
+
+    Returns:
+        str: the name of the engine in use
+
+    Raises:
+        Exception: ERROR: Not supported codec
+    """
+    global engine
+    if clustering == 'hilbert':
+        engine = HilbertEngine
+        return 'hilbert'
+    if name == 'auto':
+        name = fastestEngine()
+    if name not in ENGINES:
+        raise Exception('ERROR: Not supported codec. Use auto, magicbits or lut')
+    engine = ENGINES[name]
+    return name
+
+def getClustering():
+    """
+    Returns the clustering of the engine in use, morton or hilbert.
+    """
+    if engine is HilbertEngine:
+        return 'hilbert'
+    return 'morton'
+
+def compileKernels():
+    """
+    Calls every numba kernel once so that the lazily compiled ones are 
+    compiled and written to the cache.
+    """
+    import pointcloud.reader as reader
+    reader.Encode2Morton2D(1.0, 1.0, 0.0, 0.0, 0.01, 0.01)
+    reader.Encode2Morton3D(1.0, 1.0, 1.0, 0.0, 0.0, 0.0, 0.01, 0.01, 0.01)
+    reader.Encode2Morton4D(1, 1.0, 1.0, 1.0, 0.0, 0.0, 0.0, 0.01, 0.01, 0.01)
+    reader.morton2coordsX2D(3, 0.0, 0.01, 2)
+    reader.morton2coordsY2D(3, 0.0, 0.01, 2)
+    morton.EncodeMorton3D_21bit(1, 1, 1)
+    morton.DecodeMorton3DX_21bit(7)
+    morton.DecodeMorton3DY_21bit(7)
+    morton.DecodeMorton3DZ_21bit(7)
+    morton.DecodeMorton3DX(7)
+    morton.DecodeMorton4DX(15)
+
+STARTUP = """
+import time
+start = time.time()
+import pointcloud.reader
+imported = time.time()
+import pointcloud.mortonCodec as mortonCodec
+mortonCodec.compileKernels()
+print imported - start, time.time() - imported
+"""
+
+def startupTimes():
+    """
+    Measures the startup of a fresh process that uses the morton codec, as 
+    the converter processes spawned by the loaders do.
+
+    Returns:
+        dict: the import and the compile time in seconds
+    """
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', STARTUP])
+    return dict(zip(['import', 'compile'], map(float, output.split()[-2:])))
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'startup':
+        for run in ['first', 'second']:
+            timings = startupTimes()
+            print run, 'import', round(timings['import'], 4), 'compile', round(timings['compile'], 4)
+    else:
+        if len(sys.argv) > 1:
+            timings = benchmarkEngines(int(sys.argv[1]))
+        else:
+            timings = benchmarkEngines()
+        for name in sorted(timings, key = timings.get):
+            print name, round(timings[name], 4)
@@ -9,38 +9,563 @@ The morton converter
 
 from pointcloud.AbstractLoader import Oracle
 import pointcloud.oracleTools as ora
-from pointcloud.general import getFiles, OFFSET_ZANDMOTOR, OFFSET_COASTLINE, SCALE_ZANDMOTOR, SCALE_COASTLINE, SRID
+from pointcloud.general import getFiles, OFFSET_ZANDMOTOR, OFFSET_COASTLINE, SCALE_ZANDMOTOR, SCALE_COASTLINE, SRID, SQLLDR_WORD_BITS
 import pointcloud.reader as reader
+import pointcloud.morton as morton
+import pointcloud.mortonCodec as mortonCodec
+import pointcloud.mortonCache as mortonCache
+import pointcloud.pipeline as pipeline
+from multiprocessing import Pool
 import numpy as np
+import heapq
+import select
 import sys
+import os
 import time
 
 def perform(function, *args):
     return function(*args)
     
-def mortonXYTloose(f, t, offx, offy, scalex, scaley):
-    timear = np.empty(len(f)).transpose()
-    timear.fill(t)
-    return map(lambda x: [x[0], reader.Encode2Morton2D(x[1], x[2], offx, offy, scalex, scaley), x[3]], np.vstack((timear, f.x, f.y, f.z)).transpose())
+def mortonXYTloose(f, t, offx, offy, scalex, scaley, words = False):
+    # the 2D codes are int64, words does not apply
+    return [reader.timeArray(t, len(f)), reader.Encode2Morton2DArray(f.x, f.y, offx, offy, scalex, scaley), f.z]
 
-def mortonXYZTloose(f, t, offx, offy, offz, scalex, scaley, scalez):
-    timear = np.empty(len(f)).transpose()
-    timear.fill(t)
-    return map(lambda x: [int(x[0]), reader.Encode2Morton3D(x[1], x[2], x[3], offx, offy, offz, scalex, scaley, scalez)], np.vstack((timear, f.x, f.y, f.z)).transpose())
+def mortonXYZTloose(f, t, offx, offy, offz, scalex, scaley, scalez, words = False):
+    return [reader.timeArray(t, len(f)), reader.Encode2Morton3DArray(f.x, f.y, f.z, offx, offy, offz, scalex, scaley, scalez, words)]
 
-def mortonXYTdeep(f, t, offx, offy, scalex, scaley):
-     return map(lambda x: [reader.Encode2Morton3D(t, x[0], x[1], 0, offx, offy, 1, scalex, scaley), x[2]], np.vstack((f.x, f.y, f.z)).transpose())
+def mortonXYTdeep(f, t, offx, offy, scalex, scaley, bits = None, words = False):
+    if bits is not None:
+        return [reader.Encode2MortonBitsArray([reader.timeArray(t, len(f)), f.x, f.y], [0, offx, offy], [1, scalex, scaley], bits, words), f.z]
+    return [reader.Encode2Morton3DArray(reader.timeArray(t, len(f)), f.x, f.y, 0, offx, offy, 1, scalex, scaley, words), f.z]
 
-def mortonXYZTdeep(f, t, offx, offy, offz, scalex, scaley, scalez):
-    timear = np.empty(len(f)).transpose()
-    timear.fill(t)
-    return map(lambda x: [reader.Encode2Morton4D(int(x[0]), x[1], x[2], x[3], offx, offy, offz, scalex, scaley, scalez)], np.vstack((timear, f.x, f.y, f.z)).transpose())
+def mortonXYZTdeep(f, t, offx, offy, offz, scalex, scaley, scalez, bits = None, words = False):
+    if bits is not None:
+        return [reader.Encode2MortonBitsArray([reader.timeArray(t, len(f)), f.x, f.y, f.z], [0, offx, offy, offz], [1, scalex, scaley, scalez], bits, words)]
+    return [reader.Encode2Morton4DArray(t, f.x, f.y, f.z, offx, offy, offz, scalex, scaley, scalez, words)]
 
-def converter(ini_file):
-    initialise = Oracle(ini_file)
-    connection = initialise.getConnection()
+class PointChunk(object):
+    """The x, y, z arrays of a part of a las file. It takes the place of the 
+    laspy file in the morton functions."""
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+        
+    def __len__(self):
+        return len(self.x)
+
+class PointSource(object):
+    """The points of a las file for the read and encode stages. With a cache
+    directory the encoded columns are read from the cache, without opening 
+    the las file, or on a miss written to the cache as they are encoded. The
+    points of a laz file are streamed from laszip."""
+    def __init__(self, cfile, funct, dataset, scale, args, cacheDir = None):
+        self.cfile = cfile
+        self.funct = funct
+        self.args = args
+        self.time = parseTimeFromFilename(cfile, dataset)
+        # the time argument of the morton function
+        self.t = self.time * scale
+        self.cached = None
+        self.store = None
+        self.f = None
+        if cacheDir is not None:
+            key = mortonCache.cacheKey(cfile, funct.__name__, self.t, args, mortonCodec.getClustering())
+            self.cached = mortonCache.load(cacheDir, key)
+        if self.cached is not None:
+            self.minxyz, self.maxxyz, self.columns = self.cached
+        elif cfile.lower().endswith('.laz'):
+            # laspy would decompress the whole file before the first chunk
+            self.minxyz, self.maxxyz = reader.getMinMaxHeader(cfile)
+            if cacheDir is not None:
+                self.store = mortonCache.CacheWriter(cacheDir, key, reader.getNumPointsHeader(cfile))
+        else:
+            self.f = reader.readFileLaspy(cfile)
+            self.minxyz, self.maxxyz = reader.getMinMaxLaspy(self.f)
+            if cacheDir is not None:
+                self.store = mortonCache.CacheWriter(cacheDir, key, len(self.f))
+    
+    def read(self, chunkSize = None):
+        """Yields the chunks as (numPoints, points), the points are encoded
+        columns when they come from the cache."""
+        if self.cached is not None:
+            for columns in mortonCache.readChunks(self.columns, chunkSize):
+                yield len(columns[0]), columns
+        else:
+            if self.f is not None:
+                chunks = reader.readChunksLaspy(self.f, chunkSize)
+            else:
+                chunks = reader.readChunksLaszip(self.cfile, chunkSize)
+            for x, y, z in chunks:
+                yield len(x), PointChunk(x, y, z)
+    
+    def encode(self, points, pool = None, numProcesses = 1):
+        """Returns the encoded columns of the points of a chunk. The points 
+        are split over the pool, if given."""
+        if self.cached is not None:
+            return points
+        if pool is None:
+            columns = perform(self.funct, points, self.t, *self.args)
+        else:
+            columns = encodeParallel(pool, numProcesses, self.funct, points, self.t, self.args)
+        if self.store is not None:
+            self.store.add(columns)
+        return columns
+    
+    def close(self, completed = True):
+        """Closes the las file and completes the cache entry, if the whole 
+        file was converted, or drops it."""
+        if self.store is not None:
+            if completed:
+                self.store.commit(self.minxyz, self.maxxyz)
+            else:
+                self.store.abort()
+        if self.f is not None:
+            self.f.close()
+
+class KeyFilter(object):
+    """Drops the points with a morton code that was already converted in 
+    the same epoch, in the same chunk or in an earlier chunk or file. Within
+    an epoch the morton code is the primary key of both integrations, so the
+    duplicates are removed at the resolution of the key and not of the 
+    coordinates. The codes of the epoch are kept as sorted runs, wide codes 
+    in their two-word form, and the runs of about the same size are merged, 
+    so there are never more than log2 of the points runs. The files are 
+    sorted by time, so the codes are forgotten when the next epoch starts."""
+    def __init__(self, keyIndex):
+        self.keyIndex = keyIndex
+        self.epoch = None
+        self.runs = []
+        self.dropped = 0
+    
+    def seen(self, keys):
+        """Returns the mask of the keys that are in a run."""
+        found = np.zeros(len(keys), dtype = bool)
+        for run in self.runs:
+            index = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[index] == keys
+        return found
+    
+    def add(self, keys):
+        """Adds the sorted new keys as a run."""
+        self.runs.append(keys)
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            self.runs[-1] = np.sort(np.concatenate((self.runs[-1], last)), kind = 'mergesort')
+    
+    def filter(self, columns, epoch):
+        """Returns the columns of the points of a chunk with a new morton 
+        code, in their original order."""
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.runs = []
+        keys = np.asarray(columns[self.keyIndex])
+        if len(keys) == 0:
+            return columns
+        if keys.dtype == object:
+            keys = morton.LongToWords(keys)
+        keys, first = np.unique(keys, return_index = True)
+        if len(self.runs):
+            new = ~self.seen(keys)
+            keys, first = keys[new], first[new]
+        if len(keys):
+            self.add(keys)
+        self.dropped += len(columns[self.keyIndex]) - len(first)
+        if len(first) == len(columns[self.keyIndex]):
+            return columns
+        first.sort()
+        return [np.asarray(column)[first] for column in columns]
+
+def groupEpochs(files, dataset):
+    """Splits the files in groups of the files of the same epoch, in the 
+    order of their first file. The files of an epoch keep their order."""
+    groups = []
+    index = {}
+    for cfile in files:
+        t = parseTimeFromFilename(cfile, dataset)
+        if t not in index:
+            index[t] = len(groups)
+            groups.append([])
+        groups[index[t]].append(cfile)
+    return groups
+
+def getUnits(initialise, files, grouped):
+    """Returns the units of files converted by one process, every file is a
+    unit. With the dedupe the files of an epoch follow each other, as the 
+    KeyFilter forgets the codes of an epoch when the next one starts, and 
+    with grouped they are one unit, so that the duplicates between them are
+    found by the same process."""
+    if not initialise.dedupe:
+        return [[cfile] for cfile in files]
+    groups = groupEpochs(files, initialise.dataset)
+    if grouped:
+        return groups
+    return [[cfile] for group in groups for cfile in group]
+
+def getKeyFilter(keyIndex):
+    """Returns a KeyFilter on the column keyIndex, None without keyIndex."""
+    if keyIndex is None:
+        return None
+    return KeyFilter(keyIndex)
+
+def addCounters(totals, counters):
+    """Adds the counters of the stages of a file to the totals."""
+    if totals == []:
+        totals = [pipeline.StageCounter(c.name) for c in counters]
+    for total, c in zip(totals, counters):
+        total.add(c)
+    return totals
+
+def encodeChunk(job):
+    """Encodes a chunk of points in a worker process. It returns the columns
+    and the CPU seconds of the worker."""
+    start = pipeline.threadTime()
+    funct, x, y, z, t, args = job
+    return perform(funct, PointChunk(x, y, z), t, *args), pipeline.threadTime() - start
+
+def convertChunk(job):
+    """Converts and formats a chunk of points in a worker process. It 
+    returns the formatted chunk and the CPU seconds of the worker."""
+    start = pipeline.threadTime()
+    funct, x, y, z, t, args, fields = job
+    return formatColumns(perform(funct, PointChunk(x, y, z), t, *args), fields), pipeline.threadTime() - start
+
+def formatChunk(job):
+    """Formats a chunk of the column arrays in a worker process. It returns
+    the formatted chunk and the CPU seconds of the worker."""
+    start = pipeline.threadTime()
+    columns, fields = job
+    return formatColumns(columns, fields), pipeline.threadTime() - start
+
+def mapChunks(pool, function, jobs):
+    """Maps the jobs over the pool and returns their results. The CPU time
+    of the workers is added to the stage that waits for them."""
+    results = pool.map(function, jobs)
+    pipeline.addWorkerTime(sum([seconds for (result, seconds) in results]))
+    return [result for (result, seconds) in results]
+
+def splitPoints(points, numProcesses):
+    """Splits the x, y, z arrays of the points in numProcesses contiguous 
+    parts."""
+    return zip(np.array_split(points.x, numProcesses), np.array_split(points.y, numProcesses), 
+               np.array_split(points.z, numProcesses))
+
+def joinChunks(chunks, fields = None):
+    """Joins the formatted chunks, the lines with a new line and the binary 
+    records as they are."""
+    if fields is not None:
+        return ''.join(chunks)
+    return '\n'.join([chunk for chunk in chunks if chunk != ''])
+
+def convertParallel(pool, numProcesses, funct, f, t, args, fields = None):
+    """Splits the points of a file in contiguous chunks that are converted 
+    and formatted by the pool. The chunks are joined in their original order 
+    so the output is the same as formatColumns(perform(funct, f, t, *args), 
+    fields)."""
+    jobs = [(funct, x, y, z, t, args, fields) for (x, y, z) in splitPoints(f, numProcesses)]
+    return joinChunks(mapChunks(pool, convertChunk, jobs), fields)
+
+def encodeParallel(pool, numProcesses, funct, points, t, args):
+    """Splits the points of a chunk in contiguous parts that are encoded by
+    the pool. The columns of the parts are joined in their original order so 
+    they are the same as perform(funct, points, t, *args)."""
+    jobs = [(funct, x, y, z, t, args) for (x, y, z) in splitPoints(points, numProcesses)]
+    parts = mapChunks(pool, encodeChunk, jobs)
+    if len(parts) == 1:
+        return parts[0]
+    return [np.concatenate(columns) for columns in zip(*parts)]
+
+def formatParallel(pool, numProcesses, columns, fields = None):
+    """Formats the column arrays in contiguous chunks with the pool. The 
+    output is the same as formatColumns(columns, fields)."""
+    chunks = zip(*[np.array_split(np.asarray(column), numProcesses) for column in columns])
+    return joinChunks(mapChunks(pool, formatChunk, [(list(c), fields) for c in chunks]), fields)
+
+def sortColumns(columns, keyIndices):
+    """Sorts the column arrays on the primary key columns. The 93 and 124 bit
+    morton codes are sorted on their two-word representation."""
+    keys = []
+    for i in reversed(keyIndices):
+        column = np.asarray(columns[i])
+        if column.dtype == object or column.dtype == morton.MORTON_WORDS:
+            words = morton.LongToWords(column)
+            keys.extend([words['lo'], words['hi']])
+        else:
+            keys.append(column)
+    order = np.lexsort(keys)
+    return [np.asarray(values)[order] for values in columns]
+
+def readRun(runFile, keyIndices):
+    """Yields the primary key and the line of every row of a sorted run."""
+    for line in open(runFile):
+        values = line.split(', ')
+        yield tuple([int(values[i]) for i in keyIndices]), line
+
+def readBinaryRun(runFile, keyIndices, fields, blockSize = 65536):
+    """Yields the primary key and the record of every row of a sorted run of
+    binary records. The key of a wide column is its high and low word."""
+    dtype = binaryDtype(fields)
+    keyFields = [field[0] for i in keyIndices for field in fields[i][1]]
+    fh = open(runFile, 'rb')
+    while True:
+        records = np.fromfile(fh, dtype = dtype, count = blockSize)
+        if len(records) == 0:
+            break
+        keys = zip(*[records[name].tolist() for name in keyFields])
+        for key, record in zip(keys, records):
+            yield key, record.tostring()
+    fh.close()
+
+def mergeRuns(runFiles, keyIndices, out, fields = None, blockSize = 65536):
+    """Merges the sorted runs of the files into out, k-way with a heap. The
+    rows are written in blocks of blockSize rows."""
+    if fields is not None:
+        runs = [readBinaryRun(runFile, keyIndices, fields) for runFile in runFiles]
+    else:
+        runs = [readRun(runFile, keyIndices) for runFile in runFiles]
+    block = []
+    for key, line in heapq.merge(*runs):
+        block.append(line)
+        if len(block) == blockSize:
+            out.write(''.join(block))
+            block = []
+    if len(block):
+        out.write(''.join(block))
+
+def copyPart(part, out, fields = None, blockSize = 1 << 24):
+    """Copies a part file to out in blocks of about blockSize bytes that hold
+    whole lines or, with the fields of the binary stream, whole records."""
+    fh = open(part, 'rb')
+    if fields is not None:
+        recordSize = binaryDtype(fields).itemsize
+        size = max(recordSize, blockSize - blockSize % recordSize)
+        block = fh.read(size)
+        while block:
+            out.write(block)
+            block = fh.read(size)
+    else:
+        lines = fh.readlines(blockSize)
+        while lines:
+            out.write(''.join(lines))
+            lines = fh.readlines(blockSize)
+    fh.close()
+
+class ChunkWriter(object):
+    """Writes the formatted chunks of a file to an open stream, to a text 
+    file or, for the presort, every chunk to a new run file. It keeps the 
+    files written and the time spent writing."""
+    def __init__(self, stream = None, fileName = None, runPrefix = None, binary = False):
+        self.stream = stream
+        self.runPrefix = runPrefix
+        self.files = []
+        self.time = 0
+        # the binary records are written as they are
+        self.mode, self.end = ('wb', '') if binary else ('w', '\n')
+        self.opened = fileName is not None
+        if self.opened:
+            self.stream = open(fileName, self.mode)
+            self.files.append(fileName)
+    
+    def write(self, a):
+        start = time.time()
+        if self.runPrefix is not None:
+            runFile = '{0}_{1}.txt'.format(self.runPrefix, len(self.files))
+            fh = open(runFile, self.mode)
+            fh.write(a + self.end)
+            fh.close()
+            self.files.append(runFile)
+        else:
+            self.stream.write(a + self.end)
+        self.time += time.time() - start
+    
+    def close(self):
+        if self.opened:
+            self.stream.close()
+
+def fileOutput(initialise, index, cfile, parallel):
+    """Returns the text file and the run prefix of the ChunkWriter of a file.
+    The presort writes runs. The sqlldr pipe and the files of the external 
+    table are written directly, or through a part file when the files are 
+    converted in parallel."""
+    if initialise.presort:
+        return None, 'run_{0}_{1}'.format(initialise.iotTableName, index)
+    elif parallel:
+        return 'part_{0}_{1}.txt'.format(initialise.iotTableName, index), None
+    return None, None
+
+def convertFile(cfile, funct, dataset, scale, keyIndices, args, writer, chunkSize = None, pool = None, numProcesses = 1, fields = None, depth = None, cacheDir = None, keyFilter = None):
+    """Reads a las file in chunks of chunkSize points and gives the formatted
+    lines of every chunk to the writer, so only one chunk is converted in 
+    memory at a time. The points of a chunk are encoded and formatted by the
+    pool, if given, split over numProcesses. With keyIndices every chunk is 
+    sorted on these columns. With the fields of the binary stream the chunks 
+    are formatted as binary records. With depth the read, encode, format and 
+    write stages overlap in a pipeline, the pool keeps the encoding and the 
+    formatting out of the threads of the pipeline. With 
+    cacheDir the encoded columns come from or go to the cache. With the 
+    keyFilter the duplicate keys are dropped. It returns the time and the 
+    extent of the file for the meta table and the counters of the stages."""
+    source = PointSource(cfile, funct, dataset, scale, args, cacheDir)
+    t = source.time
+    
+    def readItems():
+        return source.read(chunkSize)
+    
+    def encodeItem(item):
+        columns = source.encode(item[1], pool, numProcesses)
+        if keyFilter is not None:
+            columns = keyFilter.filter(columns, t)
+        if keyIndices is not None:
+            columns = sortColumns(columns, keyIndices)
+        return len(columns[0]), columns
+    
+    def formatItem(item):
+        if pool is None:
+            return item[0], formatColumns(item[1], fields)
+        return item[0], formatParallel(pool, numProcesses, item[1], fields)
+    
+    def convertItem(item):
+        return item[0], convertParallel(pool, numProcesses, funct, item[1], t * scale, args, fields)
+    
+    def writeItem(item):
+        if item[1] != '':
+            writer.write(item[1])
+        return item[0], None
+    
+    if pool is not None and keyIndices is None and cacheDir is None and keyFilter is None:
+        # the pool encodes and formats the parts of a chunk in one go
+        stages = [('read', readItems), ('convert', convertItem), ('write', writeItem)]
+    else:
+        stages = [('read', readItems), ('encode', encodeItem), ('format', formatItem), ('write', writeItem)]
+    try:
+        counters = pipeline.runStages(stages, depth)
+    except:
+        source.close(False)
+        raise
+    source.close()
+    return t, source.minxyz, source.maxxyz, counters
+
+def convertFileJob(job):
+    """Converts the whole files of a unit in a worker process of the file 
+    pool. It returns the files written and the counters."""
+    unit, funct, dataset, scale, keyIndices, args, chunkSize, fields, depth, cacheDir, keyIndex, fileName, runPrefix = job
+    writer = ChunkWriter(fileName = fileName, runPrefix = runPrefix, binary = fields is not None)
+    keyFilter = getKeyFilter(keyIndex)
+    totals = []
+    for cfile in unit:
+        t, minxyz, maxxyz, counters = convertFile(cfile, funct, dataset, scale, keyIndices, args, writer, chunkSize, 
+                                                  fields = fields, depth = depth, cacheDir = cacheDir, keyFilter = keyFilter)
+        totals = addCounters(totals, counters)
+    writer.close()
+    return writer.files, totals
+
+# the database session of an insert process of the pool
+session = None
+
+def openSession(ini_file):
+    """Opens the database session of an insert process of the pool."""
+    global session
+    session = Oracle(ini_file).getConnection()
+
+def insertFile(cfile, funct, dataset, scale, args, tableName, columnNames, batchSize, depth, cacheDir, connection, keyFilter = None):
+    """Reads a las file in batches of batchSize points, converts every batch
+    and inserts its columns with one array bound executemany, without text in
+    between. With depth the read, encode and insert stages overlap in a 
+    pipeline. With cacheDir the encoded columns come from or go to the cache.
+    With the keyFilter the duplicate keys are dropped. It returns the time 
+    and the extent of the file for the meta table, the number of points and 
+    the insert time of every batch and the counters of the stages."""
+    cursor = connection.cursor()
+    source = PointSource(cfile, funct, dataset, scale, args, cacheDir)
+    batches = []
+    
+    def readItems():
+        return source.read(batchSize)
+    
+    def encodeItem(item):
+        columns = source.encode(item[1])
+        if keyFilter is not None:
+            columns = keyFilter.filter(columns, source.time)
+        return len(columns[0]), zip(*[np.asarray(column).tolist() for column in columns])
     
-    # fresh reload or not
+    def insertItem(item):
+        if item[0] == 0:
+            return item
+        start = time.time()
+        ora.insertRows(cursor, tableName, columnNames, item[1])
+        batches.append((item[0], time.time() - start))
+        return item[0], None
+    
+    try:
+        counters = pipeline.runStages([('read', readItems), ('encode', encodeItem), ('insert', insertItem)], depth)
+    except:
+        source.close(False)
+        raise
+    connection.commit()
+    cursor.close()
+    source.close()
+    return source.time, source.minxyz, source.maxxyz, batches, counters
+
+def insertFileJob(job):
+    """Inserts the whole files of a unit in a worker process with its own 
+    session. It returns the batches of every file and the counters."""
+    unit, keyIndex = job[0], job[-1]
+    keyFilter = getKeyFilter(keyIndex)
+    batches, totals = [], []
+    for cfile in unit:
+        t, minxyz, maxxyz, fileBatches, counters = insertFile(*((cfile,) + job[1:-1] + (session, keyFilter)))
+        batches.append((cfile, fileBatches))
+        totals = addCounters(totals, counters)
+    return batches, totals
+
+class FanOut(object):
+    """Spreads the chunks over several data files, the named pipes of the 
+    parallel sqlldr sessions. Every chunk goes whole to the next pipe that 
+    can take data, so the sessions read complete lines or records."""
+    def __init__(self, dataFiles):
+        # opening a pipe waits for its sqlldr session
+        self.streams = [open(dataFile, 'wb') for dataFile in dataFiles]
+        self.last = -1
+    
+    def write(self, a):
+        ready = select.select([], self.streams, [])[1]
+        order = self.streams[self.last + 1:] + self.streams[:self.last + 1]
+        stream = [s for s in order if s in ready][0]
+        stream.write(a)
+        stream.flush()
+        self.last = self.streams.index(stream)
+    
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+class BalancedWriter(object):
+    """Spreads the lines over the text files of the external table. Every 
+    block of about blockSize bytes of whole lines goes to the smallest file, 
+    so the files end up of the same size however uneven the las files are."""
+    def __init__(self, fileNames, blockSize = 1 << 20):
+        self.streams = [open(fileName, 'w') for fileName in fileNames]
+        self.sizes = [0] * len(fileNames)
+        self.blockSize = blockSize
+    
+    def write(self, a):
+        start = 0
+        while start < len(a):
+            end = a.find('\n', start + self.blockSize - 1)
+            end = len(a) if end == -1 else end + 1
+            i = self.sizes.index(min(self.sizes))
+            self.streams[i].write(a[start:end])
+            self.sizes[i] += end - start
+            start = end
+    
+    def close(self):
+        for stream in self.streams:
+            stream.close()
+
+def getLasFiles(initialise):
+    """Returns the sorted laz files of the configuration. A fresh reload 
+    takes the files of all the directories up to the configured one and 
+    initialises the tables again."""
     directories = []
     if initialise.reload is True:
         initialise.init = True
@@ -55,9 +580,11 @@ def converter(ini_file):
     # get the name of the laz files in the directories
     files = getFiles(directories, ['laz'], True)
     files.sort()
-    
-    cursor = connection.cursor()
-    
+    return files
+
+def getConversion(initialise):
+    """Returns the morton function of the configuration, its offset and 
+    scale arguments and the offsets and scales of the x, y, z dimensions."""
     if initialise.dataset.lower() == 'zandmotor':
         offx, offy, offz, offt = OFFSET_ZANDMOTOR
         scalex, scaley, scalez, scalet = SCALE_ZANDMOTOR
@@ -79,36 +606,160 @@ def converter(ini_file):
         elif initialise.parse == 'xyzt':
             funct = mortonXYZTdeep
             args = offx, offy, offz, scalex, scaley, scalez
+    return funct, args, [offx, offy, offz], [scalex, scaley, scalez]
+
+def getBits(initialise, extent, cursor, offsets, scales):
+    """Returns the bits per dimension of the configuration, resolved from 
+    the extent of the files for a new table and read from the meta table 
+    otherwise."""
+    bits = None
+    if initialise.bits is not None:
+        if initialise.init:
+            bits = resolveBits(initialise.bits, extent, initialise.scale, offsets, scales)
+        else:
+            bits = ora.getMetaBits(cursor, initialise.metaTable, len(initialise.bits))
+            if bits is None:
+                raise Exception('ERROR: The meta table does not store the bits per dimension')
+    return bits
+
+def converter(ini_file, dataFiles = None):
+    """Converts the files of the configuration. The output goes to the 
+    standard output or, with dataFiles, is spread over these files."""
+    initialise = Oracle(ini_file)
+    if initialise.externalMode == 'preprocessor':
+        return prepareLocations(initialise)
+    mortonCodec.setEngine(initialise.codec.lower(), initialise.clustering.lower())
+    # the files are converted either one at a time with their points split 
+    # over the encode pool or several at a time by the file pool
+    pool, filePool = None, None
+    if initialise.loader == 'arraybind':
+        # every insert process converts and inserts whole files in its session
+        if initialise.insertSessions > 1:
+            filePool = Pool(initialise.insertSessions, openSession, (ini_file,))
+    elif initialise.fileProcesses > 1:
+        filePool = Pool(initialise.fileProcesses)
+    elif initialise.encodeProcesses > 1 or initialise.pipelineDepth:
+        # the encode and the format stages of the pipeline run in the pool, 
+        # the threads of the stages share the interpreter lock
+        pool = Pool(max(initialise.encodeProcesses, 2))
+    connection = initialise.getConnection()
+    files = getLasFiles(initialise)
+    cursor = connection.cursor()
+    
+    out = sys.stdout
+    if dataFiles:
+        out = FanOut(dataFiles)
+    elif initialise.loader == 'external':
+        out = BalancedWriter(initialise.getExternalFiles())
+    
+    funct, args, offsets, scales = getConversion(initialise)
+    # the extent of all the files from their headers, the meta table is 
+    # written once and is complete before the conversion starts
+    extent = prescanFiles(files, initialise.dataset)
+    bits = getBits(initialise, extent, cursor, offsets, scales)
+    writeMetaTable(connection, cursor, initialise, extent, offsets, scales, bits)
+    if initialise.integration == 'deep':
+        args = args + (bits,)
+    
+    # the rows of every file are sorted and kept in a run, the runs are merged
+    # at the end to give rows sorted on the primary key of the IOT
+    keyIndices = [initialise.columnNames.index(c.strip()) for c in initialise.index.split(',')]
+    runFiles = []
+    sortIndices = None
+    if initialise.presort:
+        sortIndices = keyIndices
+    # the fields of the records of the binary sqlldr stream, the wide codes 
+    # are packed from their two words instead of python longs
+    fields = None
+    if initialise.sqlldrFormat == 'binary':
+        fields = initialise.getBinaryFields()
+        args = args + (True,)
+    
+    # the points with a morton code converted before in the same epoch are 
+    # dropped, a file pool converts the files of an epoch in one process
+    keyIndex = None
+    if initialise.dedupe:
+        keyIndex = initialise.columnNames.index('morton')
+    keyFilter = getKeyFilter(keyIndex)
+    units = getUnits(initialise, files, filePool is not None)
+    
+    # the file pool returns the units in their sorted order, so the output and
+    # the meta table updates are the same as those of the serial conversion
+    columnNames = [initialise.getDBColumn(i)[0] for i in range(len(initialise.cols))]
+    if initialise.loader == 'arraybind':
+        batchLog = open('batches_{0}.txt'.format(initialise.iotTableName), 'a')
+        if filePool is not None:
+            converted = filePool.imap(insertFileJob, [(unit, funct, initialise.dataset, initialise.scale, args, initialise.tableName, 
+                                                       columnNames, initialise.batchSize, initialise.pipelineDepth, initialise.cacheDir, keyIndex) for unit in units])
+    elif filePool is not None:
+        converted = filePool.imap(convertFileJob, [(unit, funct, initialise.dataset, initialise.scale, sortIndices, args, initialise.chunkSize, fields, initialise.pipelineDepth, initialise.cacheDir, keyIndex) + 
+                                                   fileOutput(initialise, i, unit, True) for i, unit in enumerate(units)])
+    
+    # the counters of the stages summed over the files
+    stageCounters = []
     
-    index = True
-    init = initialise.init
     counter = 0 # for timing the morton conversion - workaround
-    for cfile in files:
+    for i, unit in enumerate(units):
         start = time.time()
-        f = reader.readFileLaspy(cfile)
-        minxyz, maxxyz = reader.getMinMaxLaspy(f)
-        t = parseTimeFromFilename(cfile, initialise.dataset)
-        updateMetaTable(connection, cursor, initialise.metaTable, SRID, minxyz[0], minxyz[1], minxyz[2], maxxyz[0], maxxyz[1], maxxyz[2], t, scalex, scaley, scalez, offx, offy, offz, init)
-        
-        
-        morton = perform(funct, f, t * initialise.scale, *args)
-        index = False 
-        
-        #Making sure the meta is not initialised again
-        if (init == 'True' or init == True) and index == False:
-            init = False 
+        writeTime = 0
+        if filePool is not None:
+            outFiles, counters = next(converted)
+        elif initialise.loader == 'arraybind':
+            # without a file pool every unit is a single file
+            cfile = unit[0]
+            t, minxyz, maxxyz, batches, counters = insertFile(cfile, funct, initialise.dataset, initialise.scale, args, initialise.tableName, 
+                                                              columnNames, initialise.batchSize, initialise.pipelineDepth, initialise.cacheDir, connection, keyFilter)
+            outFiles = [(cfile, batches)]
         else:
-            init = False
+            cfile = unit[0]
+            fileName, runPrefix = fileOutput(initialise, i, cfile, False)
+            writer = ChunkWriter(out, fileName, runPrefix, fields is not None)
+            t, minxyz, maxxyz, counters = convertFile(cfile, funct, initialise.dataset, initialise.scale, sortIndices, args, 
+                                                      writer, initialise.chunkSize, pool, initialise.encodeProcesses, fields, 
+                                                      initialise.pipelineDepth, initialise.cacheDir, keyFilter)
+            writer.close()
+            outFiles, writeTime = writer.files, writer.time
+        stageCounters = addCounters(stageCounters, counters)
+        if initialise.loader == 'arraybind':
+            # the batches of every file: points and insert time
+            for (cfile, batches) in outFiles:
+                for (numPoints, insertTime) in batches:
+                    batchLog.write('{0} {1} {2}\n'.format(cfile[cfile.rfind('/') + 1:], numPoints, insertTime))
+                writeTime += sum([insertTime for (numPoints, insertTime) in batches])
         
-        a = formatMorton(morton)
-        counter += (time.time() - start)
-        if initialise.loader == 'sqlldr':
-            print a
-        else:
-            fh = open(file[file.rfind('/') + 1:file.rfind('.')] + '.txt', 'w')
-            fh.write(a)
-            fh.close()
+        counter += (time.time() - start - writeTime)
+        if initialise.presort:
+            runFiles.extend(outFiles)
+        elif filePool is not None and initialise.loader != 'arraybind':
+            # the parts are copied to the output in the order of the files
+            for part in outFiles:
+                copyPart(part, out, fields)
+                os.remove(part)
             
+    for p in [pool, filePool]:
+        if p is not None:
+            p.close()
+            p.join()
+    
+    if initialise.loader == 'arraybind':
+        batchLog.close()
+    
+    if initialise.presort:
+        start = time.time()
+        mergeRuns(runFiles, keyIndices, out, fields)
+        counter += (time.time() - start)
+        for runFile in runFiles:
+            os.remove(runFile)
+    if out is not sys.stdout:
+        out.close()
+    
+    # the throughput of every stage, the slowest stage limits the ingest
+    f = open('pipeline_{0}.txt'.format(initialise.iotTableName), 'a')
+    f.write(' '.join(pipeline.HEADER) + '\n')
+    for c in stageCounters:
+        f.write(' '.join(map(str, c.row())) + '\n')
+    f.close()
+    
     #work-around
     f = open('morton_{0}.txt'.format(initialise.iotTableName), 'a')
     f.write(str(counter))
@@ -116,8 +767,116 @@ def converter(ini_file):
     f.close()
     return counter
 
-def formatMorton(lst):
-    return '\n'.join([', '.join(map(str,i)) for i in lst])
+def balanceFiles(files, numGroups, units = None):
+    """Spreads the files over numGroups groups of about the same total size,
+    the largest file first to the smallest group. With the units, lists of 
+    files, the files of a unit stay in the same group."""
+    if units is None:
+        units = [[cfile] for cfile in files]
+    groups = [[] for i in range(numGroups)]
+    sizes = [0] * numGroups
+    unitSize = lambda unit: sum(os.path.getsize(cfile) for cfile in unit)
+    for unit in sorted(units, key = unitSize, reverse = True):
+        i = sizes.index(min(sizes))
+        groups[i].append(unit)
+        sizes[i] += unitSize(unit)
+    return [[cfile for unit in sorted(group) for cfile in unit] for group in groups]
+
+def writeLocations(locations, files, units = None):
+    """Lists the files in the location files of the preprocessor mode, with
+    about the same total size in every location file and the files of a unit
+    in the same location file."""
+    for location, group in zip(locations, balanceFiles(files, len(locations), units)):
+        fh = open(location, 'w')
+        fh.write(''.join(cfile + '\n' for cfile in group))
+        fh.close()
+
+def writePreprocessor(scriptName, ini_file, bits = None):
+    """Writes the preprocessor script of the external table. Oracle runs it
+    with the path of a location file and without the environment of the 
+    user, so the python, the package and the configuration are absolute."""
+    command = [sys.executable, '-W', 'ignore', '-m', 'pointcloud.mortonConverter', 
+               '--preprocess', os.path.abspath(ini_file), '"$1"']
+    if bits is not None:
+        command.append(','.join(map(str, bits)))
+    fh = open(scriptName, 'w')
+    fh.write('#!/bin/sh\n')
+    fh.write('PYTHONPATH={0} exec {1}\n'.format(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ' '.join(command)))
+    fh.close()
+    os.chmod(scriptName, 0755)
+
+def prepareLocations(initialise):
+    """Prepares the preprocessor mode of the external table. The laz files 
+    are listed in location files of about the same total size and the script
+    that converts the files of a location file is written. The points are 
+    converted by the script while Oracle reads the external table, here only
+    the headers are read for the meta table."""
+    connection = initialise.getConnection()
+    cursor = connection.cursor()
+    files = getLasFiles(initialise)
+    funct, args, offsets, scales = getConversion(initialise)
+    extent = prescanFiles(files, initialise.dataset)
+    bits = getBits(initialise, extent, cursor, offsets, scales)
+    writeMetaTable(connection, cursor, initialise, extent, offsets, scales, bits)
+    
+    # the files of an epoch are converted by the same preprocessor
+    writeLocations(initialise.getExternalFiles(), files, getUnits(initialise, files, True))
+    writePreprocessor(initialise.getPreprocessor(), initialise.configFile, bits)
+    return 0
+
+def preprocess(ini_file, locationFile, bits = None):
+    """The preprocessor of the external table. Converts the laz files listed
+    in the location file and writes the lines to the standard output, which
+    Oracle reads as the records of the location file."""
+    initialise = Oracle(ini_file)
+    mortonCodec.setEngine(initialise.codec.lower(), initialise.clustering.lower())
+    funct, args, offsets, scales = getConversion(initialise)
+    if initialise.integration == 'deep':
+        args = args + (bits,)
+    writer = ChunkWriter(sys.stdout)
+    keyFilter = None
+    if initialise.dedupe:
+        keyFilter = KeyFilter(initialise.columnNames.index('morton'))
+    for cfile in open(locationFile).read().splitlines():
+        if cfile != '':
+            convertFile(cfile, funct, initialise.dataset, initialise.scale, None, args, writer, 
+                        initialise.chunkSize, depth = initialise.pipelineDepth, cacheDir = initialise.cacheDir, 
+                        keyFilter = keyFilter)
+    sys.stdout.flush()
+
+def formatMorton(columns):
+    """Formats the column arrays returned by the morton functions into comma 
+    separated lines."""
+    return '\n'.join(map(', '.join, zip(*[map(str, column.tolist()) for column in columns])))
+ 
+def binaryDtype(fields):
+    """Returns the numpy record type of the fields of the binary stream."""
+    return np.dtype([(name, ntype) for (columnName, columnFields) in fields for (name, ctype, ntype) in columnFields])
+
+def formatBinary(columns, fields):
+    """Packs the column arrays returned by the morton functions into the 
+    fixed length records of native numbers of the binary sqlldr stream. The 
+    wide codes are split in a high and a low word of SQLLDR_WORD_BITS."""
+    records = np.empty(len(columns[0]), dtype = binaryDtype(fields))
+    for column, (columnName, columnFields) in zip(columns, fields):
+        if len(columnFields) == 2 and np.asarray(column).dtype.kind in 'iu':
+            records[columnFields[0][0]] = column >> SQLLDR_WORD_BITS
+            records[columnFields[1][0]] = column & ((1 << SQLLDR_WORD_BITS) - 1)
+        elif len(columnFields) == 2:
+            words = morton.LongToWords(column)
+            shift = np.uint64(64 - SQLLDR_WORD_BITS)
+            records[columnFields[0][0]] = (words['hi'] << shift) | (words['lo'] >> np.uint64(SQLLDR_WORD_BITS))
+            records[columnFields[1][0]] = words['lo'] & np.uint64((1 << SQLLDR_WORD_BITS) - 1)
+        else:
+            records[columnFields[0][0]] = column
+    return records.tostring()
+
+def formatColumns(columns, fields = None):
+    """Formats the column arrays as lines or, with the fields of the binary
+    stream, as binary records."""
+    if fields is not None:
+        return formatBinary(columns, fields)
+    return formatMorton(columns)
  
 def parseTimeFromFilename(name, dataset):
     """This function extracts the time information from the file name depending
@@ -129,12 +888,43 @@ def parseTimeFromFilename(name, dataset):
         return reader.daySinceEpoch(date[0], date[1], date[2])
     elif dataset.lower() in ['coastline']:
         return int(name[name.rfind('/')+1:name.rfind('/')+5])
+
+def prescanFiles(files, dataset):
+    """Reads only the headers of the files and returns the minimum and the 
+    maximum x, y, z and the first and the last time of all the files, or 
+    None without files."""
+    if len(files) == 0:
+        return None
+    minxyz, maxxyz = zip(*[reader.getMinMaxHeader(cfile) for cfile in files])
+    times = [parseTimeFromFilename(cfile, dataset) for cfile in files]
+    return np.min(minxyz, axis = 0).tolist(), np.max(maxxyz, axis = 0).tolist(), min(times), max(times)
+
+def resolveBits(bits, extent, scale, offsets, scales):
+    """Replaces the auto entries of the bits (t, x, y(, z)) with the number of 
+    bits needed for the largest value of the dimension. The maxima come from 
+    the extent of the prescan of the files, the points are not read."""
+    if 'auto' not in bits:
+        return list(bits)
+    if extent is None:
+        raise Exception('ERROR: The bits cannot be resolved without files')
+    minxyz, maxxyz, mint, maxt = extent
+    maxt = maxt * scale
+    maxima = [int(maxt)] + [int(np.floor((m - off) / s + 0.5)) for m, off, s in zip(maxxyz, offsets, scales)]
+    return [max(1, int(maxima[d]).bit_length()) if b == 'auto' else b for d, b in enumerate(bits)]
    
-def updateMetaTable(connection, cursor, metaTable, srid, minx, miny, minz, maxx, maxy, maxz, t, scalex, scaley, scalez, offx, offy, offz, typel):    
+def writeMetaTable(connection, cursor, initialise, extent, offsets, scales, bits = None):
+    """Writes the extent of the prescan of the files to the meta table, a new
+    row for a new table and the extent merged with the stored one otherwise."""
+    if extent is None:
+        return
+    minxyz, maxxyz, mint, maxt = extent
+    updateMetaTable(connection, cursor, initialise.metaTable, SRID, minxyz[0], minxyz[1], minxyz[2], maxxyz[0], maxxyz[1], maxxyz[2], 
+                    mint, maxt, scales[0], scales[1], scales[2], offsets[0], offsets[1], offsets[2], initialise.init, bits)
+
+def updateMetaTable(connection, cursor, metaTable, srid, minx, miny, minz, maxx, maxy, maxz, mint, maxt, scalex, scaley, scalez, offx, offy, offz, typel, bits = None):    
     if typel == False or typel == 'False':
         cursor.execute("SELECT minx, miny, minz, mint, maxx, maxy, maxz, maxt FROM {0}".format(metaTable))
         res = cursor.fetchall()[0]
-        mint, maxt = t, t
         if res[0] <= minx: minx = res[0]
         if res[1] <= miny: miny = res[1]
         if res[2] <= minz: minz = res[2]
@@ -146,7 +936,13 @@ def updateMetaTable(connection, cursor, metaTable, srid, minx, miny, minz, maxx,
         
         ora.updateMetaTableValues(connection, cursor, metaTable, minx, miny, minz, mint, maxx, maxy, maxz, maxt)
     else:
-        ora.populateMetaTable(connection, cursor, metaTable, srid, minx, miny, minz, t, maxx, maxy, maxz, t, scalex, scaley, scalez, offx, offy, offz)
+        ora.populateMetaTable(connection, cursor, metaTable, srid, minx, miny, minz, mint, maxx, maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz, bits)
  
 if __name__ == "__main__":
-    converter(sys.argv[1])
+    if sys.argv[1] == '--preprocess':
+        bits = None
+        if len(sys.argv) > 4:
+            bits = [int(b) for b in sys.argv[4].split(',')]
+        preprocess(sys.argv[2], sys.argv[3], bits)
+    else:
+        converter(sys.argv[1], sys.argv[2:])
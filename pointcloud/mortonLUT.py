@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Lookup table morton codec. It offers the same array functions as the
+vectorized part of the morton module, but the bits are spread byte by byte
+with precomputed tables instead of the magic bits shifts. Decoding gathers
+several bits of a dimension per lookup.
+"""
+import pointcloud.morton as morton
+import numpy as np
+
+###############################################################################
+######################          Lookup tables            ######################
+###############################################################################
+
+# encoding: a byte spread over 2, 3 and 4 dimensions
+ENCODE_2D = morton.Expand2DArray(np.arange(256)).astype(np.uint64)
+ENCODE_3D = morton.Expand3DArray_21bit(np.arange(256)).astype(np.uint64)
+ENCODE_4D = morton.Expand4DArray_16bit(np.arange(256))
+
+# decoding: 8 bits of a dimension from 16 bits of a 2D code, 4 bits from 12
+# bits of a 3D code and 4 bits from 16 bits of a 4D code
+DECODE_2D = morton.Compact2DArray(np.arange(1 << 16))
+DECODE_3D = morton.Compact3DArray_21bit(np.arange(1 << 12))
+DECODE_4D = morton.Compact4DArray_16bit(np.arange(1 << 16, dtype = np.uint64))
+
+def lookupExpand(v, table, numDims, numBytes):
+    """
+    Spreads the bits of a dimension byte by byte using the lookup table
+
+    Args:
+        v (numpy.ndarray): int64 array of the dimension
+        table (numpy.ndarray): the encoding lookup table
+        numDims (int): the number of dimensions of the code
+        numBytes (int): the number of bytes of v to encode
+
+    Returns:
+        numpy.ndarray: uint64 array of the expanded dimension
+    """
+    b = table[v & 0xff]
+    for k in range(1, numBytes):
+        b |= table[(v >> (8 * k)) & 0xff] << np.uint64(8 * k * numDims)
+    return b
+
+def lookupCompact(w, table, chunkBits, dimBits, numChunks):
+    """
+    Gathers the bits of a dimension chunk by chunk using the lookup table
+
+    Args:
+        w (numpy.ndarray): uint64 array of codes shifted to the dimension
+        table (numpy.ndarray): the decoding lookup table
+        chunkBits (int): the number of code bits read per lookup
+        dimBits (int): the number of dimension bits given per lookup
+        numChunks (int): the number of lookups
+
+    Returns:
+        numpy.ndarray: int64 array of the dimension
+    """
+    mask = np.uint64((1 << chunkBits) - 1)
+    b = table[(w & mask).astype(np.int64)]
+    for k in range(1, numChunks):
+        b = b | (table[((w >> np.uint64(chunkBits * k)) & mask).astype(np.int64)] << (dimBits * k))
+    return b
+
+###############################################################################
+######################      Morton conversion in 2D      ######################
+###############################################################################
+
+def EncodeMorton2DArray(x, y):
+    """
+    Calculates the 2D morton codes from arrays of the x, y dimensions
+
+    Args:
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the y dimension
+
+    Returns:
+        numpy.ndarray: int64 array of 2D morton codes
+    """
+    x, y = morton.toPositiveArray(x), morton.toPositiveArray(y)
+    return (lookupExpand(x, ENCODE_2D, 2, 4) | (lookupExpand(y, ENCODE_2D, 2, 4) << np.uint64(1))).astype(np.int64)
+
+def DecodeMorton2DArray(mortonCodes):
+    """
+    Calculates the x, y coordinates from an array of 64 bit morton codes
+
+    Args:
+        mortonCodes (array like): the 64 bit morton codes
+
+    Returns:
+        tuple: int64 arrays of the x and y coordinates
+
+    Raises:
+        Exception: ERROR: Morton code is always positive
+    """
+    m = np.asarray(mortonCodes, dtype = np.int64)
+    if (m < 0).any():
+        raise Exception("""ERROR: Morton code is always positive""")
+    m = m.astype(np.uint64)
+    return (lookupCompact(m, DECODE_2D, 16, 8, 4),
+            lookupCompact(m >> np.uint64(1), DECODE_2D, 16, 8, 4))
+
+###############################################################################
+######################      Morton conversion in 3D      ######################
+###############################################################################
+
+def EncodeMorton3DWords(x, y, z):
+    """
+    Calculates the two-word 93 bit 3D morton codes from arrays of the x, y, z
+    dimensions
+
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 3D morton codes
+    """
+    lo = np.zeros(len(x), dtype = np.uint64)
+    hi = np.zeros(len(x), dtype = np.uint64)
+    for i, v in enumerate((x, y, z)):
+        v = morton.toPositiveArray(v)
+        lo |= lookupExpand(v & morton.MASK_3D_21BIT, ENCODE_3D, 3, 3) << np.uint64(i)
+        hi |= lookupExpand(v >> 21, ENCODE_3D, 3, 2) << np.uint64(i)
+    return morton.toWords(hi >> np.uint64(1), lo | (hi << np.uint64(63)))
+
+def DecodeMorton3DWords(words):
+    """
+    Calculates the x, y, z coordinates from two-word 93 bit morton codes
+
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 3D morton codes
+
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    lo = words['lo'] & np.uint64(0x7fffffffffffffff)
+    hi = (words['hi'] << np.uint64(1)) | (words['lo'] >> np.uint64(63))
+    return tuple(lookupCompact(lo >> np.uint64(i), DECODE_3D, 12, 4, 6) |
+                 (lookupCompact(hi >> np.uint64(i), DECODE_3D, 12, 4, 3) << 21) for i in range(3))
+
+def EncodeMorton3DArray(x, y, z):
+    """
+    Calculates the 93 bit 3D morton codes from arrays of the x, y, z dimensions.
+
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+
+    Returns:
+        numpy.ndarray: object array of 93 bit morton codes
+    """
+    return morton.WordsToLong(EncodeMorton3DWords(x, y, z))
+
+def DecodeMorton3DArray(mortonCodes):
+    """
+    Calculates the x, y, z coordinates from an array of 93 bit morton codes
+
+    Args:
+        mortonCodes (array like): the 93 bit morton codes
+
+    Returns:
+        tuple: int64 arrays of the x, y and z coordinates
+    """
+    return DecodeMorton3DWords(morton.LongToWords(mortonCodes))
+
+###############################################################################
+######################      Morton conversion in 4D      ######################
+###############################################################################
+
+def EncodeMorton4DWords(x, y, z, t):
+    """
+    Calculates the two-word 124 bit 4D morton codes from arrays of the x, y, z,
+    t dimensions. The argument order follows EncodeMorton4D.
+
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        t (numpy.ndarray): the time dimension of 31 bits
+
+    Returns:
+        numpy.ndarray: MORTON_WORDS array of 4D morton codes
+    """
+    lo = np.zeros(len(x), dtype = np.uint64)
+    hi = np.zeros(len(x), dtype = np.uint64)
+    for i, v in enumerate((x, y, z, t)):
+        v = morton.toPositiveArray(v)
+        lo |= lookupExpand(v & morton.MASK_4D_16BIT, ENCODE_4D, 4, 2) << np.uint64(i)
+        hi |= lookupExpand(v >> 16, ENCODE_4D, 4, 2) << np.uint64(i)
+    return morton.toWords(hi, lo)
+
+def DecodeMorton4DWords(words):
+    """
+    Calculates the coordinates from two-word 124 bit morton codes. The order
+    of the dimensions follows EncodeMorton4D.
+
+    Args:
+        words (numpy.ndarray): MORTON_WORDS array of 4D morton codes
+
+    Returns:
+        tuple: int64 arrays of the t, x, y and z coordinates
+    """
+    return tuple(lookupCompact(words['lo'] >> np.uint64(i), DECODE_4D, 16, 4, 4) |
+                 (lookupCompact(words['hi'] >> np.uint64(i), DECODE_4D, 16, 4, 4) << 16) for i in range(4))
+
+def EncodeMorton4DArray(x, y, z, t):
+    """
+    Calculates the 124 bit 4D morton codes from arrays of the x, y, z, t
+    dimensions. The argument order follows EncodeMorton4D.
+
+    Args:
+        x (numpy.ndarray): the x dimension of 31 bits
+        y (numpy.ndarray): the y dimension of 31 bits
+        z (numpy.ndarray): the z dimension of 31 bits
+        t (numpy.ndarray): the time dimension of 31 bits
+
+    Returns:
+        numpy.ndarray: object array of 124 bit morton codes
+    """
+    return morton.WordsToLong(EncodeMorton4DWords(x, y, z, t))
+
+def DecodeMorton4DArray(mortonCodes):
+    """
+    Calculates the coordinates from an array of 124 bit morton codes. The order
+    of the dimensions follows EncodeMorton4D.
+
+    Args:
+        mortonCodes (array like): the 124 bit morton codes
+
+    Returns:
+        tuple: int64 arrays of the t, x, y and z coordinates
+    """
+    return DecodeMorton4DWords(morton.LongToWords(mortonCodes))
@@ -60,7 +60,9 @@ def createUser(cursorSuper, userName, password, tableSpace, tempTableSpace):
 
 def createDirectory(cursorSuper, directoryVariableName, directoryAbsPath, userName):
     """
-    Creates a Oracle directory with read and write permission for the user.
+    Creates a Oracle directory with read, write and execute permission for 
+    the user. The execute permission allows the preprocessor scripts of the 
+    external tables.
     
     Needs administravive privileges to perform this action.
     """
@@ -74,6 +76,7 @@ WHERE directory_name = :name""", [directoryVariableName,])
     cursorSuper.execute("CREATE DIRECTORY " + directoryVariableName + " AS '" + directoryAbsPath + "'")
     cursorSuper.execute("GRANT READ ON DIRECTORY " + directoryVariableName + " TO " + userName)
     cursorSuper.execute("GRANT WRITE ON DIRECTORY " + directoryVariableName + " TO " + userName)
+    cursorSuper.execute("GRANT EXECUTE ON DIRECTORY " + directoryVariableName + " TO " + userName)
     cursorSuper.connection.commit()
 
 def createMetaTable(cursor, metaTable, check):
@@ -82,7 +85,7 @@ def createMetaTable(cursor, metaTable, check):
     during the querying stage. This information is needed for the Quadtree-like 
     structure. If the table already exists it drops it.
     Stores: id, srid, minx, miny, minz, mint, maxx, maxy, maxz, maxt, scalex, 
-    scaley, scalez, offx, offy, offz
+    scaley, scalez, offx, offy, offz, bitst, bitsx, bitsy, bitsz
     """
     
     dropTable(cursor, metaTable,check)
@@ -103,18 +106,37 @@ scaley DOUBLE PRECISION,
 scalez DOUBLE PRECISION,
 offx DOUBLE PRECISION,
 offy DOUBLE PRECISION,
-offz DOUBLE PRECISION)""".format(metaTable))
+offz DOUBLE PRECISION,
+bitst INTEGER,
+bitsx INTEGER,
+bitsy INTEGER,
+bitsz INTEGER)""".format(metaTable))
     
-def populateMetaTable(connection, cursor, metaTable, srid, minx, mixy, minz, mint, maxx, maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz):
+def populateMetaTable(connection, cursor, metaTable, srid, minx, mixy, minz, mint, maxx, maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz, bits = None):
     """
     Populate the metadata table with the right metadata. Used only for the first
-    time data are inserted into the table.
+    time data are inserted into the table. The bits (t, x, y, z) of the morton 
+    code are NULL when every dimension has the default number of bits.
     """    
     
+    bits = list(bits or [])
+    bits = ['NULL' if b is None else b for b in bits + [None] * (4 - len(bits))]
     cursor.execute("""INSERT INTO {0} VALUES (1, {1}, {2}, {3}, {4}, {5}, {6}, {7}, {8}, {9}, {10}, {11},
-    {12}, {13}, {14}, {15})""".format(metaTable, srid, minx, mixy, minz, mint, maxx, maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz))
+    {12}, {13}, {14}, {15}, {16}, {17}, {18}, {19})""".format(metaTable, srid, minx, mixy, minz, mint, maxx, maxy, maxz, maxt, scalex, scaley, scalez, offx, offy, offz, *bits))
     connection.commit()
 
+def getMetaBits(cursor, metaTable, numDims):
+    """
+    Returns the number of bits of the t, x, y(, z) dimensions of the morton 
+    code as stored in the metadata table, or None if they are not stored.
+    """
+    
+    cursor.execute("SELECT bitst, bitsx, bitsy, bitsz FROM {0}".format(metaTable))
+    bits = cursor.fetchone()[:numDims]
+    if None in bits:
+        return None
+    return [int(b) for b in bits]
+
 def updateMetaTableValues(connection, cursor, metaTable, minx, miny, minz, mint, maxx, maxy, maxz, maxt):
     """
     Update the metadata if the values have changed since the last import.
@@ -171,6 +193,19 @@ def mogrifyMany(cursor, query, queryArgs = None):
         else:
             cursor.executemany(None, queryArgs)
 
+def insertRows(cursor, tableName, columnNames, rows):
+    """
+    Inserts the rows with one array bound executemany. All the values are 
+    bound as numbers, so the codes wider than 64 bits stay exact.
+    """
+    if len(rows) == 0:
+        return
+    cursor.prepare("INSERT INTO " + tableName + " (" + ', '.join(columnNames) + ") VALUES (" + 
+                   ', '.join([':' + str(i + 1) for i in range(len(columnNames))]) + ")")
+    cursor.bindarraysize = len(rows)
+    cursor.setinputsizes(*([cx_Oracle.NUMBER] * len(columnNames)))
+    cursor.executemany(None, rows)
+
 def mogrify(cursor, query, queryArgs = None):
     """
     Executes the query statement  or prepares it for execution.
@@ -219,6 +254,13 @@ def dropTable(cursor, tableName, check = False):
     else:
         cursor.execute('DROP TABLE ' + tableName + ' PURGE')
 
+def tableExists(cursor, tableName):
+    """
+    Returns whether the table exists.
+    """
+    cursor.execute('SELECT table_name FROM all_tables WHERE table_name = :1',[tableName.upper(),])
+    return len(cursor.fetchall()) > 0
+
 def createIOT(cursor, iotTableName, columns, keyColumn, check = False):
     """
     Creates an Index-Organized-Table.
@@ -289,6 +331,76 @@ SELECT *
 FROM {1}""".format(iotTableName, tableName))
     connection.commit()
     
+def getKeyRange(cursor, tableName, column):
+    """
+    Returns the minimum and the maximum of a column, None and None for an 
+    empty table. On the leading column of the primary key of an IOT they are
+    read from the ends of the index.
+    """
+    cursor.execute("""SELECT MIN({1}), MAX({1}) FROM {0}""".format(tableName, column))
+    return cursor.fetchone()
+
+def addPartition(cursor, tableName, partitionName, upperBound):
+    """
+    Adds a range partition for the keys below upperBound above the highest 
+    partition of the table.
+    """
+    mogrifyExecute(cursor, """ALTER TABLE {0} 
+ADD PARTITION {1} VALUES LESS THAN ({2})""".format(tableName, partitionName, upperBound))
+
+def exchangePartition(cursor, tableName, partitionName, segmentTableName):
+    """
+    Swaps the segment of an empty partition with the segment of a standalone 
+    table of the same structure. Only the data dictionary changes, the rows 
+    are neither moved nor validated against the range of the partition.
+    """
+    mogrifyExecute(cursor, """ALTER TABLE {0} 
+EXCHANGE PARTITION {1} WITH TABLE {2} WITHOUT VALIDATION""".format(tableName, partitionName, segmentTableName))
+
+def getPartitions(cursor, tableName):
+    """
+    Returns the names of the partitions of a table in the order of their keys.
+    """
+    cursor.execute("""SELECT partition_name FROM user_tab_partitions 
+WHERE table_name = :1 ORDER BY partition_position""",[tableName.upper(),])
+    return [row[0] for row in cursor.fetchall()]
+
+def dropPartition(cursor, tableName, partitionName):
+    """
+    Drops a partition with its rows, only the data dictionary changes.
+    """
+    mogrifyExecute(cursor, """ALTER TABLE {0} DROP PARTITION {1}""".format(tableName, partitionName))
+
+def truncatePartition(cursor, tableName, partitionName):
+    """
+    Removes the rows of a partition and keeps the partition, as the last 
+    partition of a table cannot be dropped.
+    """
+    mogrifyExecute(cursor, """ALTER TABLE {0} TRUNCATE PARTITION {1}""".format(tableName, partitionName))
+
+def deleteKeyRanges(cursor, tableName, column, keyRanges):
+    """
+    Deletes the rows with the column in any of the (low, upper) ranges. On 
+    the leading column of the primary key of an IOT every range is a range 
+    scan of the index. The ranges are bound in one round trip.
+    
+    Returns:
+        int: the number of deleted rows
+    """
+    cursor.executemany("""DELETE FROM {0} WHERE {1} BETWEEN :1 AND :2""".format(tableName, column), keyRanges)
+    return cursor.rowcount
+
+def setIncrementalStatistics(cursor, tableName, user):
+    """
+    Sets the incremental statistics preference of a partitioned table, so the
+    global statistics are derived from the statistics of the partitions and 
+    only the changed partitions are scanned.
+    """
+    mogrifyExecute(cursor, """
+BEGIN
+dbms_stats.set_table_prefs('""" + user + """','""" + tableName + """','INCREMENTAL','TRUE');
+END;""")
+
 def renameTable(cursor, oldName, newName):
     """
     Rename the specified table.
@@ -389,6 +501,18 @@ dbms_stats.gather_table_stats('""" + user + """','""" + tableName + \
 """',NULL,NULL,FALSE,'FOR ALL COLUMNS SIZE AUTO',8,'ALL');
 END;""")
 
+def computeIncrementalStatistics(cursor, tableName, user):
+    """
+    Gather optimiser statistics of the changed partitions of a table with the
+    incremental statistics preference.
+    """
+    
+    mogrifyExecute(cursor,"""
+BEGIN
+dbms_stats.gather_table_stats('""" + user + """','""" + tableName + \
+"""',NULL,NULL,FALSE,'FOR ALL COLUMNS SIZE AUTO',8,'AUTO');
+END;""")
+
 def spatialOperator(operator, table_geometry, query_geometry, parameter_string = ''):
     params = ''    
     if parameter_string:
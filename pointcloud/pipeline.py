@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline of stages that run in threads connected by bounded queues. A full
+queue blocks the stage before it, so a slow stage holds back the stages that
+feed it instead of the items piling up in memory. An error in any stage stops
+all stages and is raised again by runPipeline. Every stage counts the points
+it processed, the time it was busy and the time it waited for its input and
+for room in its output, so the stage that limits the throughput shows.
+
+The threads share the interpreter lock, so the busy time of a stage includes
+the time it waited for the lock. The stages also count the CPU time of their
+thread and of the worker processes they handed their items to, which is the
+cost of the stage alone, and the throughput is given per CPU second.
+"""
+import threading
+import Queue
+import ctypes
+import ctypes.util
+import time
+import sys
+
+# marks the end of the items
+END = object()
+
+# the CPU clock of the calling thread of clock_gettime
+CLOCK_THREAD_CPUTIME_ID = 3
+
+class Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+try:
+    clockGettime = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c')).clock_gettime
+except (OSError, AttributeError):
+    clockGettime = None
+
+# the CPU time of the worker processes, per stage thread
+workers = threading.local()
+
+def threadTime():
+    """Returns the CPU seconds of the calling thread or, without a thread 
+    clock, of the process."""
+    if clockGettime is not None:
+        t = Timespec()
+        if clockGettime(CLOCK_THREAD_CPUTIME_ID, ctypes.byref(t)) == 0:
+            return t.tv_sec + t.tv_nsec * 1e-9
+    return time.clock()
+
+def addWorkerTime(seconds):
+    """Adds the CPU seconds that worker processes spent on the item of the
+    stage of the calling thread."""
+    workers.time = getattr(workers, 'time', 0.0) + seconds
+
+def cpuTime():
+    """Returns the CPU seconds of the calling thread and of the worker 
+    processes it handed its items to."""
+    return threadTime() + getattr(workers, 'time', 0.0)
+
+class StopPipeline(Exception):
+    """Raised in a stage when another stage has failed."""
+    pass
+
+class StageCounter(object):
+    """The counters of a stage."""
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.points = 0
+        self.busy = 0.0
+        self.cpu = 0.0
+        self.waitIn = 0.0
+        self.waitOut = 0.0
+
+    def add(self, other):
+        """Adds the counters of the same stage of another run."""
+        self.items += other.items
+        self.points += other.points
+        self.busy += other.busy
+        self.cpu += other.cpu
+        self.waitIn += other.waitIn
+        self.waitOut += other.waitOut
+
+    def throughput(self):
+        """The points per CPU second."""
+        if self.cpu == 0:
+            return 0
+        return int(self.points / self.cpu)
+
+    def row(self):
+        return [self.name, self.items, self.points, round(self.busy, 2), round(self.cpu, 2),
+                round(self.waitIn, 2), round(self.waitOut, 2), self.throughput()]
+
+HEADER = ['stage', 'items', 'points', 'busy', 'cpu', 'waitIn', 'waitOut', 'points/s']
+
+class Stage(threading.Thread):
+    """A stage of the pipeline. The first stage iterates its generator, the
+    others apply their function to the items of the queue before them. The
+    items are (numPoints, data) tuples."""
+    def __init__(self, name, function, inQueue, outQueue, failed):
+        threading.Thread.__init__(self, name = name)
+        self.daemon = True
+        self.function = function
+        self.inQueue = inQueue
+        self.outQueue = outQueue
+        self.failed = failed
+        self.counter = StageCounter(name)
+        self.error = None
+
+    def get(self):
+        start = time.time()
+        while True:
+            if self.failed.is_set():
+                raise StopPipeline()
+            try:
+                item = self.inQueue.get(timeout = 0.1)
+                break
+            except Queue.Empty:
+                pass
+        self.counter.waitIn += time.time() - start
+        return item
+
+    def put(self, item):
+        if self.outQueue is None:
+            return
+        start = time.time()
+        while True:
+            if self.failed.is_set():
+                raise StopPipeline()
+            try:
+                self.outQueue.put(item, timeout = 0.1)
+                break
+            except Queue.Full:
+                pass
+        self.counter.waitOut += time.time() - start
+
+    def items(self):
+        """Yields the results of the stage and adds the time and the CPU time
+        spent on every result to the busy and the CPU time."""
+        if self.inQueue is None:
+            generator = iter(self.function())
+            while True:
+                start, cpu = time.time(), cpuTime()
+                try:
+                    result = next(generator)
+                except StopIteration:
+                    break
+                self.counter.busy += time.time() - start
+                self.counter.cpu += cpuTime() - cpu
+                yield result
+        else:
+            while True:
+                item = self.get()
+                if item is END:
+                    break
+                start, cpu = time.time(), cpuTime()
+                result = self.function(item)
+                self.counter.busy += time.time() - start
+                self.counter.cpu += cpuTime() - cpu
+                yield result
+
+    def run(self):
+        try:
+            for result in self.items():
+                self.counter.items += 1
+                self.counter.points += result[0]
+                self.put(result)
+            self.put(END)
+        except StopPipeline:
+            pass
+        except Exception:
+            self.error = sys.exc_info()
+            self.failed.set()
+
+def runPipeline(stages, depth):
+    """
+    Runs the stages in threads connected by queues of at most depth items.
+
+    Args:
+        stages (list): (name, function) of every stage, the function of the
+            first stage is a generator of the items, the others take an item
+            and return the item for the next stage
+        depth (int): the maximum number of items in a queue
+
+    Returns:
+        list: the StageCounter of every stage
+
+    Raises:
+        The first error of a stage
+    """
+    failed = threading.Event()
+    queues = [Queue.Queue(depth) for i in range(len(stages) - 1)]
+    threads = []
+    for i, (name, function) in enumerate(stages):
+        inQueue = queues[i - 1] if i > 0 else None
+        outQueue = queues[i] if i < len(queues) else None
+        threads.append(Stage(name, function, inQueue, outQueue, failed))
+    for thread in threads:
+        thread.start()
+    # join with a timeout, so that the main thread stays interruptible
+    for thread in threads:
+        while thread.is_alive():
+            thread.join(0.5)
+    for thread in threads:
+        if thread.error is not None:
+            raise thread.error[0], thread.error[1], thread.error[2]
+    return [thread.counter for thread in threads]
+
+def runSerial(stages):
+    """
+    Runs the stages one item at a time in the calling thread, with the same
+    counters as runPipeline.
+
+    Args:
+        stages (list): (name, function) of every stage as in runPipeline
+
+    Returns:
+        list: the StageCounter of every stage
+    """
+    counters = [StageCounter(name) for (name, function) in stages]
+    generator = iter(stages[0][1]())
+    while True:
+        start, cpu = time.time(), cpuTime()
+        try:
+            item = next(generator)
+        except StopIteration:
+            break
+        counters[0].busy += time.time() - start
+        counters[0].cpu += cpuTime() - cpu
+        counters[0].items += 1
+        counters[0].points += item[0]
+        for counter, (name, function) in zip(counters[1:], stages[1:]):
+            start, cpu = time.time(), cpuTime()
+            item = function(item)
+            counter.busy += time.time() - start
+            counter.cpu += cpuTime() - cpu
+            counter.items += 1
+            counter.points += item[0]
+    return counters
+
+def runStages(stages, depth = None):
+    """Runs the stages in a pipeline of the given depth or, without depth,
+    serially."""
+    if depth:
+        return runPipeline(stages, depth)
+    return runSerial(stages)
@@ -13,7 +13,12 @@ except ImportError:
 	raise
 
 import morton as morton
+import mortonCodec
+import numpy as np
+import subprocess
+import struct
 import time 
+import os
 from time import strptime, localtime
 import datetime
 
@@ -22,6 +27,9 @@ from numba import jit
 MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug",
           "Sep", "Oct", "Nov", "Dec"]
 
+# the names of the laszip binary, as laspy looks for it
+LASZIP_NAMES = ('laszip', 'laszip.exe', 'laszip-cli', 'laszip-cli.exe')
+
 def readFileLaspy(filename):
     """
     Function to read a file using Laspy.
@@ -47,12 +55,167 @@ def getMinMaxLaspy(f):
         [xmin, ymin, zmin], [xmax, ymax, zmax]
     """
     return f.header.min, f.header.max
+
+def getMinMaxHeader(filename):
+    """
+    Function that returns the minimum and maximum of the spatial dimensions as 
+    stored in the public header block of a las or laz file. Only the header is
+    read, unlike laspy a laz file is not decompressed.
+    
+    Args:
+        filename (str): the name of the las/laz file
+        
+    Returns:
+        List of minimun and list of maximum of the x, y, z dimensions.
+        [xmin, ymin, zmin], [xmax, ymax, zmax]
+    """
+    fh = open(filename, 'rb')
+    header = fh.read(227)
+    fh.close()
+    if len(header) < 227 or header[:4] != 'LASF':
+        raise Exception('ERROR: Not a las file: ' + filename)
+    # max x, min x, max y, min y, max z, min z at byte 179
+    maxx, minx, maxy, miny, maxz, minz = struct.unpack('<6d', header[179:227])
+    return [minx, miny, minz], [maxx, maxy, maxz]
+
+def unpackHeader(header):
+    """
+    Unpacks the public header block of a las or laz file.
+    
+    Args:
+        header (str): the bytes of the public header block
+        
+    Returns:
+        tuple: the number of points, the offset to the point records, the 
+        length of a point record and the scales and the offsets of the x, y, 
+        z dimensions
+    """
+    if len(header) < 227 or header[:4] != 'LASF':
+        raise Exception('ERROR: Not a las header')
+    offsetToPoints, = struct.unpack('<I', header[96:100])
+    recordLength, = struct.unpack('<H', header[105:107])
+    numPoints, = struct.unpack('<I', header[107:111])
+    if numPoints == 0 and struct.unpack('<2B', header[24:26]) >= (1, 4) and len(header) >= 255:
+        # the legacy number of points of las 1.4 can be 0
+        numPoints, = struct.unpack('<Q', header[247:255])
+    scale = struct.unpack('<3d', header[131:155])
+    offset = struct.unpack('<3d', header[155:179])
+    return numPoints, offsetToPoints, recordLength, scale, offset
+
+def getNumPointsHeader(filename):
+    """
+    Function that returns the number of points as stored in the public header
+    block of a las or laz file, without decompressing a laz file.
+    
+    Args:
+        filename (str): the name of the las/laz file
+        
+    Returns:
+        int: the number of points of the file
+    """
+    fh = open(filename, 'rb')
+    header = fh.read(375)
+    fh.close()
+    return unpackHeader(header)[0]
+
+def getLaszip():
+    """
+    Returns the laszip binary found in the PATH.
+    """
+    for binary in LASZIP_NAMES:
+        if [path for path in os.environ['PATH'].split(os.pathsep) if os.path.isfile(os.path.join(path, binary))]:
+            return binary
+    raise Exception('ERROR: laszip was not found in the PATH')
+
+def readExactly(stream, size):
+    """
+    Reads size bytes from a stream, the stream must not end before.
+    """
+    data = stream.read(size)
+    if len(data) != size:
+        raise Exception('ERROR: The laszip output ended before the last point')
+    return data
+
+def readChunksLaspy(f, chunkSize = None):
+    """
+    Generator that reads the points of a laspy file in consecutive chunks. 
+    Only the integer records of a chunk are scaled, so the float arrays of the
+    whole file are never created. The records of a las file are memory mapped
+    and read on demand.
+    
+    Args:
+        f (Laspy file object): a laspy file object
+        chunkSize (int): the maximum number of points of a chunk, None or 0 
+            for the whole file
+        
+    Yields:
+        tuple: float64 arrays of the x, y and z coordinates of a chunk
+    """
+    numPoints = len(f)
+    if not chunkSize:
+        chunkSize = max(numPoints, 1)
+    scale, offset = f.header.scale, f.header.offset
+    X, Y, Z = f.X, f.Y, f.Z
+    for start in xrange(0, numPoints, chunkSize):
+        stop = start + chunkSize
+        yield (X[start:stop] * scale[0] + offset[0],
+               Y[start:stop] * scale[1] + offset[1],
+               Z[start:stop] * scale[2] + offset[2])
+
+def readChunksLaszip(filename, chunkSize = None):
+    """
+    Generator that reads the points of a laz file in consecutive chunks from
+    the standard output of laszip, which decompresses the file to las as it 
+    is read. Laspy reads the whole decompressed file into memory before the 
+    first point, here only the records of one chunk are in memory.
+    
+    Args:
+        filename (str): the name of the laz file
+        chunkSize (int): the maximum number of points of a chunk, None or 0 
+            for the whole file
+        
+    Yields:
+        tuple: float64 arrays of the x, y and z coordinates of a chunk
+        
+    Raises:
+        Exception: ERROR: laszip failed
+    """
+    process = subprocess.Popen([getLaszip(), '-olas', '-stdout', '-i', filename], stdout = subprocess.PIPE)
+    completed = False
+    try:
+        header = readExactly(process.stdout, 227)
+        headerSize, = struct.unpack('<H', header[94:96])
+        header += readExactly(process.stdout, max(headerSize - 227, 0))
+        numPoints, offsetToPoints, recordLength, scale, offset = unpackHeader(header)
+        # the variable length records
+        readExactly(process.stdout, max(offsetToPoints - len(header), 0))
+        if not chunkSize:
+            chunkSize = max(numPoints, 1)
+        # X, Y, Z are the first fields of every point record format
+        records = np.dtype({'names': ['X', 'Y', 'Z'], 'formats': ['<i4'] * 3, 
+                            'offsets': [0, 4, 8], 'itemsize': recordLength})
+        for start in xrange(0, numPoints, chunkSize):
+            size = min(chunkSize, numPoints - start)
+            chunk = np.frombuffer(readExactly(process.stdout, size * recordLength), dtype = records)
+            yield (chunk['X'] * scale[0] + offset[0],
+                   chunk['Y'] * scale[1] + offset[1],
+                   chunk['Z'] * scale[2] + offset[2])
+        # the extended variable length records of las 1.4
+        process.stdout.read()
+        completed = True
+    finally:
+        if not completed and process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0:
+        raise Exception('ERROR: laszip failed on ' + filename)
     
 ###############################################################################
 ######################  Morton conversions related code  ######################
 ###############################################################################
     
-@jit
+@jit(cache = True)
 def Encode2Morton2D(x, y, offx, offy, scalex, scaley):
     """
     Encodes the morton code in the 2D space by applying a linear transformation 
@@ -72,7 +235,7 @@ def Encode2Morton2D(x, y, offx, offy, scalex, scaley):
     return morton.EncodeMorton2D(int(round((x - offx)/scalex,0)),
                                  int(round((y - offy)/scaley,0)))
 
-@jit
+@jit(cache = True)
 def Encode2Morton3D(x, y, z, offx, offy, offz, scalex, scaley, scalez):
     """
     Encodes the morton code in the 3D space by applying a linear transformation 
@@ -97,7 +260,7 @@ def Encode2Morton3D(x, y, z, offx, offy, offz, scalex, scaley, scalez):
                                  int(round((y - offy)/scaley, 0)),
                                  int(round((z - offz)/scalez, 0)))
     
-@jit
+@jit(cache = True)
 def Encode2Morton4D(t, x, y, z, offx, offy, offz, scalex, scaley, scalez):
     """
     Encodes the morton code in the 4D space by applying a linear transformation 
@@ -122,7 +285,106 @@ def Encode2Morton4D(t, x, y, z, offx, offy, offz, scalex, scaley, scalez):
                                  int(round((y - offy)/scaley, 0)),
                                  int(round((z - offz)/scalez, 0)))
 
-@jit
+def scaleOffsetArray(v, off, scale):
+    """
+    Applies the linear transformation used by the morton encoding to a whole
+    array. Values are rounded half away from zero like round().
+
+    Args:
+        v (numpy.ndarray or float): the dimension values
+        off (float): the offset of the dimension
+        scale (float): the scale of the dimension
+
+    Returns:
+        numpy.ndarray: int64 array of the transformed dimension
+    """
+    d = (np.asarray(v, dtype = np.float64) - off)/scale
+    return (np.sign(d) * np.floor(np.abs(d) + 0.5)).astype(np.int64)
+
+def timeArray(t, n):
+    """
+    Creates an integer array of length n filled with the time value t.
+
+    Args:
+        t (int): the time dimension
+        n (int): the number of points
+
+    Returns:
+        numpy.ndarray: int64 array filled with t
+    """
+    timear = np.empty(n, dtype = np.int64)
+    timear.fill(t)
+    return timear
+
+def Encode2Morton2DArray(x, y, offx, offy, scalex, scaley):
+    """
+    Encodes the morton codes in the 2D space for whole coordinate arrays.
+
+    Args:
+        x (numpy.ndarray): the x dimension,
+        y (numpy.ndarray): the y dimension,
+        offx (float): the offset of the x dimension,
+        offy (float): the offset of the y dimension,
+        scalex (float): the scale in the x axis,
+        scaley (float): the scale in the y axis,
+
+    Returns:
+        numpy.ndarray: int64 array of 2D morton codes
+    """
+    return mortonCodec.engine.EncodeMorton2DArray(scaleOffsetArray(x, offx, scalex),
+                                                  scaleOffsetArray(y, offy, scaley))
+
+def Encode2Morton3DArray(x, y, z, offx, offy, offz, scalex, scaley, scalez, words = False):
+    """
+    Encodes the morton codes in the 3D space for whole coordinate arrays.
+
+    Args:
+        x (numpy.ndarray): the x dimension,
+        y (numpy.ndarray): the y dimension,
+        z (numpy.ndarray): the z dimension,
+        offx (float): the offset of the x dimension,
+        offy (float): the offset of the y dimension,
+        offz (float): the offset of the z dimension,
+        scalex (float): the scale of the x axis,
+        scaley (float): the scale of the y axis,
+        scalez (float): the scale of the z axis
+        words (bool): return the two-word codes instead of python longs
+
+    Returns:
+        numpy.ndarray: object array of 3D morton codes or MORTON_WORDS array
+    """
+    encode = mortonCodec.engine.EncodeMorton3DWords if words else mortonCodec.engine.EncodeMorton3DArray
+    return encode(scaleOffsetArray(x, offx, scalex),
+                  scaleOffsetArray(y, offy, scaley),
+                  scaleOffsetArray(z, offz, scalez))
+
+def Encode2Morton4DArray(t, x, y, z, offx, offy, offz, scalex, scaley, scalez, words = False):
+    """
+    Encodes the morton codes in the 4D space for whole coordinate arrays.
+
+    Args:
+        t (int): the time dimension
+        x (numpy.ndarray): the x dimension
+        y (numpy.ndarray): the x dimension
+        z (numpy.ndarray): the z dimension
+        offx (float): the offset of the x dimension,
+        offy (float): the offset of the y dimension,
+        offz (float): the offset of the z dimension,
+        scalex (float): the scale of the x axis,
+        scaley (float): the scale of the y axis,
+        scalez (float): the scale of the z axis
+        words (bool): return the two-word codes instead of python longs
+
+    Returns:
+        numpy.ndarray: object array of 4D morton codes or MORTON_WORDS array
+    """
+    encode = mortonCodec.engine.EncodeMorton4DWords if words else mortonCodec.engine.EncodeMorton4DArray
+    return encode(timeArray(t, len(x)),
+                  scaleOffsetArray(x, offx, scalex),
+                  scaleOffsetArray(y, offy, scaley),
+                  scaleOffsetArray(z, offz, scalez))
+
+@jit(cache = True)
 def morton2coordsX2D(m, off, scale, res):
     """
     Decodes to the original x dimension by applying a linear transformation 
@@ -138,7 +400,7 @@ def morton2coordsX2D(m, off, scale, res):
     """
     return round((morton.DecodeMorton2DX(m))*scale + off, res)
 
-@jit
+@jit(cache = True)
 def morton2coordsY2D(m, off, scale, res):
     """
     Decodes to the original y dimension by applying a linear transformation 
@@ -269,7 +531,126 @@ def morton2coordsZ4D(m, offz, scalez, res):
         float: the original scaled and translated z dimension
     """
     return round(morton.DecodeMorton4DZ(m)*scalez + offz ,res)
-    
+
+def inverseScaleOffsetArray(v, off, scale, res):
+    """
+    Decodes to the original dimension a whole array by applying a linear
+    transformation
+
+    Args:
+        v (numpy.ndarray): the decoded integer dimension
+        off (float): the offset of the dimension
+        scale (float): the scale of the dimension
+        res (int): the number of decimal digits
+
+    Returns:
+        numpy.ndarray: the original scaled and translated dimension
+    """
+    return np.round(v*scale + off, res)
+
+def morton2coords2DArray(m, offx, offy, scalex, scaley, res):
+    """
+    Decodes an array of 2D morton codes to the original x, y dimensions
+
+    Args:
+        m (array like): the 2D morton codes
+        offx (float): the offset of the x dimension
+        offy (float): the offset of the y dimension
+        scalex (float): the scale of the x dimension
+        scaley (float): the scale of the y dimension
+        res (int): the number of decimal digits
+
+    Returns:
+        tuple: arrays of the original scaled and translated x, y dimensions
+    """
+    x, y = mortonCodec.engine.DecodeMorton2DArray(m)
+    return (inverseScaleOffsetArray(x, offx, scalex, res),
+            inverseScaleOffsetArray(y, offy, scaley, res))
+
+def morton2coords3DArray(m, offx, offy, offz, scalex, scaley, scalez, res):
+    """
+    Decodes an array of 3D morton codes to the original x, y, z dimensions
+
+    Args:
+        m (array like): the 3D morton codes
+        offx (float): the offset of the x dimension
+        offy (float): the offset of the y dimension
+        offz (float): the offset of the z dimension
+        scalex (float): the scale of the x dimension
+        scaley (float): the scale of the y dimension
+        scalez (float): the scale of the z dimension
+        res (int): the number of decimal digits
+
+    Returns:
+        tuple: arrays of the original scaled and translated x, y, z dimensions
+    """
+    x, y, z = mortonCodec.engine.DecodeMorton3DArray(m)
+    return (inverseScaleOffsetArray(x, offx, scalex, res),
+            inverseScaleOffsetArray(y, offy, scaley, res),
+            inverseScaleOffsetArray(z, offz, scalez, res))
+
+def morton2coords4DArray(m, offx, offy, offz, scalex, scaley, scalez, res):
+    """
+    Decodes an array of 4D morton codes to the original t, x, y, z dimensions
+
+    Args:
+        m (array like): the 4D morton codes
+        offx (float): the offset of the x dimension
+        offy (float): the offset of the y dimension
+        offz (float): the offset of the z dimension
+        scalex (float): the scale of the x dimension
+        scaley (float): the scale of the y dimension
+        scalez (float): the scale of the z dimension
+        res (int): the number of decimal digits
+
+    Returns:
+        tuple: int64 array of the t dimension and arrays of the original
+        scaled and translated x, y, z dimensions
+    """
+    t, x, y, z = mortonCodec.engine.DecodeMorton4DArray(m)
+    return (t, inverseScaleOffsetArray(x, offx, scalex, res),
+            inverseScaleOffsetArray(y, offy, scaley, res),
+            inverseScaleOffsetArray(z, offz, scalez, res))
+
+def Encode2MortonBitsArray(coords, offsets, scales, bits, words = False):
+    """
+    Encodes the morton codes with the specified bits per dimension for whole
+    coordinate arrays.
+
+    Args:
+        coords (list): the arrays of the dimensions
+        offsets (list): the offset of every dimension
+        scales (list): the scale of every dimension
+        bits (list): the number of bits of every dimension
+        words (bool): return the two-word codes instead of python longs
+
+    Returns:
+        numpy.ndarray: object array of morton codes or MORTON_WORDS array
+    """
+    codes = morton.EncodeMortonBitsWords(
+        [scaleOffsetArray(c, off, scale) for c, off, scale in zip(coords, offsets, scales)], bits)
+    if words:
+        return codes
+    return morton.WordsToLong(codes)
+
+def morton2coordsBitsArray(m, offsets, scales, bits, res):
+    """
+    Decodes an array of morton codes with the specified bits per dimension to 
+    the original dimensions
+
+    Args:
+        m (array like): the morton codes
+        offsets (list): the offset of every dimension
+        scales (list): the scale of every dimension
+        bits (list): the number of bits of every dimension
+        res (int): the number of decimal digits
+
+    Returns:
+        tuple: arrays of the original scaled and translated dimensions
+    """
+    coords = morton.DecodeMortonBitsWords(morton.LongToWords(m), bits)
+    return tuple(inverseScaleOffsetArray(c, off, scale, res) for c, off, scale in zip(coords, offsets, scales))
+
 
 ###############################################################################
 ######################   Time conversion related code    ######################
@@ -348,6 +729,21 @@ def inverseDaySinceEpoch(num, start = 1990):
     d = datetime.date.fromordinal(datetime.date.toordinal(datetime.datetime(start, 1, 1)) + num  - 1)
     return d.year, d.month, d.day
 
+def formatTimeArray(nums, start = 1990):
+    """
+    Decodes an array of days since the start of the epoch into the format
+    yyyy/mm/dd. Every distinct day is decoded only once.
+
+    Args:
+        nums (numpy.ndarray): the days passed since the start of the epoch
+        start (int): the starting year
+
+    Returns:
+        numpy.ndarray: array of yyyy/mm/dd strings
+    """
+    days, inverse = np.unique(nums, return_inverse = True)
+    return np.array([formatTime(inverseDaySinceEpoch(int(day), start)) for day in days])[inverse]
+
 def formatTime(t):
     """
     Formats time into the format yyyy/mm/dd.
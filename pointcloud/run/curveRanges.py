@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Number of ranges and range generation time of the morton and the hilbert
+clustering for random query boxes. The fetch times are measured with the 
+query script on tables loaded with clustering: morton and clustering: hilbert.
+"""
+from pointcloud.structures.QuadTree import QuadTree
+from pointcloud.structures.dynamicOctree import dynamicOctree
+from pointcloud.structures.HexadecTree import HexadecTree
+from pointcloud.structures.HilbertTree import HilbertQuadTree, HilbertDynamicOctree, HilbertHexadecTree
+from pointcloud.structures.geometry import dynamicPolygon, Polygon4D
+from shapely.geometry import box
+from tabulate import tabulate
+import numpy as np
+import time
+
+###########################
+###   Setup Variables   ###
+###########################
+numBits = 16
+numQueries = 20
+###########################
+
+rng = np.random.RandomState(0)
+size = 1 << numBits
+
+def randomBox():
+    (minx, miny) = rng.randint(0, size / 2, 2)
+    return box(minx, miny, minx + rng.randint(1, size / 2), miny + rng.randint(1, size / 2))
+
+cases = [('lxyt', QuadTree, HilbertQuadTree, (0, 0, size - 1, size - 1), 
+          lambda: randomBox().wkt, {'numLevels': 8}),
+         ('dxyt', dynamicOctree, HilbertDynamicOctree, (0, 0, 0, size - 1, size - 1, size - 1), 
+          lambda: dynamicPolygon(randomBox(), 100, 200), {'numLevels': 8}),
+         ('dxyzt', HexadecTree, HilbertHexadecTree, (0, 0, 0, 0, size - 1, size - 1, size - 1, size - 1), 
+          lambda: Polygon4D(randomBox(), 10, 400, 100, 200), {'numLevels': 6})]
+
+hranges = ['case', 'curve', 'ranges', 'time']
+ranges = []
+for (name, mortonTree, hilbertTree, domain, region, options) in cases:
+    regions = [region() for i in range(numQueries)]
+    for (curve, tree) in [('morton', mortonTree(domain, 'auto', numBits)), 
+                          ('hilbert', hilbertTree(domain, 'auto', numBits))]:
+        start = time.time()
+        numRanges = sum(tree.getMortonRanges(r, **options)[2] for r in regions)
+        ranges.append([name, curve, numRanges / float(numQueries), round((time.time() - start) / numQueries, 4)])
+print tabulate(ranges, hranges, tablefmt="plain")
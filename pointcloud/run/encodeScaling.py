@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Scaling of the parallel morton conversion with the number of processes. The
+output of every number of processes is checked against the serial conversion.
+"""
+from multiprocessing import Pool, cpu_count
+import pointcloud.mortonConverter as mortonConverter
+from pointcloud.general import OFFSET_ZANDMOTOR, SCALE_ZANDMOTOR
+from tabulate import tabulate
+import numpy as np
+import time
+
+###########################
+###   Setup Variables   ###
+###########################
+numPoints = 2000000
+processes = [1, 2, 4, 8, 16, 32]
+###########################
+
+offx, offy, offz, offt = OFFSET_ZANDMOTOR
+scalex, scaley, scalez, scalet = SCALE_ZANDMOTOR
+rng = np.random.RandomState(0)
+f = mortonConverter.PointChunk(offx + rng.rand(numPoints) * 2000, 
+                                offy + rng.rand(numPoints) * 2000, 
+                                offz + rng.rand(numPoints) * 20)
+t = 9000
+
+cases = [('lxyt', mortonConverter.mortonXYTloose, (offx, offy, scalex, scaley)),
+         ('lxyzt', mortonConverter.mortonXYZTloose, (offx, offy, offz, scalex, scaley, scalez)),
+         ('dxyt', mortonConverter.mortonXYTdeep, (offx, offy, scalex, scaley)),
+         ('dxyzt', mortonConverter.mortonXYZTdeep, (offx, offy, offz, scalex, scaley, scalez))]
+
+hscaling = ['case', 'processes', 'time', 'speedup', 'identical']
+scaling = []
+for (name, funct, args) in cases:
+    start = time.time()
+    serial = mortonConverter.formatMorton(funct(f, t, *args))
+    serialTime = time.time() - start
+    scaling.append([name, 'serial', round(serialTime, 2), 1.0, True])
+    for numProcesses in [p for p in processes if p <= cpu_count()]:
+        pool = Pool(numProcesses)
+        start = time.time()
+        parallel = mortonConverter.convertParallel(pool, numProcesses, funct, f, t, args)
+        parallelTime = time.time() - start
+        pool.close()
+        pool.join()
+        scaling.append([name, numProcesses, round(parallelTime, 2), 
+                        round(serialTime / parallelTime, 2), parallel == serial])
+    print tabulate(scaling, hscaling, tablefmt="plain")
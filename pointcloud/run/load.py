@@ -25,7 +25,7 @@ elif dataset == 'coastline':
 
 path = os.getcwd()
 benchmark = ['mini', 'medium', 'full']  
-hloading = ['approach', 'preparation', 'loading', 'closing', 'size[MB]', 'points']
+hloading = ['approach', 'format', 'preparation', 'loading', 'closing', 'size[MB]', 'points', 'points/s']
 
 
 for integr in integrations:
@@ -38,6 +38,7 @@ for integr in integrations:
             bulk = BulkLoader(configuration)
             loading = []
             loading.append(benchmark[i - 1])
+            loading.append(bulk.sqlldrFormat)
                       
             start = time.time()
             bulk.preparation()
@@ -46,6 +47,7 @@ for integr in integrations:
             start = time.time()
             bulk.loading()
             loading.append(round(time.time() - start, 2))
+            loadTime = loading[-1] + loading[-2]
             
             start = time.time()
             bulk.closing()
@@ -54,6 +56,8 @@ for integr in integrations:
             size, points = bulk.statistics()
             loading.append(round(size,2))
             loading.append(int(points))
+            # throughput of the preparation and the loading
+            loading.append(int(points / loadTime) if loadTime else 0)
             
             loadings.append(loading)
             print tabulate(loadings, hloading, tablefmt="plain")
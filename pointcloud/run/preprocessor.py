@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the preprocessor mode of the external loader. The location
+files and the preprocessor script of the configuration are written as for the
+external table, and the script is run on every location file at the same time
+and without the environment of the user, as the parallel granules of Oracle
+run it. The lines of the script are checked against the lines of the serial
+conversion of the files. No database is needed.
+"""
+import pointcloud.mortonConverter as mortonConverter
+import pointcloud.mortonCodec as mortonCodec
+from pointcloud.CommonOracle import Oracle
+from tabulate import tabulate
+import StringIO
+import subprocess
+import time
+import os
+
+###########################
+###   Setup Variables   ###
+###########################
+path = os.getcwd()
+configuration = path + '/ini/preprocessor.ini'
+###########################
+
+initialise = Oracle(configuration)
+initialise.externalMode = 'preprocessor'
+files = mortonConverter.getLasFiles(initialise)
+funct, args, offsets, scales = mortonConverter.getConversion(initialise)
+bits = None
+if initialise.bits is not None:
+    bits = mortonConverter.resolveBits(initialise.bits, mortonConverter.prescanFiles(files, initialise.dataset), 
+                                       initialise.scale, offsets, scales)
+
+locations = initialise.getExternalFiles()
+mortonConverter.writeLocations(locations, files)
+script = initialise.getPreprocessor()
+mortonConverter.writePreprocessor(script, configuration, bits)
+
+# the granules of the external table, one preprocessor per location file
+start = time.time()
+processes = []
+for location in locations:
+    out = open(location + '.out', 'w')
+    processes.append(subprocess.Popen([os.path.abspath(script), os.path.abspath(location)], stdout = out, env = {}))
+    out.close()
+codes = [process.wait() for process in processes]
+elapsed = time.time() - start
+
+lines = []
+hlocations = ['location', 'files', 'size[MB]', 'points', 'exit']
+rows = []
+for location, code in zip(locations, codes):
+    locationFiles = open(location).read().splitlines()
+    output = open(location + '.out').read().splitlines()
+    lines.extend(output)
+    rows.append([location, len(locationFiles),
+                 round(sum(os.path.getsize(cfile) for cfile in locationFiles) / 1024.0 / 1024.0, 2),
+                 len(output), code])
+    os.remove(location + '.out')
+print tabulate(rows, hlocations, tablefmt = "plain")
+
+# the serial conversion of the files
+mortonCodec.setEngine(initialise.codec.lower(), initialise.clustering.lower())
+if initialise.integration == 'deep':
+    args = args + (bits,)
+out = StringIO.StringIO()
+writer = mortonConverter.ChunkWriter(out)
+for cfile in files:
+    mortonConverter.convertFile(cfile, funct, initialise.dataset, initialise.scale, None, args, writer, initialise.chunkSize)
+
+print 'preprocessor time', round(elapsed, 2), 'points/s', int(len(lines) / elapsed) if elapsed else 0
+print 'identical', sorted(lines) == sorted(out.getvalue().splitlines())
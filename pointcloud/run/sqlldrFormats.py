@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput of the text and the binary sqlldr streams produced by the 
+converter: the time to convert and format the points and the bytes sqlldr has
+to read. The binary records are checked against the text lines. The loading 
+throughput of both formats is reported by load.py with the sqlldrFormat of 
+the configuration.
+"""
+import pointcloud.mortonConverter as mortonConverter
+from pointcloud.mortonConverter import perform
+from pointcloud.general import OFFSET_ZANDMOTOR, SCALE_ZANDMOTOR
+from pointcloud.AbstractLoader import Loader
+from tabulate import tabulate
+import numpy as np
+import types
+import time
+
+###########################
+###   Setup Variables   ###
+###########################
+numPoints = 1000000
+###########################
+
+offx, offy, offz, offt = OFFSET_ZANDMOTOR
+scalex, scaley, scalez, scalet = SCALE_ZANDMOTOR
+rng = np.random.RandomState(0)
+f = mortonConverter.PointChunk(offx + rng.rand(numPoints) * 2000, 
+                                offy + rng.rand(numPoints) * 2000, 
+                                offz + rng.rand(numPoints) * 20)
+t = 9000
+
+cases = [('lxyt', [('time', 'INTEGER'), ('morton', 'NUMBER'), ('z', 'NUMBER')], 
+          mortonConverter.mortonXYTloose, (offx, offy, scalex, scaley)),
+         ('lxyzt', [('time', 'INTEGER'), ('morton', 'NUMBER')], 
+          mortonConverter.mortonXYZTloose, (offx, offy, offz, scalex, scaley, scalez)),
+         ('dxyt', [('morton', 'NUMBER'), ('z', 'NUMBER')], 
+          mortonConverter.mortonXYTdeep, (offx, offy, scalex, scaley)),
+         ('dxyzt', [('morton', 'NUMBER')], 
+          mortonConverter.mortonXYZTdeep, (offx, offy, offz, scalex, scaley, scalez))]
+
+def recordsToLines(records, fields):
+    """Formats the binary records as the lines of the text stream."""
+    columns = []
+    for (columnName, columnFields) in fields:
+        if len(columnFields) == 2:
+            columns.append(np.array([(hi << mortonConverter.SQLLDR_WORD_BITS) + lo for hi, lo in 
+                                     zip(records[columnFields[0][0]].tolist(), records[columnFields[1][0]].tolist())], dtype = object))
+        else:
+            columns.append(records[columnName])
+    return mortonConverter.formatMorton(columns)
+
+hformats = ['case', 'format', 'time', 'points/s', 'size[MB]', 'identical']
+formats = []
+for (name, columns, funct, args) in cases:
+    # the fields of the binary records as the loader generates them
+    loader = types.InstanceType(Loader)
+    loader.columns = columns
+    loader.cols = loader.eqColumns()
+    fields = loader.getBinaryFields()
+    # the conversion is timed too, the binary stream keeps the wide codes as
+    # two words instead of python longs
+    start = time.time()
+    text = mortonConverter.formatColumns(perform(funct, f, t, *args))
+    textTime = time.time() - start
+    if 'deep' in funct.__name__:
+        args = args + (None,)
+    start = time.time()
+    binary = mortonConverter.formatColumns(perform(funct, f, t, *(args + (True,))), fields)
+    binaryTime = time.time() - start
+    
+    records = np.frombuffer(binary, dtype = mortonConverter.binaryDtype(fields))
+    identical = recordsToLines(records, fields) == text
+    formats.append([name, 'text', round(textTime, 2), int(numPoints / textTime), 
+                    round(len(text) / 1e6, 1), True])
+    formats.append([name, 'binary', round(binaryTime, 2), int(numPoints / binaryTime), 
+                    round(len(binary) / 1e6, 1), identical])
+    print tabulate(formats, hformats, tablefmt="plain")
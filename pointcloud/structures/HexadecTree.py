@@ -10,10 +10,15 @@ import math
 from pointcloud.structures.geometry import Tesseract, Point4D
 
 class HexadecTree:
-    def __init__(self, domain, numLevels, numBits):
+    def __init__(self, domain, numLevels, numBits, bits = None):
+        """ The bits (t, X, Y, Z) give the number of bits of every dimension in 
+        the morton code. By default all dimensions have numBits bits."""
         if min(domain) < 0:
             raise Exception('ERROR: Domain must contain only positive X and Y numbers!')
-        self.numBits = numBits
+        if bits is None:
+            bits = (numBits, numBits, numBits, numBits)
+        self.bits = tuple(bits)
+        self.numBits = max(self.bits)
        
         if numLevels != 'auto' and numLevels > 0:
             if numLevels > self.numBits:
@@ -24,9 +29,8 @@ class HexadecTree:
             self.numLevels = 'auto'   
         
         mindomain = 0
-        maxdomain = 1 << self.numBits
         
-        parentHexadectant = (mindomain, mindomain, mindomain, mindomain, maxdomain, maxdomain, maxdomain, maxdomain)
+        parentHexadectant = (mindomain, mindomain, mindomain, mindomain) + tuple(1 << b for b in self.bits)
         startLevel = 0
         self.domainRegion = Tesseract(Point4D(*parentHexadectant[:4]), Point4D(*parentHexadectant[4:]))
         fits = True
@@ -54,47 +58,48 @@ class HexadecTree:
               2 if geom2 is partly in geom1"""
         return geom1.relationship(geom2)
 
+    def activeDims(self, level):
+        """ Returns the dimensions that are split below the specified level.
+        A dimension with fewer bits is only split in the deepest levels."""
+        return [d for d in range(4) if self.bits[d] >= self.numBits - level]
+    
+    def keyBits(self, level):
+        """ Returns the number of morton code bits below the specified level"""
+        return sum(min(b, self.numBits - level) for b in self.bits)
+
     def _overlapCodes(self, maxDepth, parentLevel, parentCode, region, mint, minx, miny, minz, maxt, maxx, maxy, maxz): 
         """ Recursive method that return morton ranges overlapping with the region for the specified domain"""
-        ct = mint + ((maxt - mint) / 2)        
-        cx = minx + ((maxx - minx) / 2)
-        cy = miny + ((maxy - miny) / 2)
-        cz = minz + ((maxz - minz) / 2)
+        mins = (mint, minx, miny, minz)
+        maxs = (maxt, maxx, maxy, maxz)
+        active = self.activeDims(parentLevel)
         
-         # Z order hexadectans        
-        hexadectans = [
-           (mint, minx, miny, minz, ct, cx, cy, cz),   #0
-           (ct, minx, miny, minz, maxt, cx, cy, cz),   #1
-           (mint, cx, miny, minz, ct, maxx, cy, cz),   #2
-           (ct, cx, miny, minz, maxt, maxx, cy, cz),   #3
-           (mint, minx, cy, minz, ct, cx, maxy, cz),   #4
-           (ct, minx, cy, minz, maxt, cx, maxy, cz),   #5
-           (mint, cx, cy, minz, ct, maxx, maxy, cz),   #6
-           (ct, cx, cy, minz, maxt, maxx, maxy, cz),   #7
-           (mint, minx, miny, cz, ct, cx, cy, maxz),   #8
-           (ct, minx, miny, cz, maxt, cx, cy, maxz),   #9
-           (mint, cx, miny, cz, ct, maxx, cy, maxz),   #10
-           (ct, cx, miny, cz, maxt, maxx, cy, maxz),   #11
-           (mint, minx, cy, cz, ct, cx, maxy, maxz),   #12
-           (ct, minx, cy, cz, maxt, cx, maxy, maxz),   #13
-           (mint, cx, cy, cz, ct, maxx, maxy, maxz),   #14
-           (ct, cx, cy, cz, maxt, maxx, maxy, maxz)    #15
-         ]
+         # Z order hexadectans, with equal bits:
+         # 0: (mint, minx, miny, minz, ct, cx, cy, cz), 1: (ct, minx, miny, minz, maxt, cx, cy, cz), ...
+        hexadectans = []
+        for hexadecIndex in range(1 << len(active)):
+            hexadectan = list(mins + maxs)
+            for k, d in enumerate(active):
+                center = mins[d] + ((maxs[d] - mins[d]) / 2)
+                if (hexadecIndex >> k) & 1:
+                    hexadectan[d] = center
+                else:
+                    hexadectan[d + 4] = center
+            hexadectans.append(tuple(hexadectan))
         level = parentLevel + 1
           
         codes = []
         c = 0
-        for hexadecIndex in range(16):
+        for hexadecIndex in range(len(hexadectans)):
             hexadectan = hexadectans[hexadecIndex]
 
             relation = self._relation(region, Tesseract(Point4D(*hexadectan[:4]), Point4D(*hexadectan[4:])))
             if relation: #1 or 2
-                hexadecCode = (parentCode << 4) + hexadecIndex
+                hexadecCode = (parentCode << len(active)) + hexadecIndex
                 if parentLevel == maxDepth:
                         codes.append((hexadecCode, level, relation == 1, self.quadCodeToMortonRange(hexadecCode, level))) # relation = 1 indicates that this morton range is fully within query region
                 else:
                     (tcodes, tc) = self._overlapCodes(maxDepth, level, hexadecCode, region, *hexadectan)
-                    if tc == 16:
+                    if tc == len(hexadectans):
                         codes.append((hexadecCode, level, False, self.quadCodeToMortonRange(hexadecCode, level)))
                         c += 1
                     else:
@@ -102,7 +107,7 @@ class HexadecTree:
         return (codes,c)
     
     def quadCodeToMortonRange(self, hexadecCode, level):
-        diff = (self.numBits - level) * 4
+        diff = self.keyBits(level)
         minr = hexadecCode << diff
         maxr = ((hexadecCode + 1) << diff) - 1
         return (minr, maxr)
@@ -181,16 +186,20 @@ class HexadecTree:
     
     def getCoords(self, mortonRange):
         (minr, maxr) = mortonRange
-        mint = morton.DecodeMorton4Dt(minr)
-        minx = morton.DecodeMorton4DX(minr)
-        miny = morton.DecodeMorton4DY(minr)        
-        minz = morton.DecodeMorton4DY(minr)
-        maxt = morton.DecodeMorton4Dt(maxr)
-        maxx = morton.DecodeMorton4DX(maxr)
-        maxy = morton.DecodeMorton4DY(maxr)
-        maxz = morton.DecodeMorton4DZ(maxr)
+        (mint, minx, miny, minz) = morton.DecodeMortonBits(minr, self.bits)
+        (maxt, maxx, maxy, maxz) = morton.DecodeMortonBits(maxr, self.bits)
         return (mint, minx, miny, minz, maxt + 1, maxx + 1, maxy + 1, maxz + 1)
     
+    def getMortonBox(self, region):
+        """ Returns the morton codes of the lower and upper corner of the bounding
+        box of the region, used to scan the IOT with BIGMIN skips."""
+        (minx, miny, maxx, maxy) = region.wkt.bounds
+        mins = (region.tmin, minx, miny, region.zmin)
+        maxs = (region.tmax, maxx, maxy, region.zmax)
+        lows = [min(max(int(math.floor(v)), 0), (1 << b) - 1) for v, b in zip(mins, self.bits)]
+        highs = [min(max(int(math.floor(v)), 0), (1 << b) - 1) for v, b in zip(maxs, self.bits)]
+        return (morton.EncodeMortonBits(lows, self.bits), morton.EncodeMortonBits(highs, self.bits))
+    
     def getMortonRanges(self, region, coarser = 5, continuous = True, distinctIn = False, numLevels = None, maxRanges = None):
         codes, Levels = self.overlapCodes(region, coarser, continuous, numLevels)
         if distinctIn:
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+The trees for the hilbert clustering. Every cell of a tree is an aligned
+square, cube or hypercube, so its points form one range of Hilbert keys just
+as they form one range of morton codes. The trees find the cells that overlap
+the query region as usual and the cells are mapped to Hilbert ranges instead
+of morton ranges. The Hilbert ranges are sorted before they are merged.
+"""
+import pointcloud.morton as morton
+import pointcloud.hilbert as hilbert
+from pointcloud.structures.QuadTree import QuadTree
+from pointcloud.structures.Octree import Octree
+from pointcloud.structures.dynamicOctree import dynamicOctree
+from pointcloud.structures.HexadecTree import HexadecTree
+
+class HilbertRanges:
+    """Maps the cells found by a tree to Hilbert ranges"""
+    numDims = None
+    
+    def cellsToHilbertRanges(self, codes):
+        """ Returns the sorted Hilbert ranges of the cells, given as 
+        (code, level, full, mortonRange). The lower corners of all the cells 
+        are converted at once."""
+        if len(codes) == 0:
+            return []
+        decode = {2: morton.DecodeMorton2DArray, 
+                  3: morton.DecodeMorton3DArray, 
+                  4: morton.DecodeMorton4DArray}[self.numDims]
+        corners = decode([code[-1][0] for code in codes])
+        keys = hilbert.EncodeHilbertArray(corners)
+        hranges = []
+        for code, key in zip(codes, keys.tolist()):
+            mask = (1 << (self.numDims * (self.numBits - code[1]))) - 1
+            hranges.append((key & ~mask, key | mask))
+        return sorted(hranges)
+
+    def getAllRanges(self, codes):
+        return self.cellsToHilbertRanges(codes)
+    
+    def getDiffRanges(self, codes):
+        return (self.cellsToHilbertRanges([code for code in codes if code[2]]),
+                self.cellsToHilbertRanges([code for code in codes if not code[2]]))
+
+class HilbertQuadTree(HilbertRanges, QuadTree):
+    numDims = 2
+
+class HilbertOctree(HilbertRanges, Octree):
+    numDims = 3
+
+class HilbertDynamicOctree(HilbertRanges, dynamicOctree):
+    numDims = 3
+
+class HilbertHexadecTree(HilbertRanges, HexadecTree):
+    numDims = 4
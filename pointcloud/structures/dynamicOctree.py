@@ -10,10 +10,15 @@ import math
 from pointcloud.structures.geometry import dynamicPoint, dynamicCube
 
 class dynamicOctree:
-    def __init__(self, domain, numLevels, numBits):  
+    def __init__(self, domain, numLevels, numBits, bits = None):  
+        """ The bits (t, X, Y) give the number of bits of every dimension in 
+        the morton code. By default all dimensions have numBits bits."""
         if min(domain) < 0:
             raise Exception('ERROR: Domain must contain only positive X, Y and t numbers!')
-        self.numBits = numBits
+        if bits is None:
+            bits = (numBits, numBits, numBits)
+        self.bits = tuple(bits)
+        self.numBits = max(self.bits)
         
         if numLevels != 'auto' and numLevels > 0:
             if numLevels > self.numBits:
@@ -24,9 +29,8 @@ class dynamicOctree:
             self.numLevels = 'auto'   
         
         mindomain = 0
-        maxdomain = 1 << self.numBits
         
-        parentOctant = (mindomain, mindomain, mindomain, maxdomain, maxdomain, maxdomain)
+        parentOctant = (mindomain, mindomain, mindomain) + tuple(1 << b for b in self.bits)
         startLevel = 0
         self.domainRegion = dynamicCube(dynamicPoint(*parentOctant[:3]), dynamicPoint(*parentOctant[3:]))
         fits = True
@@ -54,41 +58,50 @@ class dynamicOctree:
               2 if geom2 is partly in geom1"""
         return geom1.relationship(geom2)
 
+    def activeDims(self, level):
+        """ Returns the dimensions that are split below the specified level.
+        A dimension with fewer bits is only split in the deepest levels."""
+        return [d for d in range(3) if self.bits[d] >= self.numBits - level]
+    
+    def keyBits(self, level):
+        """ Returns the number of morton code bits below the specified level"""
+        return sum(min(b, self.numBits - level) for b in self.bits)
+
     def _overlapCodes(self, maxDepth, parentLevel, parentCode, region, minx, miny, minz, maxx, maxy, maxz): 
         """ Recursive method that return morton ranges overlapping with the region for the specified domain"""
-        cx = minx + ((maxx - minx) >> 1)
-        cy = miny + ((maxy - miny) >> 1)
-        cz = minz + ((maxz - minz) >> 1)
-        
-        # Z order octans
-        octans = [
-           (minx, miny, minz, cx, cy, cz), #0
-           (cx, miny, minz, maxx, cy, cz), #1
-           (minx, cy, minz, cx, maxy, cz), #2
-           (cx, cy, minz, maxx, maxy, cz), #3
-           (minx, miny, cz, cx, cy, maxz), #4
-           (cx, miny, cz, maxx, cy, maxz), #5 
-           (minx, cy, cz, cx, maxy, maxz), #6
-           (cx, cy, cz, maxx, maxy, maxz)  #7
-        ]
+        mins = (minx, miny, minz)
+        maxs = (maxx, maxy, maxz)
+        active = self.activeDims(parentLevel)
         
+        # Z order octans, with equal bits:
+        # 0: (minx, miny, minz, cx, cy, cz), 1: (cx, miny, minz, maxx, cy, cz), ...
+        octans = []
+        for octIndex in range(1 << len(active)):
+            octan = list(mins + maxs)
+            for k, d in enumerate(active):
+                center = mins[d] + ((maxs[d] - mins[d]) >> 1)
+                if (octIndex >> k) & 1:
+                    octan[d] = center
+                else:
+                    octan[d + 3] = center
+            octans.append(tuple(octan))
                 
         level = parentLevel + 1
           
         codes = []
         c = 0
-        for octIndex in range(8):
+        for octIndex in range(len(octans)):
             octan = octans[octIndex]
             relation = self._relation(region, dynamicCube(dynamicPoint(*octan[:3]), dynamicPoint(*octan[3:])))
             
             if relation: #1 or 2
-                octCode = (parentCode << 3) + octIndex
+                octCode = (parentCode << len(active)) + octIndex
                 if parentLevel == maxDepth or relation == 1:
                         codes.append((octCode, level, relation == 1, self.octCodeToMortonRange(octCode, level))) # relation = 1 indicates that this morton range is fully within query region
                         c += 1
                 else:
                     (tcodes, tc) = self._overlapCodes(maxDepth, level, octCode, region, *octan)
-                    if tc == 8:
+                    if tc == len(octans):
                         codes.append((octCode, level, False, self.octCodeToMortonRange(octCode, level)))
                         c += 1
                     else:
@@ -97,7 +110,7 @@ class dynamicOctree:
         return (codes,c)
     
     def octCodeToMortonRange(self, octCode, level):
-        diff = (self.numBits - level) * 3
+        diff = self.keyBits(level)
         minr = octCode << diff
         maxr = ((octCode + 1) << diff) - 1
         return (minr, maxr)
@@ -177,14 +190,20 @@ class dynamicOctree:
     
     def getCoords(self, mortonRange):
         (minr, maxr) = mortonRange
-        minx = morton.DecodeMorton3DX(minr)
-        miny = morton.DecodeMorton3DY(minr)
-        minz = morton.DecodeMorton3DZ(minr)
-        maxx = morton.DecodeMorton3DX(maxr)
-        maxy = morton.DecodeMorton3DY(maxr)
-        maxz = morton.DecodeMorton3DZ(maxr)
+        (minx, miny, minz) = morton.DecodeMortonBits(minr, self.bits)
+        (maxx, maxy, maxz) = morton.DecodeMortonBits(maxr, self.bits)
         return (minx, miny, minz, maxx + 1, maxy + 1, maxz + 1)
     
+    def getMortonBox(self, region):
+        """ Returns the morton codes of the lower and upper corner of the bounding
+        box of the region, used to scan the IOT with BIGMIN skips."""
+        (minx, miny, maxx, maxy) = region.wkt.bounds
+        mins = (region.tmin, minx, miny)
+        maxs = (region.tmax, maxx, maxy)
+        lows = [min(max(int(math.floor(v)), 0), (1 << b) - 1) for v, b in zip(mins, self.bits)]
+        highs = [min(max(int(math.floor(v)), 0), (1 << b) - 1) for v, b in zip(maxs, self.bits)]
+        return (morton.EncodeMortonBits(lows, self.bits), morton.EncodeMortonBits(highs, self.bits))
+    
     def getMortonRanges(self, region, coarser = 3, continuous = True, distinctIn = False, numLevels = None, maxRanges = None):
         codes, Levels = self.overlapCodes(region, coarser, continuous, numLevels)
 